@@ -24,6 +24,8 @@ setup(name='tpcc_tester', # 包名称
           'Programming Language :: Python :: 3.12'
       ],
       install_requires=['pymysql'],
+      # 可选: parquet 保存 --raw-records 的明细, pyinstrument 用于 --profile 的采样分析
+      extras_require={'parquet': ['pyarrow'], 'profile': ['pyinstrument']},
       entry_points={'console_scripts': ['tpcc_tester=tpcc_tester.runner:main']},
       package_data={'': ['*.json']},
       auth='Bobby Ling', # 作者
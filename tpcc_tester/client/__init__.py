@@ -1,5 +1,6 @@
 from .base import DBClient
 from .rmdb_client import RMDBClient
+from .async_rmdb_client import AsyncRMDBClient
 from .mysql_client import MySQLClient
 from .slt_client import SLTClient
 from .sql_client import SQLClient
@@ -8,6 +9,7 @@ from .base import ClientType
 __all__ = [
     'DBClient',
     'RMDBClient',
+    'AsyncRMDBClient',
     'MySQLClient',
     'SLTClient',
     'SQLClient',
@@ -0,0 +1,111 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Tuple, override
+
+from .base import DBClient
+from .rmdb_client import RMDBClient, RMDBProtocol
+from tpcc_tester.common import ServerState, Result
+
+
+class AsyncRMDBClient(RMDBProtocol, DBClient):
+    """
+    asyncio 版 RMDBClient: 协议相同(请求和响应都以 \\0 结尾), 一个事件循环上可以同时驱动多个连接.
+
+    send_cmd 是协程, 所以继承来的 select/insert/update/delete/begin/commit 返回的也是协程,
+    调用方需要 await: (await client.select(...)).is_not_empty_or_throw().
+    不支持 global_lock.
+    """
+    HOST = RMDBClient.HOST
+    # readuntil 的缓冲上限, 需要容纳最大的一条响应
+    STREAM_LIMIT = 1 << 30
+
+    def __init__(self, db: str = "rmdb", port: int = int(os.getenv("RMDB_PORT", "8765"))):
+        super().__init__(db, port, None)
+        self.reader: asyncio.StreamReader = None
+        self.writer: asyncio.StreamWriter = None
+
+    async def _read_frame(self) -> bytes:
+        try:
+            return await self.reader.readuntil(b"\0")
+        except asyncio.IncompleteReadError as e:
+            return e.partial
+
+    async def _request(self, sql: str) -> bytes:
+        self.writer.write(f"{sql}\0".encode())
+        await self.writer.drain()
+        return await self._read_frame()
+
+    @override
+    async def ping(self) -> ServerState:
+        """与 RMDBClient.ping 相同, 不记录日志"""
+        try:
+            return ServerState.OK if await self._request("show tables;") else ServerState.DOWN
+        except Exception:
+            return ServerState.DOWN
+
+    @override
+    async def connect(self) -> ServerState:
+        try:
+            await self.close()
+            self.reader, self.writer = await asyncio.open_connection(self.HOST, self.port, limit=self.STREAM_LIMIT)
+            if await self._request("show tables;"):
+                self.logger.debug(f"Connected to RMDB at {self.HOST}:{self.port}")
+                return ServerState.OK
+            return ServerState.DOWN
+        except Exception as e:
+            self.logger.error(f"Failed to connect to RMDB: {e}, port: {self.port}")
+            return ServerState.DOWN
+
+    async def _round_trip(self, sqls: List[str]) -> List[Result]:
+        """与 RMDBClient._round_trip 相同, 连接断开后未收到的响应为空, 解析为 DOWN"""
+        recv_bufs = []
+        t0 = time.perf_counter_ns()
+        t1 = t0
+        try:
+            self.writer.write(self.encode(sqls))
+            await self.writer.drain()
+            t1 = time.perf_counter_ns()
+            # 事件循环上其他终端运行的时间也计入 wait
+            for _ in sqls:
+                recv_bufs.append(await self._read_frame())
+        except (ConnectionError, asyncio.LimitOverrunError) as e:
+            self.logger.error(f"Error sending commands: {sqls}, error: {e}")
+        recv_bufs += [b''] * (len(sqls) - len(recv_bufs))
+        return self.parse_frames(recv_bufs, sqls, t0, t1, time.perf_counter_ns())
+
+    @override
+    async def send_cmd(self, sql: str) -> Result:
+        return (await self.send_pipeline([sql]))[0]
+
+    async def send_pipeline(self, sqls: List[str]) -> List[Result]:
+        """与 RMDBClient.send_pipeline 相同: 连续写入所有语句, 再按顺序读取各自的响应"""
+        t_send, t0 = time.time_ns(), time.perf_counter_ns()
+        results = await self._round_trip(sqls)
+        self.finish_call(sqls, results, t_send, t0)
+        return results
+
+    @override
+    async def select_many(self, queries: List[Dict[str, Any]]) -> List[Result]:
+        return await self.send_pipeline(self.render_queries(queries))
+
+    @override
+    async def insert_many(self, table: str, rows: List[Tuple[Any, ...]]) -> Result:
+        result = Result(ServerState.OK, [], [], '')
+        for row in rows:
+            result = await self.insert(table, row)
+            if result.state != ServerState.OK:
+                return result
+        return result
+
+    @override
+    async def close(self):
+        if self.writer:
+            try:
+                self.writer.close()
+                await self.writer.wait_closed()
+                self.logger.debug("RMDB connection closed")
+            except Exception:
+                pass
+            finally:
+                self.reader = self.writer = None
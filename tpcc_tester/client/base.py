@@ -1,11 +1,15 @@
 from contextlib import contextmanager
 import logging
+import time
 from enum import Enum
 from abc import ABC, abstractmethod
 from multiprocessing.synchronize import Lock as LockBase
-from typing import Any, Callable, List, Optional, Tuple, Union, final
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union, final
 
 from tpcc_tester.common import ServerState, Result, setup_logging
+from tpcc_tester.record.capture import current_capture
+from tpcc_tester.record.phases import ClientTimings
+from tpcc_tester.record.sql_profile import current_sql_profiler
 
 # Operator
 ALL = '*'
@@ -27,6 +31,116 @@ LT = '<'
 GE = '>='
 LE = '<='
 
+def format_cell(cell: Any) -> str:
+    """逻辑日志中的值: 浮点数保留两位小数, 与服务器的文本输出一致"""
+    return f"{cell:.2f}" if isinstance(cell, float) else str(cell)
+
+
+class SqlExpr(str):
+    """
+    原样写入 SQL 的表达式(列名, w_ytd+{} 等), 不会被当作字符串常量加引号.
+
+    表达式中的 {} 依次由 params 填入, 预处理语句中 params 作为绑定参数, 表达式本身保持不变.
+    """
+    def __new__(cls, expr: str, *params: Any):
+        obj = super().__new__(cls, expr)
+        obj.params = params
+        return obj
+
+
+def sql_literal(value: Any) -> str:
+    """值 -> SQL 常量: 字符串加单引号(内部的单引号写两次), None 为 NULL, SqlExpr 原样输出"""
+    if isinstance(value, SqlExpr):
+        return value.format(*[sql_literal(param) for param in value.params])
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    if value is None:
+        return 'NULL'
+    return str(value)
+
+
+class StatementTemplate:
+    """
+    语句模板: 按 (操作, 表, 列, 条件的列和运算符, ...) 缓存, 首次使用时编译为 str.format 模板,
+    之后每次只需要一次 format 调用填入常量.
+    """
+    _cache: Dict[tuple, 'StatementTemplate'] = {}
+
+    def __init__(self, op: str, sql_format: str):
+        self.op = op
+        self.sql_format = sql_format
+
+    def render(self, values: Iterable[Any]) -> str:
+        return self.sql_format.format(*[sql_literal(value) for value in values])
+
+    def bind(self, values: Iterable[Any], placeholder: str = '?') -> Tuple[str, List[Any]]:
+        """预处理语句: 常量替换为占位符, 返回 (语句, 绑定参数); SqlExpr 写入语句, 其 params 作为绑定参数"""
+        fields, params = [], []
+        for value in values:
+            if isinstance(value, SqlExpr):
+                fields.append(value.format(*[placeholder] * len(value.params)))
+                params.extend(value.params)
+            else:
+                fields.append(placeholder)
+                params.append(value)
+        return self.sql_format.format(*fields), params
+
+    @staticmethod
+    def get(key: tuple) -> 'StatementTemplate':
+        template = StatementTemplate._cache.get(key)
+        if template is None:
+            template = StatementTemplate._cache[key] = StatementTemplate(key[0], StatementTemplate.compile(key))
+        return template
+
+    @staticmethod
+    def compile(key: tuple) -> str:
+        # 生成的语句与原先逐个替换 %s 得到的完全一致
+        escape = lambda name: str(name).replace('{', '{{').replace('}', '}}')
+        op = key[0]
+        gen = lambda ele: escape(ele[0]) + escape(ele[1]) + '{}'
+        if op == SELECT:
+            _, table, col, shape, order_by, asc = key
+            where = ' '.join([WHERE, AND.join([gen(ele) for ele in shape])]) if shape else ''
+            order_by = ' '.join([ORDER_BY, escape(order_by), ASC if asc else DESC]) if order_by else ''
+            return ' '.join([SELECT, ','.join(escape(c) for c in col), FROM, ','.join(escape(t) for t in table), where, order_by, ';'])
+        if op == INSERT:
+            _, table, n = key
+            values = ''.join([VALUES, '(', ','.join(['{}'] * n), ')'])
+            return ' '.join([INSERT, "into", escape(table), values, ';'])
+        if op == UPDATE:
+            _, table, cols, shape = key
+            where = ' '.join([WHERE, AND.join([gen(ele) for ele in shape])]) if shape else ''
+            return ' '.join([UPDATE, escape(table), SET, ','.join(escape(c) + '={}' for c in cols), where, ';'])
+        if op == DELETE:
+            _, table, shape = key
+            where = ' '.join([WHERE, AND.join([gen(ele) for ele in shape])]) if shape else ''
+            return ' '.join([DELETE, FROM, escape(table), where, ';'])
+        raise ValueError(f'Invalid statement: {key}')
+
+
+class _ResultLines:
+    """result_str 的每一行前加 -- """
+    def __init__(self, result_str: str):
+        self.result_str = result_str
+
+    def __str__(self):
+        return f"{'\n'.join([f'-- {line}' for line in self.result_str.split('\n') if line])}\n"
+
+
+class _SortedRows:
+    """
+    对result.data的每一行按字符串顺序排序后输出
+    tuple 支持字典序比较
+    统一格式化为字符串, 不同客户端的输出可以直接 diff
+    """
+    def __init__(self, data: List[List[Any]]):
+        self.data = data
+
+    def __str__(self):
+        sorted_data = sorted([[format_cell(item) for item in row] for row in self.data])
+        return f"{''.join([f'\n-- {row}' for row in sorted_data])}\n"
+
+
 class ClientType(Enum):
     RMDB = 'rmdb'
     MYSQL = 'mysql'
@@ -56,6 +170,10 @@ class DBClient(ABC):
         self.db = db
         self.port = port
         self.global_lock = global_lock
+        # --disable-logging 时不记录语句, 也不做任何格式化
+        from tpcc_tester.config import get_config
+        self.record_enabled = not get_config().disable_logging
+        self.attach_instruments()
         self.logger = setup_logging(__name__)
         #
         self.sql_logger = setup_logging(
@@ -78,6 +196,26 @@ class DBClient(ABC):
     def set_global_lock(self, global_lock: LockBase):
         self.global_lock = global_lock
 
+    def attach_instruments(self):
+        """关联当前进程的捕获和语句统计; 连接池中的连接每次取出时重新关联"""
+        # --capture 时每条语句及其发送/接收时间写入捕获文件
+        self.capture = current_capture()
+        self.conn_id = self.capture.new_connection() if self.capture else None
+        # --profile-sql 时按语句模板统计耗时
+        self.profiler = current_sql_profiler()
+        # --phase-breakdown 时累计 render/send/wait/parse/log 的耗时
+        self.timings: Optional[ClientTimings] = None
+
+    @contextmanager
+    def without_record(self):
+        """暂停 append_record、捕获和语句统计, 用于批量导入等大语句"""
+        record_enabled, capture, profiler = self.record_enabled, self.capture, self.profiler
+        self.record_enabled, self.capture, self.profiler = False, None, None
+        try:
+            yield self
+        finally:
+            self.record_enabled, self.capture, self.profiler = record_enabled, capture, profiler
+
     @abstractmethod
     def connect(self) -> ServerState:
         pass
@@ -89,11 +227,17 @@ class DBClient(ABC):
     def crash(self) -> None:
         pass
 
+    def ping(self) -> ServerState:
+        """最轻的一次往返, 用于测量基线 RTT; 默认发送一条不记录日志的 show tables"""
+        with self.without_record():
+            return self.send_cmd("show tables;").state
+
     @staticmethod
     def log_record(func: Callable[..., Result]):
         def wrapper(self: 'DBClient', *args, **kwargs):
+            t_send, t0 = time.time_ns(), time.perf_counter_ns()
             result = func(self, *args, **kwargs)
-            self.append_record(args[0], result)
+            self.finish_call([args[0]], [result], t_send, t0)
             return result
         return wrapper
 
@@ -116,17 +260,39 @@ class DBClient(ABC):
             return result
         return wrapper
 
+    def finish_call(self, sqls: List[str], results: List[Result], t_send: int, t0: int) -> None:
+        """
+        一次往返之后: 捕获和统计耗时, 记录语句日志.
+        t_send 为发送前的 time.time_ns(), t0 为发送前的 time.perf_counter_ns()
+        """
+        t1 = time.perf_counter_ns()
+        if self.capture is not None or self.profiler is not None:
+            self.record_timings(sqls, results, t_send, t1 - t0)
+        if self.record_enabled:
+            for sql, result in zip(sqls, results):
+                self.append_record(sql, result)
+        if self.timings is not None:
+            self.timings.log += time.perf_counter_ns() - t1
+
+    def record_timings(self, sqls: List[str], results: List[Result], t_send: int, elapsed: int) -> None:
+        """
+        一次往返中执行的语句: 捕获记录发送/接收时间(time_ns, 不同进程可比),
+        语句统计按语句数平分这次往返的耗时(perf_counter_ns 的差值)
+        """
+        if self.capture is not None:
+            for sql, result in zip(sqls, results):
+                self.capture.write(self.conn_id, sql, result.state.value, t_send, t_send + elapsed)
+        if self.profiler is not None:
+            share = elapsed // len(sqls)
+            for sql in sqls:
+                self.profiler.record(sql, share)
+
     def append_record(self, sql: str, result: Result) -> None:
+        # 格式化和排序都放在日志参数的 __str__ 中, 由后台写日志线程完成
         # log result_str
-        self.sql_logger.info(f"{sql}")
-        self.sql_logger.info(f"{'\n'.join([f'-- {line}' for line in result.result_str.split('\n') if line])}\n")
+        self.sql_logger.info("%s\n%s", sql, _ResultLines(result.result_str))
         # log data
-        self.sql_logic_logger.info(f"{sql}")
-        # 对result.data的每一行按字符串顺序排序后输出
-        # tuple 支持字典序比较
-        sorted_data = sorted(result.data, key=lambda row: tuple(str(item) for item in row))
-        # sorted_data = [result.metadata] + sorted_data
-        self.sql_logic_logger.info(f"{''.join([f'\n-- {row}' for row in sorted_data])}\n")
+        self.sql_logic_logger.info("%s\n%s", sql, _SortedRows(result.data))
         # if result.state == ServerState.ERROR:
         #     raise Exception(result.result_str)
         # 记录sql
@@ -164,6 +330,16 @@ class DBClient(ABC):
     def send_tcl(self, sql: str) -> Result:
         return self.send_cmd(sql)
 
+    def send_template(self, template: StatementTemplate, values: List[Any]) -> Result:
+        """执行语句模板; 默认渲染为完整语句发送, 支持预处理语句的客户端覆盖此方法"""
+        send = self.send_dql if template.op == SELECT else self.send_dml
+        if self.timings is None:
+            return send(template.render(values))
+        t0 = time.perf_counter_ns()
+        sql = template.render(values)
+        self.timings.render += time.perf_counter_ns() - t0
+        return send(sql)
+
     @final
     def begin(self) -> Result:
         return self.send_tcl("BEGIN;")
@@ -175,57 +351,56 @@ class DBClient(ABC):
     def abort(self) -> Result:
         return self.send_tcl("ABORT;")
 
-    @final
-    def select(self, table: List[str], col: Union[str, Tuple[str, ...]]=ALL, where: Optional[List[Tuple[str, str, str]]] = None, order_by: Optional[str] = None, asc: bool = False):
-        param = []
-        if where:
-            param = [ele[-1] for ele in where]
-
-        table = ','.join(table)
-
-        gen = lambda ele: str(ele[0]) + str(ele[1]) + '%s'
-        where = ' '.join([WHERE, AND.join([gen(ele) for ele in where])]) if where else ''
-        order_by = ' '.join([ORDER_BY, order_by, ASC if asc else DESC]) if order_by else ''
-        sql = ' '.join([SELECT, ','.join(col), FROM, table, where, order_by, ';'])
-        for i in param:
-            sql = sql.replace("%s", str(i), 1)
-
-        return self.send_dql(sql)
+    @staticmethod
+    def select_statement(table: List[str], col: Union[str, Tuple[str, ...]]=ALL, where: Optional[List[Tuple[str, str, Any]]] = None, order_by: Optional[str] = None, asc: bool = False) -> Tuple[StatementTemplate, List[Any]]:
+        shape = tuple((ele[0], ele[1]) for ele in where) if where else ()
+        template = StatementTemplate.get((SELECT, tuple(table), tuple(col), shape, order_by, asc))
+        return template, [ele[-1] for ele in where] if where else []
 
+    @final
+    def select(self, table: List[str], col: Union[str, Tuple[str, ...]]=ALL, where: Optional[List[Tuple[str, str, Any]]] = None, order_by: Optional[str] = None, asc: bool = False):
+        return self.send_template(*self.select_statement(table, col, where, order_by, asc))
+
+    def select_many(self, queries: List[Dict[str, Any]]) -> List[Result]:
+        """
+        多条互不依赖的查询, 每条为 select 的参数, 结果按顺序返回;
+        默认逐条执行, 支持 pipeline 的客户端一次发送所有查询再依次读取响应.
+        """
+        return [self.select(**query) for query in queries]
+
+    def render_queries(self, queries: List[Dict[str, Any]]) -> List[str]:
+        """把 select_many 的查询渲染为语句, 渲染耗时计入 timings"""
+        t0 = time.perf_counter_ns()
+        sqls = [template.render(values) for template, values in (self.select_statement(**query) for query in queries)]
+        if self.timings is not None:
+            self.timings.render += time.perf_counter_ns() - t0
+        return sqls
 
     @final
     def insert(self, table: str, rows: Tuple[Any, ...]):
-        values = ''.join([VALUES, '(', ','.join(['%s' for i in range(len(rows))]), ')'])
-        sql = ' '.join([INSERT, "into", table, values, ';'])
-        for i in rows:
-            sql = sql.replace("%s", str(i), 1)
-        return self.send_dml(sql)
-
+        template = StatementTemplate.get((INSERT, table, len(rows)))
+        return self.send_template(template, rows)
+
+    def insert_many(self, table: str, rows: List[Tuple[Any, ...]]) -> Result:
+        """多行插入同一张表; 默认逐行 insert, 遇到失败立即返回该结果"""
+        result = Result(ServerState.OK, [], [], '')
+        for row in rows:
+            result = self.insert(table, row)
+            if result.state != ServerState.OK:
+                return result
+        return result
 
     @final
-    def update(self, table: str, row: List[Tuple[str, str]], where: Optional[List[Tuple[str, str, str]]] = None):
-        param = [ele[-1] for ele in where]
-        gen = lambda ele: str(ele[0]) + str(ele[1]) + '%s'
-        where = ' '.join([WHERE, AND.join([gen(ele) for ele in where])]) if where else ''
-        var = [e[0] + '=%s' for e in row]
-        val = [e[1] for e in row]
-
-        sql = ' '.join([UPDATE, table, SET, ','.join(var), where, ';'])
-        for i in val:
-            sql = sql.replace("%s", str(i), 1)
-        for i in param:
-            sql = sql.replace("%s", str(i), 1)
-        return self.send_dml(sql)
+    def update(self, table: str, row: List[Tuple[str, Any]], where: Optional[List[Tuple[str, str, Any]]] = None):
+        shape = tuple((ele[0], ele[1]) for ele in where) if where else ()
+        template = StatementTemplate.get((UPDATE, table, tuple(e[0] for e in row), shape))
+        return self.send_template(template, [e[1] for e in row] + ([ele[-1] for ele in where] if where else []))
 
     @final
-    def delete(self, table: str, where: Optional[List[Tuple[str, str, str]]] = None):
-        param = [ele[-1] for ele in where]
-        gen = lambda ele: str(ele[0]) + str(ele[1]) + '%s'
-        where = ' '.join([WHERE, AND.join([gen(ele) for ele in where])]) if where else ''
-        sql = ' '.join([DELETE, FROM, table, where, ';'])
-        for i in param:
-            sql = sql.replace("%s", str(i), 1)
-        return self.send_dml(sql)
+    def delete(self, table: str, where: Optional[List[Tuple[str, str, Any]]] = None):
+        shape = tuple((ele[0], ele[1]) for ele in where) if where else ()
+        template = StatementTemplate.get((DELETE, table, shape))
+        return self.send_template(template, [ele[-1] for ele in where] if where else [])
 
     # def create_table(self, sql: str) -> Result:
     #     return self.send_ddl(sql)
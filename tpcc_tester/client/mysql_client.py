@@ -1,18 +1,28 @@
+import time
 from pathlib import Path
-from typing import override
+from typing import Any, Dict, List, Tuple, override
 import pymysql
+from pymysql.constants import CLIENT
 from multiprocessing.synchronize import Lock as LockBase
-from .base import DBClient
+from .base import DBClient, StatementTemplate, INSERT
 from tpcc_tester.common import ServerState, Result
 
 class MySQLClient(DBClient):
+    # MySQL server has gone away / Lost connection / Lost connection to server at handshake
+    CONNECTION_LOST = (2006, 2013, 2055)
+
     def __init__(self, db: str = "tpcc_test", port: int = 3306, host: str = "localhost",
-                 user: str = "root", password: str = "123123", global_lock: LockBase = None):
+                 user: str = "root", password: str = "123123", global_lock: LockBase = None,
+                 prepared: bool = False):
         super().__init__(db, port, global_lock)
         self.host = host
         self.user = user
         self.password = password
         self.connection = None
+        # 语句模板通过服务器端预处理语句执行, 每个连接 PREPARE 一次
+        self.prepared = prepared
+        # 带占位符的语句 -> 预处理语句名, 随连接失效
+        self.statements: Dict[str, str] = {}
 
     @override
     def connect(self) -> ServerState:
@@ -31,7 +41,10 @@ class MySQLClient(DBClient):
                 conv=conversions,
                 autocommit=True,
                 local_infile=True, # for load data local infile
+                # SET 参数和 EXECUTE 在一次往返中发送
+                client_flag=CLIENT.MULTI_STATEMENTS,
             )
+            self.statements.clear()
 
             # sudo vim /etc/mysql/mysql.conf.d/mysqld.cnf
             # apppend local_infile=1 in [mysqld] section
@@ -51,40 +64,147 @@ class MySQLClient(DBClient):
             self.logger.error(f"Failed to connect to MySQL: {e}")
             return ServerState.DOWN
 
+    @DBClient.with_global_lock
+    @override
+    def ping(self) -> ServerState:
+        """COM_PING, 服务器不执行任何语句"""
+        try:
+            self.connection.ping(reconnect=False)
+            return ServerState.OK
+        except Exception:
+            return ServerState.DOWN
+
     @DBClient.log_record
     @DBClient.with_global_lock
     @override
     def send_cmd(self, sql: str) -> Result:
         try:
             cursor = self.connection.cursor()
+            t0 = time.perf_counter_ns()
             cursor.execute(sql)
-            result_col_data = cursor.fetchall()
-            column_names = tuple(column[0] for column in cursor.description) if cursor.description else ()
-            raw_data = (column_names,) + tuple(result_col_data)
-
-            meta_data = list(column_names)
-            data = [list(row) for row in result_col_data]
-
-            for row in data:
-                for i, cell in enumerate(row):
-                    if type(cell) == int:
-                        row[i] = str(cell)
-                    if type(cell) == float:
-                        row[i] = f"{cell:.2f}"
-
-            result_str = self._format_result(raw_data)
-            result = Result(ServerState.OK, meta_data, data, result_str, raw_data, sql)
+            t1 = time.perf_counter_ns()
+            # 与 RMDBClient 一致返回原生类型(int/float/str), 只在日志中格式化为字符串
+            result = self._result(cursor, sql)
+            if self.timings is not None:
+                # pymysql 在 execute 中发送并读取全部结果包, 发送计入 wait
+                self.timings.add_call(0, t1 - t0, time.perf_counter_ns() - t1)
             # self.logger.debug("exec sql: %s, result: %s", sql, result)
             return result
         except pymysql.err.OperationalError as e:
             # Deadlock found when trying to get lock; try restarting transaction
             if e.args[0] == 1213:
                 return Result(ServerState.ABORT, [], [], str(e), e, sql)
+            # 存储过程中 SIGNAL 的错误
+            if e.args[0] == 1644:
+                return Result(ServerState.ERROR, [], [], str(e), e, sql)
+            if e.args[0] in self.CONNECTION_LOST:
+                return self._connection_lost(e, sql)
             raise e
+        except pymysql.err.InterfaceError as e:
+            return self._connection_lost(e, sql)
         except Exception as e:
             self.logger.exception(f"Error executing SQL: {sql} error: {e}")
             return Result(ServerState.ERROR, [], [], str(e), e, sql)
 
+    def _connection_lost(self, e: Exception, sql: str) -> Result:
+        """连接断开(或已关闭)时返回 DOWN, 由调用方 ping 发现后重连"""
+        self.logger.error(f"Connection lost: {sql} error: {e}")
+        return Result(ServerState.DOWN, [], [], str(e), e, sql)
+
+    def _result(self, cursor, sql: str) -> Result:
+        result_col_data = cursor.fetchall()
+        column_names = tuple(column[0] for column in cursor.description) if cursor.description else ()
+        raw_data = (column_names,) + tuple(result_col_data)
+        data = [list(row) for row in result_col_data]
+        return Result(ServerState.OK, list(column_names), data, self._format_result(raw_data), raw_data, sql)
+
+    def _prepare(self, cursor, sql: str) -> str:
+        name = self.statements.get(sql)
+        if name is None:
+            name = f"tpcc_stmt_{len(self.statements)}"
+            cursor.execute(f"PREPARE {name} FROM %s", (sql.rstrip(' ;'),))
+            self.statements[sql] = name
+        return name
+
+    @DBClient.with_global_lock
+    def _execute_prepared(self, template: StatementTemplate, values: List[Any], sql: str) -> Result:
+        try:
+            cursor = self.connection.cursor()
+            stmt, params = template.bind(values)
+            name = self._prepare(cursor, stmt)
+            t0 = time.perf_counter_ns()
+            if params:
+                variables = ','.join(f'@p{i}' for i in range(len(params)))
+                cursor.execute(f"SET {','.join(f'@p{i}=%s' for i in range(len(params)))}; "
+                               f"EXECUTE {name} USING {variables};", params)
+                # 第一个结果是 SET
+                cursor.nextset()
+            else:
+                cursor.execute(f"EXECUTE {name};")
+            t1 = time.perf_counter_ns()
+            result = self._result(cursor, sql)
+            if self.timings is not None:
+                self.timings.add_call(0, t1 - t0, time.perf_counter_ns() - t1)
+            return result
+        except pymysql.err.OperationalError as e:
+            if e.args[0] == 1213:
+                return Result(ServerState.ABORT, [], [], str(e), e, sql)
+            if e.args[0] in self.CONNECTION_LOST:
+                return self._connection_lost(e, sql)
+            raise e
+        except pymysql.err.InterfaceError as e:
+            return self._connection_lost(e, sql)
+        except Exception as e:
+            self.logger.exception(f"Error executing SQL: {sql} error: {e}")
+            return Result(ServerState.ERROR, [], [], str(e), e, sql)
+
+    @override
+    def send_template(self, template: StatementTemplate, values: List[Any]) -> Result:
+        if not self.prepared:
+            return super().send_template(template, values)
+        # 日志中仍记录完整语句, 与其他客户端的日志可以直接 diff
+        t_render = time.perf_counter_ns()
+        sql = template.render(values)
+        if self.timings is not None:
+            self.timings.render += time.perf_counter_ns() - t_render
+        t_send, t0 = time.time_ns(), time.perf_counter_ns()
+        result = self._execute_prepared(template, values, sql)
+        self.finish_call([sql], [result], t_send, t0)
+        return result
+
+    @DBClient.with_global_lock
+    def _execute_many(self, template: StatementTemplate, rows: List[Tuple[Any, ...]], sql: str) -> Result:
+        try:
+            cursor = self.connection.cursor()
+            t0 = time.perf_counter_ns()
+            # pymysql 把 INSERT ... VALUES 的 executemany 合并为一条多行 INSERT
+            cursor.executemany(template.sql_format.format(*['%s'] * len(rows[0])), rows)
+            if self.timings is not None:
+                self.timings.add_call(0, time.perf_counter_ns() - t0, 0)
+            return Result(ServerState.OK, [], [], '', None, sql)
+        except pymysql.err.OperationalError as e:
+            if e.args[0] == 1213:
+                return Result(ServerState.ABORT, [], [], str(e), e, sql)
+            if e.args[0] in self.CONNECTION_LOST:
+                return self._connection_lost(e, sql)
+            raise e
+        except pymysql.err.InterfaceError as e:
+            return self._connection_lost(e, sql)
+        except Exception as e:
+            self.logger.exception(f"Error executing SQL: {sql} error: {e}")
+            return Result(ServerState.ERROR, [], [], str(e), e, sql)
+
+    @override
+    def insert_many(self, table: str, rows: List[Tuple[Any, ...]]) -> Result:
+        if not self.prepared or not rows:
+            return super().insert_many(table, rows)
+        template = StatementTemplate.get((INSERT, table, len(rows[0])))
+        sqls = [template.render(row) for row in rows]
+        t_send, t0 = time.time_ns(), time.perf_counter_ns()
+        result = self._execute_many(template, rows, '\n'.join(sqls))
+        self.finish_call(sqls, [result] * len(sqls), t_send, t0)
+        return result
+
     def _format_result(self, result_data) -> str:
         if not result_data:
             return ""
@@ -112,4 +232,4 @@ class MySQLClient(DBClient):
 
     @override
     def abort(self) -> Result:
-        self.send_tcl("ROLLBACK;")
\ No newline at end of file
+        return self.send_tcl("ROLLBACK;")
\ No newline at end of file
@@ -0,0 +1,134 @@
+import asyncio
+import os
+import random
+import time
+from multiprocessing.synchronize import Lock as LockBase
+from multiprocessing.util import Finalize
+from typing import Any, Callable, Dict, Iterator, List
+
+from .base import DBClient
+from tpcc_tester.common import ServerState, setup_logging
+
+
+def backoff_delays(retries: int, base: float, cap: float) -> Iterator[float]:
+    """
+    每次重试前等待的秒数: base, 2base, 4base, ... 不超过 cap.
+    每次在 [delay/2, delay] 中随机选择, 避免多个进程同时重连.
+    """
+    for i in range(retries):
+        delay = min(cap, base * 2 ** i)
+        yield random.uniform(delay / 2, delay)
+
+
+def connect_with_backoff(client: DBClient, retries: int = 5, base: float = 0.1, cap: float = 5.0) -> DBClient:
+    """(重新)建立 client 的连接, 失败时按 backoff_delays 重试, 全部失败时抛出 ConnectionError"""
+    logger = setup_logging(f"{__name__}")
+    delays = backoff_delays(retries, base, cap)
+    attempt = 0
+    while True:
+        client.close()
+        if client.connect() == ServerState.OK:
+            if attempt:
+                logger.info(f"reconnected after {attempt} retries")
+            return client
+        delay = next(delays, None)
+        if delay is None:
+            raise ConnectionError(f"failed to connect {type(client).__name__} after {retries} retries")
+        attempt += 1
+        logger.warning(f"connect failed, retry {attempt}/{retries} in {delay:.2f}s")
+        time.sleep(delay)
+
+
+async def async_connect_with_backoff(client, retries: int = 5, base: float = 0.1, cap: float = 5.0):
+    """connect_with_backoff 的 asyncio 版本, 用于 AsyncRMDBClient"""
+    logger = setup_logging(f"{__name__}")
+    delays = backoff_delays(retries, base, cap)
+    attempt = 0
+    while True:
+        await client.close()
+        if await client.connect() == ServerState.OK:
+            if attempt:
+                logger.info(f"reconnected after {attempt} retries")
+            return client
+        delay = next(delays, None)
+        if delay is None:
+            raise ConnectionError(f"failed to connect {type(client).__name__} after {retries} retries")
+        attempt += 1
+        logger.warning(f"connect failed, retry {attempt}/{retries} in {delay:.2f}s")
+        await asyncio.sleep(delay)
+
+
+class ConnectionPool:
+    """
+    一个进程内同一种客户端的空闲连接, clean/prepare/test/validate 依次复用.
+
+    acquire 取出空闲连接时先 ping, 断开的连接按指数退避重连; 没有空闲连接时新建.
+    release 放回的连接在下次 acquire 前不做任何检查.
+    """
+    def __init__(self, factory: Callable[[], DBClient], retries: int = 5, backoff: float = 0.1, max_backoff: float = 5.0):
+        self.factory = factory
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.idle: List[DBClient] = []
+        self.pid = os.getpid()
+        self.logger = setup_logging(f"{__name__}")
+
+    def connect(self, client: DBClient) -> DBClient:
+        return connect_with_backoff(client, self.retries, self.backoff, self.max_backoff)
+
+    def acquire(self, global_lock: LockBase = None) -> DBClient:
+        if self.idle:
+            client = self.idle.pop()
+            # ping 也是一次往返, 与语句一样持有全局锁
+            client.set_global_lock(global_lock)
+            if client.ping() != ServerState.OK:
+                self.logger.warning("idle connection is down, reconnecting")
+                self.connect(client)
+        else:
+            client = self.connect(self.factory())
+            client.set_global_lock(global_lock)
+        # 取出时重新关联当前的捕获和语句统计
+        client.attach_instruments()
+        return client
+
+    def release(self, client: DBClient):
+        client.timings = None
+        self.idle.append(client)
+
+    def close(self):
+        # fork 出的子进程继承的池属于父进程, 不关闭其中的连接
+        if os.getpid() != self.pid:
+            return
+        for client in self.idle:
+            client.close()
+        self.idle.clear()
+
+
+_pools: Dict[Any, ConnectionPool] = {}
+
+
+def get_pool(key: Any, factory: Callable[[], DBClient]) -> ConnectionPool:
+    """当前进程中 key 对应的连接池, 第一次使用时用 factory 创建; 重试参数来自配置"""
+    pool = _pools.get(key)
+    if pool is None:
+        from tpcc_tester.config import get_config
+        config = get_config()
+        pool = _pools[key] = ConnectionPool(factory, config.reconnect_retries, config.reconnect_backoff)
+        # 进程退出时关闭空闲连接
+        Finalize(pool, pool.close, exitpriority=0)
+    return pool
+
+
+def close_pools():
+    for pool in _pools.values():
+        pool.close()
+    _pools.clear()
+
+
+def _reset_after_fork():
+    # 子进程继承的连接属于父进程, 不能使用也不能关闭(MySQL 会发送 COM_QUIT), 只丢弃引用
+    _pools.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,62 @@
+from typing import Any, Callable, Dict, List, Tuple
+
+from tpcc_tester.db.table_layouts import CHAR, FLOAT, INT, column_types
+
+
+def _auto(cell: str) -> Any:
+    """表结构中没有的列(聚合函数, 别名等): 依次尝试 int, float"""
+    cell = cell.strip()
+    try:
+        return int(cell)
+    except ValueError:
+        pass
+    try:
+        return float(cell)
+    except ValueError:
+        return cell
+
+
+# int()/float() 会忽略两侧空白, 只有字符串列需要 strip
+_CONVERTERS: Dict[str, Callable[[str], Any]] = {INT: int, FLOAT: float, CHAR: str.strip}
+
+
+class TypedResultParser:
+    """
+    把 RMDB 的文本表格(| col | col |)直接解析为带类型的行.
+
+    列类型来自 table_layouts.column_types, 按表头缓存每列的转换函数.
+    """
+    def __init__(self, types: Dict[str, str] = column_types):
+        self.types = types
+        self._cache: Dict[Tuple[str, ...], List[Callable]] = {}
+
+    def _plan(self, header: Tuple[str, ...]) -> List[Callable]:
+        converters = self._cache.get(header)
+        if converters is None:
+            converters = self._cache[header] = [self._converter(col) for col in header]
+        return converters
+
+    def _converter(self, col: str) -> Callable[[str], Any]:
+        col_type = self.types.get(col.lower())
+        return _CONVERTERS[col_type] if col_type else _auto
+
+    def parse(self, result_str: str) -> Tuple[List[str], List[List[Any]]]:
+        """返回 (表头, 数据行); 不是表格时返回 ([], [])"""
+        if not result_str or '|' not in result_str:
+            return [], []
+
+        # 只保留以 '|' 开头的行, 第一行为表头
+        lines = [line for line in result_str.split('\n') if line.startswith('|') and '|' in line[1:]]
+        if not lines:
+            return [], []
+
+        header = tuple(cell.strip() for cell in lines[0].strip('|').split('|'))
+        converters = self._plan(header)
+
+        data = []
+        for line in lines[1:]:
+            if not line.strip('| '):  # 空行
+                continue
+            cells = line.strip('|').split('|')
+            data.append([convert(cell) for convert, cell in zip(converters, cells)])
+        return list(header), data
@@ -1,54 +1,120 @@
 import os
 from multiprocessing.synchronize import Lock as LockBase
 import socket
-from typing import Any, List
+import time
+from typing import Any, Dict, List
 from typing import override
 
 from .base import DBClient
+from .result_parser import TypedResultParser
 from tpcc_tester.common import ServerState, Result
 
-class RMDBClient(DBClient):
+class FramedReader:
+    """
+    按分隔符(\\0)切分响应的接收缓冲.
+
+    数据用 recv_into 直接写入预分配的 bytearray(不够时容量翻倍), 每次只在新到达的字节中查找分隔符,
+    所以读取一条响应的时间与其大小成正比; 分隔符之后多收到的字节留给下一条响应.
+    """
+    def __init__(self, sock: socket.socket, buf_size: int = 8192, delimiter: bytes = b"\0"):
+        self.sock = sock
+        self.delimiter = delimiter
+        self.buf_size = buf_size
+        self.buffer = bytearray(buf_size)
+        # [start, end) 为已收到但还未返回的数据, [start, scanned) 中已确认没有分隔符
+        self.start = 0
+        self.scanned = 0
+        self.end = 0
+
+    def _reserve(self):
+        """保证 end 之后至少有 buf_size 的空间"""
+        if len(self.buffer) - self.end >= self.buf_size:
+            return
+        if self.start > 0:
+            # 把未读的数据移到开头
+            size = self.end - self.start
+            self.buffer[:size] = self.buffer[self.start:self.end]
+            self.scanned -= self.start
+            self.start, self.end = 0, size
+        while len(self.buffer) - self.end < self.buf_size:
+            self.buffer.extend(bytes(len(self.buffer)))
+
+    def read_frame(self) -> bytes:
+        """返回一条完整的响应(包含分隔符); 连接关闭时返回剩余的数据(可能为空)"""
+        while True:
+            pos = self.buffer.find(self.delimiter, self.scanned, self.end)
+            if pos >= 0:
+                frame = bytes(self.buffer[self.start:pos + 1])
+                self.start = self.scanned = pos + 1
+                if self.start == self.end:
+                    self.start = self.scanned = self.end = 0
+                return frame
+            self.scanned = self.end
+            self._reserve()
+            with memoryview(self.buffer) as view:
+                n = self.sock.recv_into(view[self.end:])
+            if n == 0:  # Important!!
+                frame = bytes(self.buffer[self.start:self.end])
+                self.start = self.scanned = self.end = 0
+                return frame
+            self.end += n
+
+
+class RMDBProtocol:
+    """
+    RMDBClient 和 AsyncRMDBClient 共用的协议部分: 请求编码和响应解析.
+    请求和响应都以 \\0 结尾, 服务器按请求顺序逐条响应.
+    """
+    parser = TypedResultParser()
+
+    @staticmethod
+    def encode(sqls: List[str]) -> bytes:
+        return b''.join(f"{sql}\0".encode() for sql in sqls)
+
+    @staticmethod
+    def parse_response(recv_buf: bytes, sql: str) -> Result:
+        """把服务器返回的一条完整响应(以 \\0 结尾)解析为 Result, 数据按表结构转换为 int/float/str"""
+        if not recv_buf:
+            return Result(ServerState.DOWN, [], [], "Connection closed", None, sql)
+
+        result_str = recv_buf.decode().replace("\x00", "")
+
+        # 解析结果状态
+        if result_str.startswith('abort') or result_str.startswith('ABORT'):
+            return Result(ServerState.ABORT, [], [], result_str, recv_buf, sql)
+        elif result_str.startswith('Error') or result_str.startswith('ERROR'):
+            return Result(ServerState.ERROR, [], [], result_str, recv_buf, sql)
+        else:
+            # 解析查询结果
+            metadata, data = RMDBProtocol.parser.parse(result_str)
+            return Result(ServerState.OK, metadata, data, result_str, recv_buf, sql)
+
+    def parse_frames(self: DBClient, recv_bufs: List[bytes], sqls: List[str], t0: int, t1: int, t2: int) -> List[Result]:
+        """
+        解析一次往返收到的响应, 第 i 条响应属于第 i 条语句, 空响应(连接已关闭)解析为 DOWN.
+        t0/t1/t2 为发送前/发送后/收到全部响应后的 perf_counter_ns, 连同解析耗时计入 timings
+        """
+        if not all(recv_bufs):
+            self.logger.warning("Connection closed by server")
+        results = [self.parse_response(recv_buf, sql) for recv_buf, sql in zip(recv_bufs, sqls)]
+        if self.timings is not None:
+            self.timings.add_call(t1 - t0, t2 - t1, time.perf_counter_ns() - t2)
+        return results
+
+
+class RMDBClient(RMDBProtocol, DBClient):
     MAX_MEM_BUFFER_SIZE = 8192
     HOST = '127.0.0.1'
 
     def __init__(self, db: str = "rmdb", port: int = int(os.getenv("RMDB_PORT", "8765")), global_lock: LockBase = None):
         super().__init__(db, port, global_lock)
         self.socket = None
+        self.reader: FramedReader = None
 
     @staticmethod
     def sendall(sock: socket.socket, data: str):
         sock.sendall(f"{data}\0".encode())
 
-    # @staticmethod
-    # def recvall(sock: socket.socket, buf_size: int = MAX_MEM_BUFFER_SIZE):
-    #     data = None
-    #     while True:
-    #         packet = sock.recv(buf_size)
-    #         if not packet:  # Important!!
-    #             break
-    #         if data is None:
-    #             data = bytearray()
-    #         data.extend(packet)
-    #         if len(packet) < buf_size:
-    #             break
-    #     print(f"len(data): {len(data)}")
-    #     return data
-    @staticmethod
-    def recvall(sock: socket.socket, buf_size: int = MAX_MEM_BUFFER_SIZE, delimiter: bytes = b"\0"):
-        data = b''
-        while True:
-            packet = sock.recv(buf_size)
-            if not packet:  # Important!!
-                break
-            data += packet
-            # if len(packet) < buf_size:
-            #     break
-            # 可以保证send之后才recv; recv时可能数据量很大
-            if delimiter in data:
-                break
-        # print(f"len(data): {len(data)}")
-        return data
-
     @override
     def connect(self) -> ServerState:
         try:
@@ -58,10 +124,11 @@ class RMDBClient(DBClient):
             host = socket.gethostbyname(self.HOST)
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.socket.connect((host, self.port))
+            self.reader = FramedReader(self.socket, self.MAX_MEM_BUFFER_SIZE)
 
             try:
                 self.sendall(self.socket, "show tables;")
-                recv_buf = self.recvall(self.socket)
+                recv_buf = self.reader.read_frame()
                 if recv_buf:
                     self.logger.debug(f"Connected to RMDB at {self.HOST}:{self.port}")
                     return ServerState.OK
@@ -74,62 +141,59 @@ class RMDBClient(DBClient):
             self.logger.error(f"Failed to connect to RMDB: {e}, port: {self.port}")
             return ServerState.DOWN
 
-    @DBClient.log_record
     @DBClient.with_global_lock
     @override
-    def send_cmd(self, sql: str) -> Result:
+    def ping(self) -> ServerState:
+        """RMDB 协议没有空请求, 发送与 connect 探测相同的 show tables, 不记录日志"""
         try:
-            self.sendall(self.socket, sql)
-            recv_buf: bytes = self.recvall(self.socket)
-
-            if not recv_buf:
-                self.logger.warning("Connection closed by server")
-                return Result(ServerState.DOWN, [], [], "Connection closed", None, sql)
-
-            result_str = recv_buf.decode().replace("\x00", "")
-
-            # 解析结果状态
-            if result_str.startswith('abort') or result_str.startswith('ABORT'):
-                return Result(ServerState.ABORT, [], [], result_str, recv_buf, sql)
-            elif result_str.startswith('Error') or result_str.startswith('ERROR'):
-                return Result(ServerState.ERROR, [], [], result_str, recv_buf, sql)
-            else:
-                # 解析查询结果
-                raw_data = self._parse_query_result(result_str)
-                metadata = raw_data[0] if len(raw_data) > 0 else []
-                data = raw_data[1:] if len(raw_data) > 1 else []
-                return Result(ServerState.OK, metadata, data, result_str, raw_data, sql)
+            self.sendall(self.socket, "show tables;")
+            return ServerState.OK if self.reader.read_frame() else ServerState.DOWN
+        except Exception:
+            return ServerState.DOWN
 
+    def _round_trip(self, sqls: List[str]) -> List[Result]:
+        """发送 sqls 并读取各自的响应; 连接不可用时关闭(缓冲中可能残留半条响应), 由调用方 ping 发现并重连"""
+        try:
+            t0 = time.perf_counter_ns()
+            self.socket.sendall(self.encode(sqls))
+            t1 = time.perf_counter_ns()
+            recv_bufs = [self.reader.read_frame() for _ in sqls]
+            t2 = time.perf_counter_ns()
+            results = self.parse_frames(recv_bufs, sqls, t0, t1, t2)
+            if not all(recv_bufs):
+                self.close()
+            return results
         except Exception as e:
-            self.logger.exception(f"Error sending command: {sql}, error: {e}")
-            exit(1)
-            # return Result(ServerState.ERROR, [], [], str(e), e, sql)
-
-    def _parse_query_result(self, result_str: str) -> List[List[Any]]:
-        """解析查询结果字符串为结构化数据"""
-        if not result_str or (('Error' in result_str) and ('|' not in result_str)):
-            return []
-
-        lines = result_str.strip().split('\n')
-        data_rows = []
-
-        # 跳过表头，解析数据行
-        for line in lines:
-            if line.startswith('|') and '|' in line[1:]:
-                # 移除前后的'|'并分割
-                row_data = [cell.strip() for cell in line.strip('|').split('|')]
-                if row_data and any(cell for cell in row_data):  # 非空行
-                    data_rows.append(row_data)
-
-        for row in data_rows:
-            for i, cell in enumerate(row):
-                if '.' in cell:
-                    try:
-                        row[i] = f"{float(cell):.2f}"
-                    except:
-                        pass
-
-        return data_rows
+            self.logger.error(f"Error sending commands: {sqls}, error: {e}")
+            self.close()
+            return [Result(ServerState.DOWN, [], [], str(e), e, sql) for sql in sqls]
+
+    @DBClient.log_record
+    @DBClient.with_global_lock
+    @override
+    def send_cmd(self, sql: str) -> Result:
+        return self._round_trip([sql])[0]
+
+    @DBClient.with_global_lock
+    def _pipeline(self, sqls: List[str]) -> List[Result]:
+        return self._round_trip(sqls)
+
+    def send_pipeline(self, sqls: List[str]) -> List[Result]:
+        """
+        连续发送多条语句, 再按顺序读取各自的响应, 只等待一次往返.
+
+        每条语句有各自的 Result(包括 abort/error); 语句之间不能有依赖.
+        请求全部写入后才开始读取, 所以一次发送的语句数应保持在几十条以内, 避免双方的 socket 缓冲都被写满.
+        """
+        t_send, t0 = time.time_ns(), time.perf_counter_ns()
+        results = self._pipeline(sqls)
+        # 同一 pipeline 中的语句记录相同的发送/接收时间
+        self.finish_call(sqls, results, t_send, t0)
+        return results
+
+    @override
+    def select_many(self, queries: List[Dict[str, Any]]) -> List[Result]:
+        return self.send_pipeline(self.render_queries(queries))
 
     @override
     def close(self):
@@ -141,3 +205,4 @@ class RMDBClient(DBClient):
                 pass
             finally:
                 self.socket = None
+                self.reader = None
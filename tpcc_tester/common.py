@@ -1,5 +1,13 @@
 from functools import wraps
+import atexit
+import gzip
 import logging
+import logging.handlers
+import multiprocessing
+import multiprocessing.util
+import os
+import queue
+import shutil
 import colorlog
 from dataclasses import dataclass
 from enum import Enum
@@ -41,7 +49,7 @@ class Result:
     state: ServerState
     # 表名
     metadata: List[str]
-    # 数据
+    # 数据, 按表结构为 int/float/str
     data: List[List[Any]]
     result_str: str
     raw: Any = None
@@ -119,12 +127,132 @@ def setup_console_handler(level: int = logging.INFO, console_formatter: Optional
     console_handler.setFormatter(console_formatter)
     return console_handler
 
-def setup_file_handler(log_file: str, level: int = logging.DEBUG, file_formatter: Optional[str] = None):
-    # logging.warning(f"setup_file_handler, log_file={log_file}, level={level}, file_formatter={file_formatter}")
+def _gzip_rotator(source: str, dest: str):
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+_main_pid = os.getpid()
+
+
+def process_log_file(log_file: str) -> str:
+    """子进程写自己的文件 logs/<pid>/..., 多个进程不会以 mode='w' 覆盖同一个文件"""
+    if os.getpid() == _main_pid and multiprocessing.parent_process() is None:
+        return log_file
+    path = Path(log_file)
+    return str(path.parent / str(os.getpid()) / path.name)
+
+
+def open_file_handler(log_file: str, max_bytes: int = 0, backup_count: int = 10) -> logging.Handler:
     Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+    if max_bytes <= 0:
+        return logging.FileHandler(log_file, mode='w')
+    # 按大小轮转, 旧文件 gzip 压缩为 <file>.1.gz ...
+    if os.path.exists(log_file):
+        os.remove(log_file)
+    handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count)
+    handler.namer = lambda name: name + '.gz'
+    handler.rotator = _gzip_rotator
+    return handler
+
+
+class AsyncFileHandler(logging.handlers.QueueHandler):
+    """
+    文件 handler 的异步前端: emit 只把 LogRecord 放入本进程的队列, 由 LogWriter 的后台线程格式化并写入文件.
+
+    消息中的参数(%s)也在后台线程格式化, 调用方可以把格式化代价高的对象作为参数传入.
+    """
+    def __init__(self, log_file: str, level: int, formatter: logging.Formatter, max_bytes: int = 0):
+        super().__init__(None)
+        self.log_file = log_file
+        self.max_bytes = max_bytes
+        self.setLevel(level)
+        self.target_formatter = formatter
+        # 本进程的日志文件, 由后台线程在写第一条日志时打开; fork 出的子进程中重置
+        self.target: Optional[logging.Handler] = None
+
+    def write(self, record: logging.LogRecord):
+        """在后台线程中调用"""
+        if self.target is None:
+            self.target = open_file_handler(process_log_file(self.log_file), self.max_bytes)
+            self.target.setFormatter(self.target_formatter)
+        self.target.handle(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 异常栈只在当前线程有效, 先格式化; 其余部分留给后台线程
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.target_formatter.formatException(record.exc_info)
+        record.log_target = self
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        log_writer.queue.put_nowait(record)
+
+
+class _TargetDispatcher(logging.Handler):
+    def handle(self, record: logging.LogRecord):
+        record.log_target.write(record)
+
+
+class LogWriter:
+    """每个进程一个后台线程, 写入所有 AsyncFileHandler 的文件"""
+    def __init__(self):
+        self.queue = queue.SimpleQueue()
+        self.handlers: List[AsyncFileHandler] = []
+        self.listener: Optional[logging.handlers.QueueListener] = None
+
+    def add(self, handler: AsyncFileHandler):
+        self.handlers.append(handler)
+        if self.listener is None:
+            self.listener = logging.handlers.QueueListener(self.queue, _TargetDispatcher())
+            self.listener.start()
+            atexit.register(self.stop)
+            self.register_finalizer()
+
+    def register_finalizer(self):
+        # 进程池的子进程退出时不执行 atexit, 由 multiprocessing 的 finalizer 写完剩余的日志
+        multiprocessing.util.Finalize(None, self.stop, exitpriority=10)
+
+    def flush(self):
+        """等待队列中已有的日志写完"""
+        if self.listener is not None:
+            self.stop()
+            self.listener = logging.handlers.QueueListener(self.queue, _TargetDispatcher())
+            self.listener.start()
+
+    def stop(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+            for handler in self.handlers:
+                if handler.target is not None:
+                    handler.target.flush()
+
+    def after_fork_in_child(self):
+        # 父进程的后台线程不会复制到子进程, 队列中父进程未写完的日志也不属于子进程
+        self.queue = queue.SimpleQueue()
+        self.listener = None
+        handlers, self.handlers = self.handlers, []
+        for handler in handlers:
+            handler.target = None
+            self.add(handler)
+
+
+log_writer = LogWriter()
+os.register_at_fork(after_in_child=log_writer.after_fork_in_child)
+# multiprocessing 的子进程启动时会清空 finalizer, 之后再注册
+multiprocessing.util.register_after_fork(log_writer, LogWriter.register_finalizer)
+
+
+def flush_logging():
+    log_writer.flush()
+
+
+def setup_file_handler(log_file: str, level: int = logging.DEBUG, file_formatter: Optional[str] = None, max_bytes: int = 0):
+    # logging.warning(f"setup_file_handler, log_file={log_file}, level={level}, file_formatter={file_formatter}")
 
     # 文件handler, 不带颜色
-    file_handler = logging.FileHandler(log_file, mode='w')
     if file_formatter is None:
         file_formatter = logging.Formatter(
             '[%(asctime)s.%(msecs)03d][%(levelname)s][%(name)s][%(filename)s:%(lineno)d][%(funcName)s][%(processName)s][%(process)d] %(message)s',
@@ -132,8 +260,8 @@ def setup_file_handler(log_file: str, level: int = logging.DEBUG, file_formatter
         )
     else:
         file_formatter = logging.Formatter(file_formatter)
-    file_handler.setFormatter(file_formatter)
-    file_handler.setLevel(level)
+    file_handler = AsyncFileHandler(log_file, level, file_formatter, max_bytes)
+    log_writer.add(file_handler)
     return file_handler
 
 @run_once
@@ -174,7 +302,8 @@ def setup_logging(logger_name: str, propagate=True, console_level: int = logging
             log_file = f"{logger_name}.log"
 
         # 文件handler, 不带颜色
-        file_handler = setup_file_handler(f"logs/{log_file}", file_level, file_formatter)
+        file_handler = setup_file_handler(f"logs/{log_file}", file_level, file_formatter,
+                                          int(config.log_rotate_mb * 1024 * 1024))
         logger.addHandler(file_handler)
 
         logger.setLevel(min(console_level, file_level))
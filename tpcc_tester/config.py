@@ -66,6 +66,35 @@ class Config:
     disable_logging: bool = False
     global_lock: bool = False
     output_file_on: bool = False
+    data_dir: str = 'data/tpcc_csv'
+    gen_data: bool = False
+    gen_workers: int = 1
+    load_mode: str = 'stream'
+    insert_batch: int = 500
+    load_workers: int = 1
+    defer_index: bool = False
+    duration: int = 0
+    warmup: int = 0
+    cooldown: int = 0
+    report_interval: float = 1.0
+    raw_records: bool = False
+    terminals: int = 1
+    prepared_statements: bool = False
+    stored_procedures: bool = False
+    pipeline: bool = False
+    log_rotate_mb: float = 0
+    capture: str = ''
+    replay: str = ''
+    replay_connections: int = 0
+    replay_speed: float = 1.0
+    profile_sql: int = 0
+    phase_breakdown: bool = False
+    profile: bool = False
+    reconnect_retries: int = 5
+    reconnect_backoff: float = 0.1
+    input_file: str = ''
+    input_txns: int = 0
+    records: str = 'result/records_all'
 
     CNT_W = warehouse
     CNT_ITEM = 100000
@@ -91,15 +120,44 @@ class Config:
         parser.add_argument('-a', '--analyze', action='store_true', help='Enable analyze mode')
         parser.add_argument('-n', '--no-validate', action='store_true', help='Disable consistency check')
         parser.add_argument('-c', '--clean', action='store_true', help='Clean database(execlude with other options)')
-        parser.add_argument('--rw', type=int, help='Read write transaction phase time')
-        parser.add_argument('--ro', type=int, help='Read only transaction phase time')
+        parser.add_argument('--rw', type=int, help='Read write transaction count (split across threads)')
+        parser.add_argument('--ro', type=int, help='Read only transaction count (split across threads)')
+        parser.add_argument('--duration', type=int, default=0, help='Measurement window in seconds (run by time instead of --rw/--ro)')
+        parser.add_argument('--warmup', type=int, default=0, help='Seconds to run before the measurement window')
+        parser.add_argument('--terminals', type=int, default=1, help='Concurrent terminals per process (asyncio, rmdb only)')
+        parser.add_argument('--raw-records', action='store_true', help='Keep every transaction record and save them (analyze mode)')
+        parser.add_argument('--report-interval', type=float, default=1.0, help='Seconds between live throughput lines (0 to disable)')
+        parser.add_argument('--cooldown', type=int, default=0, help='Seconds to run after the measurement window')
         parser.add_argument('-t', '--thread', type=int, help='Thread number')
         parser.add_argument('-ct', '--client', type=str, default='rmdb', choices=['rmdb', 'mysql', 'slt', 'sql'], help='Client type')
         parser.add_argument('-s', '--seed', type=int, default=42, help='Random seed')
         parser.add_argument('-w', '--warehouse', type=int, default=50, help='Warehouse number')
         parser.add_argument('-l', '--disable-logging', action='store_true', help='Disable logging')
+        parser.add_argument('--log-rotate-mb', type=float, default=0, help='Rotate and gzip log files larger than this size in MB (0 to disable)')
         parser.add_argument('-g', '--global-lock', action='store_true', help='Enable global lock (at most one send_cmd at a time)')
         parser.add_argument('-o', '--output-file-on', action='store_true', help='Enable output file on')
+        parser.add_argument('--data-dir', type=str, default='data/tpcc_csv', help='Directory of generated csv data')
+        parser.add_argument('--gen-data', action='store_true', help='Regenerate csv data even if it already exists')
+        parser.add_argument('--gen-workers', type=int, default=1, help='Process number for data generation')
+        parser.add_argument('--load-mode', type=str, default='stream', choices=['stream', 'csv'], help='Stream generated rows to the server, or load generated csv files')
+        parser.add_argument('--load-workers', type=int, default=1, help='Concurrent connections for stream loading')
+        parser.add_argument('--defer-index', action='store_true', help='Create indexes after loading data')
+        parser.add_argument('--prepared-statements', action='store_true', help='Execute statements as server-side prepared statements (mysql only)')
+        parser.add_argument('--stored-procedures', action='store_true', help='Run each transaction as a single stored procedure CALL (mysql only)')
+        parser.add_argument('--pipeline', action='store_true', help='Send independent reads of a transaction back-to-back (rmdb)')
+        parser.add_argument('--profile-sql', type=int, default=0, help='Time every statement per template and print the top N templates (requires --analyze)')
+        parser.add_argument('--phase-breakdown', action='store_true', help='Break transaction time into driver phases and client render/send/wait/parse/log (requires --analyze)')
+        parser.add_argument('--profile', action='store_true', help='Profile CPU (pyinstrument if installed, else cProfile) and memory (tracemalloc) of every test worker')
+        parser.add_argument('--reconnect-retries', type=int, default=5, help='Reconnect attempts (exponential backoff) before giving up on a lost connection')
+        parser.add_argument('--reconnect-backoff', type=float, default=0.1, help='Seconds before the first reconnect attempt, doubled after each failure')
+        parser.add_argument('--input-file', type=str, default='', help='Pre-generated transaction inputs (.npz); generated first if the file does not exist')
+        parser.add_argument('--input-txns', type=int, default=0, help='Transactions to generate into --input-file (default: --rw)')
+        parser.add_argument('--records', type=str, default='', help='Raw records saved by --raw-records to analyze (python -m tpcc_tester.record)')
+        parser.add_argument('--capture', type=str, default='', help='Capture every statement of the test phase into this directory (JSONL)')
+        parser.add_argument('--replay', type=str, default='', help='Capture directory to replay (replay.py)')
+        parser.add_argument('--replay-connections', type=int, default=0, help='Concurrent replay connections (0: as captured)')
+        parser.add_argument('--replay-speed', type=float, default=1.0, help='Replay speed relative to the capture (0: as fast as possible)')
+        parser.add_argument('--insert-batch', type=int, default=500, help='Rows per INSERT statement in stream mode (1 for servers without multi-row insert)')
 
         from tpcc_tester.client.base import ClientType
 
@@ -117,6 +175,35 @@ class Config:
         self.disable_logging: bool = args.disable_logging or self.disable_logging
         self.global_lock: bool = args.global_lock or self.global_lock
         self.output_file_on: bool = args.output_file_on or self.output_file_on
+        self.data_dir: str = args.data_dir or self.data_dir
+        self.gen_data: bool = args.gen_data or self.gen_data
+        self.gen_workers: int = args.gen_workers or self.gen_workers
+        self.load_mode: str = args.load_mode or self.load_mode
+        self.insert_batch: int = args.insert_batch or self.insert_batch
+        self.load_workers: int = args.load_workers or self.load_workers
+        self.defer_index: bool = args.defer_index or self.defer_index
+        self.duration: int = args.duration or self.duration
+        self.warmup: int = args.warmup or self.warmup
+        self.cooldown: int = args.cooldown or self.cooldown
+        self.report_interval: float = args.report_interval
+        self.raw_records: bool = args.raw_records or self.raw_records
+        self.terminals: int = args.terminals or self.terminals
+        self.prepared_statements: bool = args.prepared_statements or self.prepared_statements
+        self.stored_procedures: bool = args.stored_procedures or self.stored_procedures
+        self.pipeline: bool = args.pipeline or self.pipeline
+        self.log_rotate_mb: float = args.log_rotate_mb or self.log_rotate_mb
+        self.profile_sql: int = args.profile_sql or self.profile_sql
+        self.phase_breakdown: bool = args.phase_breakdown or self.phase_breakdown
+        self.profile: bool = args.profile or self.profile
+        self.reconnect_retries: int = args.reconnect_retries
+        self.reconnect_backoff: float = args.reconnect_backoff or self.reconnect_backoff
+        self.input_file: str = args.input_file or self.input_file
+        self.input_txns: int = args.input_txns or self.input_txns
+        self.records: str = args.records or self.records
+        self.capture: str = args.capture or self.capture
+        self.replay: str = args.replay or self.replay
+        self.replay_connections: int = args.replay_connections or self.replay_connections
+        self.replay_speed: float = args.replay_speed
 
         self.CNT_W = self.warehouse
         self.CNT_ITEM = 100000
@@ -126,6 +213,7 @@ class Config:
         self.CNT_HISTORY = self.CNT_W * 10 * 3000
         self.CNT_ORDERS = self.CNT_W * 10 * 3000
         self.CNT_NEW_ORDERS = self.CNT_W * 10 * 900
+        # o_ol_cnt 平均为 10, 仅为估计值; 实际行数为 sum(o_ol_cnt)
         self.CNT_ORDER_LINE = self.CNT_ORDERS * 10
 
         self.W_ID_MAX = self.CNT_W + 1
@@ -0,0 +1,10 @@
+from .generator import TpccDataGenerator, TableChunk, csv_header, generate_csvs
+from .input_stream import TxnInputStream
+
+__all__ = [
+    'TpccDataGenerator',
+    'TableChunk',
+    'csv_header',
+    'generate_csvs',
+    'TxnInputStream',
+]
@@ -0,0 +1,16 @@
+# python -m tpcc_tester.datagen --warehouse 50 --data-dir data/tpcc_csv
+import time
+
+from tpcc_tester.config import get_config
+from tpcc_tester.datagen.generator import generate_csvs
+
+
+def main():
+    config = get_config()
+    t1 = time.time()
+    csv_files = generate_csvs(config.data_dir, config.warehouse, config.seed, force=True, workers=config.gen_workers)
+    print(f"generated {len(csv_files)} tables for {config.warehouse} warehouse(s) in {time.time() - t1:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,323 @@
+import json
+import shutil
+from concurrent.futures import ProcessPoolExecutor, Future
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from tpcc_tester.common import setup_logging
+from tpcc_tester.db.table_layouts import *
+from tpcc_tester.datagen.random_gen import *
+
+# 与 util.current_time 的起点一致; 所有初始数据使用同一个时间, 保证输出可复现
+LOAD_TIME = b'2024-01-01 12:00:00'
+# TPC-C 4.3.3.1: o_ol_cnt 在 [5, 15] 内均匀分布, 平均 10 行 order_line
+OL_CNT_MIN = 5
+OL_CNT_MAX = 15
+# o_id < DELIVERED_O_ID 的订单已经发货, 其余 900 个订单同时出现在 new_orders 中
+DELIVERED_O_ID = 2101
+# item 表按块生成, 避免一次性构造 100000 行
+ITEM_CHUNK = 20000
+# 拼接 part 文件时的缓冲区大小
+COPY_BUFFER = 16 * 1024 * 1024
+
+_TABLE_INDEX = {table: i for i, table in enumerate(load_order)}
+
+
+@dataclass
+class TableChunk:
+    table: str
+    # 与 table_columns[table] 一一对应, 每列都是 bytes 数组
+    columns: List[np.ndarray]
+
+    @property
+    def rows(self) -> int:
+        return len(self.columns[0])
+
+    def to_csv(self) -> bytes:
+        lines = zip(*[col.tolist() for col in self.columns])
+        return b'\n'.join([b','.join(line) for line in lines]) + b'\n'
+
+
+def csv_header(table: str) -> bytes:
+    return ','.join([name for name, _ in table_columns[table]]).encode() + b'\n'
+
+
+class TpccDataGenerator:
+    """
+    按 TPC-C 4.3.3.1 生成9张表的初始数据.
+
+    每个 (表, 仓库, 块) 使用独立的随机流, 因此任意一块都可以单独生成, 且结果只取决于 seed.
+    """
+    def __init__(self, warehouses: int, seed: int = 42):
+        self.warehouses = warehouses
+        self.seed = seed
+        # TPC-C 2.1.6: C_LOAD 在一次装载中是常量
+        self.c_last_load = int(np.random.default_rng([seed]).integers(0, 256))
+        self.logger = setup_logging(f"{__name__}")
+
+    def _rng(self, table: str, w_id: int, part: int = 0) -> np.random.Generator:
+        return np.random.default_rng([self.seed, _TABLE_INDEX[table], w_id, part])
+
+    def ol_cnt(self, w_id: int) -> np.ndarray:
+        """仓库内每个订单的 o_ol_cnt (按 d_id, o_id 排列); orders 和 order_line 共用同一随机流"""
+        rng = self._rng(ORDERS, w_id, part=1)
+        return rng.integers(OL_CNT_MIN, OL_CNT_MAX + 1, size=population[DISTRICT] * population[CUSTOMER])
+
+    def shards(self, table: str) -> List[int]:
+        """表的分片: item 按 ITEM_CHUNK 行切分(全局表), 其余按仓库切分"""
+        if table == ITEM:
+            return list(range(1, population[ITEM] + 1, ITEM_CHUNK))
+        return list(range(1, self.warehouses + 1))
+
+    def shard(self, table: str, key: int) -> TableChunk:
+        if table == ITEM:
+            return self.item(key, min(key + ITEM_CHUNK, population[ITEM] + 1))
+        return getattr(self, table)(key)
+
+    def iter_table(self, table: str, keys: Optional[List[int]] = None) -> Iterator[TableChunk]:
+        for key in keys or self.shards(table):
+            yield self.shard(table, key)
+
+    def item(self, lower: int, upper: int) -> TableChunk:
+        n = upper - lower
+        rng = self._rng(ITEM, 0, lower)
+        return TableChunk(ITEM, [
+            seq(lower, upper),
+            rng.integers(1, 10001, size=n).astype('S'),
+            rand_str(rng, n, 14, 25),
+            rand_decimal(rng, n, 1.00, 100.00),
+            rand_dat(rng, n, 26, 51),
+        ])
+
+    def warehouse(self, w_id: int) -> TableChunk:
+        rng = self._rng(WAREHOUSE, w_id)
+        return TableChunk(WAREHOUSE, [
+            seq(w_id, w_id + 1),
+            rand_str(rng, 1, 6, 11),
+            rand_str(rng, 1, 10, 21),
+            rand_str(rng, 1, 10, 21),
+            rand_str(rng, 1, 10, 21),
+            rand_str(rng, 1, 2),
+            zip_code(rng, 1),
+            rand_decimal(rng, 1, 0.0, 0.2, places=4),
+            const(b'300000.00', 1),
+        ])
+
+    def stock(self, w_id: int) -> TableChunk:
+        n = population[STOCK]
+        rng = self._rng(STOCK, w_id)
+        return TableChunk(STOCK, [
+            seq(1, n + 1),
+            const(str(w_id).encode(), n),
+            rng.integers(10, 101, size=n).astype('S'),
+            *[rand_str(rng, n, 24) for _ in range(10)],
+            const(b'0.00', n),
+            const(b'0', n),
+            const(b'0', n),
+            rand_dat(rng, n, 26, 51),
+        ])
+
+    def district(self, w_id: int) -> TableChunk:
+        n = population[DISTRICT]
+        rng = self._rng(DISTRICT, w_id)
+        return TableChunk(DISTRICT, [
+            seq(1, n + 1),
+            const(str(w_id).encode(), n),
+            rand_str(rng, n, 6, 11),
+            rand_str(rng, n, 10, 21),
+            rand_str(rng, n, 10, 21),
+            rand_str(rng, n, 10, 21),
+            rand_str(rng, n, 2),
+            zip_code(rng, n),
+            rand_decimal(rng, n, 0.0, 0.2, places=4),
+            const(b'30000.00', n),
+            const(str(population[CUSTOMER] + 1).encode(), n),
+        ])
+
+    def customer(self, w_id: int) -> TableChunk:
+        n_c = population[CUSTOMER]
+        n = population[DISTRICT] * n_c
+        rng = self._rng(CUSTOMER, w_id)
+        c_id = np.tile(np.arange(1, n_c + 1), population[DISTRICT])
+        # TPC-C 4.3.2.3: 前1000个客户的 last name 按编号生成, 其余按 NURand
+        k = np.where(c_id <= 1000, c_id - 1, NURand(rng, n, 255, 0, 999, self.c_last_load))
+        return TableChunk(CUSTOMER, [
+            c_id.astype('S'),
+            np.repeat(np.arange(1, population[DISTRICT] + 1), n_c).astype('S'),
+            const(str(w_id).encode(), n),
+            rand_str(rng, n, 8, 17),
+            const(b'OE', n),
+            c_last(k),
+            rand_str(rng, n, 10, 21),
+            rand_str(rng, n, 10, 21),
+            rand_str(rng, n, 10, 21),
+            rand_str(rng, n, 2),
+            zip_code(rng, n),
+            rand_digit(rng, n, 16),
+            const(LOAD_TIME, n),
+            np.where(rng.random(n) < 0.1, b'BC', b'GC'),
+            const(b'50000.00', n),
+            rand_decimal(rng, n, 0.0, 0.5, places=4),
+            const(b'-10.00', n),
+            const(b'10.00', n),
+            const(b'1', n),
+            const(b'0', n),
+            rand_str(rng, n, 26, 51),
+        ])
+
+    def history(self, w_id: int) -> TableChunk:
+        n_c = population[CUSTOMER]
+        n = population[DISTRICT] * n_c
+        rng = self._rng(HISTORY, w_id)
+        d_id = np.repeat(np.arange(1, population[DISTRICT] + 1), n_c).astype('S')
+        w = const(str(w_id).encode(), n)
+        return TableChunk(HISTORY, [
+            np.tile(np.arange(1, n_c + 1), population[DISTRICT]).astype('S'),
+            d_id,
+            w,
+            d_id,
+            w,
+            const(LOAD_TIME, n),
+            const(b'10.00', n),
+            rand_str(rng, n, 12, 25),
+        ])
+
+    def orders(self, w_id: int) -> TableChunk:
+        n_o = population[CUSTOMER]
+        n = population[DISTRICT] * n_o
+        rng = self._rng(ORDERS, w_id)
+        o_id = np.tile(np.arange(1, n_o + 1), population[DISTRICT])
+        # 每个地区的 o_c_id 是 1..3000 的一个随机排列
+        o_c_id = np.argsort(rng.random((population[DISTRICT], n_o)), axis=1).ravel() + 1
+        carrier = np.where(o_id < DELIVERED_O_ID, rng.integers(1, 11, size=n), 0)
+        return TableChunk(ORDERS, [
+            o_id.astype('S'),
+            np.repeat(np.arange(1, population[DISTRICT] + 1), n_o).astype('S'),
+            const(str(w_id).encode(), n),
+            o_c_id.astype('S'),
+            const(LOAD_TIME, n),
+            carrier.astype('S'),
+            self.ol_cnt(w_id).astype('S'),
+            const(b'1', n),
+        ])
+
+    def new_orders(self, w_id: int) -> TableChunk:
+        n_no = population[CUSTOMER] - DELIVERED_O_ID + 1
+        n = population[DISTRICT] * n_no
+        return TableChunk(NEW_ORDERS, [
+            np.tile(np.arange(DELIVERED_O_ID, population[CUSTOMER] + 1), population[DISTRICT]).astype('S'),
+            np.repeat(np.arange(1, population[DISTRICT] + 1), n_no).astype('S'),
+            const(str(w_id).encode(), n),
+        ])
+
+    def order_line(self, w_id: int) -> TableChunk:
+        n_o = population[CUSTOMER]
+        ol_cnt = self.ol_cnt(w_id)
+        n = int(ol_cnt.sum())
+        rng = self._rng(ORDER_LINE, w_id)
+        o_id = np.repeat(np.tile(np.arange(1, n_o + 1), population[DISTRICT]), ol_cnt)
+        # 每个订单内 ol_number 从 1 开始编号
+        ol_number = np.arange(n) - np.repeat(np.cumsum(ol_cnt) - ol_cnt, ol_cnt) + 1
+        delivered = o_id < DELIVERED_O_ID
+        amount = np.where(delivered, 0, rng.integers(1, 1000000, size=n))
+        return TableChunk(ORDER_LINE, [
+            o_id.astype('S'),
+            np.repeat(np.repeat(np.arange(1, population[DISTRICT] + 1), n_o), ol_cnt).astype('S'),
+            const(str(w_id).encode(), n),
+            ol_number.astype('S'),
+            rng.integers(1, population[ITEM] + 1, size=n).astype('S'),
+            const(str(w_id).encode(), n),
+            np.where(delivered, LOAD_TIME, b''),
+            const(b'5', n),
+            format_decimal(amount),
+            rand_str(rng, n, 24),
+        ])
+
+    def write_csv(self, table: str, csv_file: Path, header: bool = True) -> int:
+        rows = 0
+        with open(csv_file, 'wb') as f:
+            if header:
+                f.write(csv_header(table))
+            for chunk in self.iter_table(table):
+                f.write(chunk.to_csv())
+                rows += chunk.rows
+        return rows
+
+    def write_csvs(self, data_dir: str, header: bool = True, workers: int = 1) -> Dict[str, Path]:
+        """生成全部9张表的csv, 返回 表名 -> csv绝对路径"""
+        data_path = Path(data_dir).absolute()
+        data_path.mkdir(parents=True, exist_ok=True)
+        if workers > 1:
+            return self._write_csvs_parallel(data_path, header, workers)
+        csv_files = {}
+        for table in load_order:
+            csv_file = data_path / f"{table}.csv"
+            rows = self.write_csv(table, csv_file, header)
+            self.logger.info(f"generated {table}: {rows} rows -> {csv_file}")
+            csv_files[table] = csv_file
+        return csv_files
+
+    def _write_csvs_parallel(self, data_path: Path, header: bool, workers: int) -> Dict[str, Path]:
+        # 每个分片由子进程写成单独的 part 文件, 再按分片顺序拼接;
+        # 分片的随机流只取决于 (seed, 表, 分片), 所以结果与 workers 无关
+        futures: Dict[str, List[Future]] = {table: [] for table in load_order}
+        # 大表先提交, 减少最后的长尾
+        tables = sorted(load_order, key=lambda table: -num_of_rows(table))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for table in tables:
+                for key in self.shards(table):
+                    part_file = data_path / f"{table}.{key}.part"
+                    futures[table].append(executor.submit(_write_part, self.warehouses, self.seed, table, key, part_file))
+
+            csv_files = {}
+            for table in load_order:
+                csv_file = data_path / f"{table}.csv"
+                rows = 0
+                with open(csv_file, 'wb') as f:
+                    if header:
+                        f.write(csv_header(table))
+                    for future in futures[table]:
+                        part_file, part_rows = future.result()
+                        with open(part_file, 'rb') as part:
+                            shutil.copyfileobj(part, f, COPY_BUFFER)
+                        part_file.unlink()
+                        rows += part_rows
+                self.logger.info(f"generated {table}: {rows} rows -> {csv_file}")
+                csv_files[table] = csv_file
+        return csv_files
+
+
+def num_of_rows(table: str) -> int:
+    """每个仓库(item 为全表)的行数"""
+    return {ITEM: population[ITEM],
+            WAREHOUSE: 1,
+            STOCK: population[STOCK],
+            DISTRICT: population[DISTRICT],
+            NEW_ORDERS: population[DISTRICT] * (population[CUSTOMER] - DELIVERED_O_ID + 1),
+            ORDER_LINE: population[DISTRICT] * population[CUSTOMER] * (OL_CNT_MIN + OL_CNT_MAX) // 2}.get(
+                table, population[DISTRICT] * population[CUSTOMER])
+
+
+def _write_part(warehouses: int, seed: int, table: str, key: int, part_file: Path) -> Tuple[Path, int]:
+    chunk = TpccDataGenerator(warehouses, seed).shard(table, key)
+    with open(part_file, 'wb') as f:
+        f.write(chunk.to_csv())
+    return part_file, chunk.rows
+
+
+def generate_csvs(data_dir: str, warehouses: int, seed: int = 42, force: bool = False, workers: int = 1) -> Dict[str, Path]:
+    """生成(或复用已生成的)csv; 只有仓库数和种子都相同时才复用"""
+    data_path = Path(data_dir).absolute()
+    meta_file = data_path / 'meta.json'
+    meta = {'warehouse': warehouses, 'seed': seed}
+    csv_files = {table: data_path / f"{table}.csv" for table in load_order}
+    if not force and meta_file.exists() and json.loads(meta_file.read_text()) == meta \
+            and all(csv_file.exists() for csv_file in csv_files.values()):
+        return csv_files
+    meta_file.unlink(missing_ok=True)
+    csv_files = TpccDataGenerator(warehouses, seed).write_csvs(data_dir, workers=workers)
+    meta_file.write_text(json.dumps(meta))
+    return csv_files
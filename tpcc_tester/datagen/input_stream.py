@@ -0,0 +1,113 @@
+from pathlib import Path
+from typing import Iterator, Sequence, Tuple
+
+import numpy as np
+
+from tpcc_tester.datagen.random_gen import NURand, c_last
+from tpcc_tester.record.process_record import TpccTransactionType
+
+# 事务输入流: 一次用 numpy 生成 n 个事务的全部随机输入, 与 TpccDriver.txn_args 的分布相同.
+# 每个事务一行的列 + order_line 的扁平列(ol_offset 为每个事务在扁平列中的起点, 与 CSR 相同),
+# 保存为 .npz, 同一个文件可以分别在 RMDB 和 MySQL 上运行, 两边执行完全相同的事务序列.
+
+_COLUMNS = ('txn', 'w_id', 'd_id', 'c_id', 'by_last', 'c_last', 'c_w_id', 'c_d_id',
+            'h_amount', 'o_carrier_id', 'threshold', 'ol_offset', 'ol_i_id', 'ol_supply_w_id', 'ol_quantity')
+
+
+def _other_warehouse(rng: np.random.Generator, home: np.ndarray, scale: int) -> np.ndarray:
+    """在 home 以外的仓库中均匀选择一个, scale 为 1 时返回 home"""
+    if scale == 1:
+        return home.copy()
+    other = rng.integers(1, scale, size=len(home))
+    return other + (other >= home)
+
+
+class TxnInputStream:
+    def __init__(self, arrays: dict):
+        self.arrays = arrays
+        # 运行时只做下标访问: 预先转换为 python 对象, 避免每个事务转换 numpy 标量
+        self._rows = {name: arrays[name].tolist() for name in _COLUMNS if name != 'c_last'}
+        self._rows['c_last'] = [name.decode() for name in arrays['c_last'].tolist()]
+
+    def __len__(self) -> int:
+        return len(self.arrays['txn'])
+
+    @staticmethod
+    def generate(n: int, txn_prob: Sequence[float], scale: int, seed: int,
+                 C_LAST: int, C_ID: int, C_OL_I_ID: int) -> 'TxnInputStream':
+        """C_* 为运行时常量(TPC-C 2.1.6), 与 util.C_*_RUN 的含义相同"""
+        rng = np.random.default_rng(seed)
+        prob = np.asarray(txn_prob, dtype=float)
+        txn = rng.choice(len(prob), size=n, p=prob / prob.sum()).astype(np.int8)
+        w_id = rng.integers(1, scale + 1, size=n)
+        d_id = rng.integers(1, 11, size=n)
+        c_id = NURand(rng, n, 1023, 1, 3000, C_ID)
+        # OrderStatus 60% 按 last name 查询, Payment 按 id 查询(与 query_cus_by(True) 一致)
+        by_last = (rng.integers(0, 100, size=n) < 60) & (txn == TpccTransactionType.OrderStatus.value)
+        last = c_last(NURand(rng, n, 255, 0, 999, C_LAST))
+        # Payment: 85% 为本地客户
+        remote = (rng.integers(0, 100, size=n) >= 85) & (scale > 1)
+        c_w_id = np.where(remote, _other_warehouse(rng, w_id, scale), w_id)
+        c_d_id = np.where(remote, rng.integers(1, 11, size=n), d_id)
+        h_amount = rng.integers(100, 500_001, size=n) / 100
+        o_carrier_id = rng.integers(1, 11, size=n)
+        threshold = rng.integers(10, 100, size=n)
+
+        ol_cnt = np.where(txn == TpccTransactionType.NewOrder.value, rng.integers(5, 16, size=n), 0)
+        ol_offset = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(ol_cnt, out=ol_offset[1:])
+        lines = int(ol_offset[-1])
+        ol_w_id = np.repeat(w_id, ol_cnt)
+        # 1% 的订单行由其他仓库供货
+        ol_remote = (rng.integers(0, 100, size=lines) == 0) & (scale > 1)
+        return TxnInputStream({
+            'txn': txn, 'w_id': w_id, 'd_id': d_id, 'c_id': c_id, 'by_last': by_last, 'c_last': last,
+            'c_w_id': c_w_id, 'c_d_id': c_d_id, 'h_amount': h_amount, 'o_carrier_id': o_carrier_id,
+            'threshold': threshold, 'ol_offset': ol_offset,
+            'ol_i_id': NURand(rng, lines, 8191, 1, 100000, C_OL_I_ID),
+            'ol_supply_w_id': np.where(ol_remote, _other_warehouse(rng, ol_w_id, scale), ol_w_id),
+            'ol_quantity': rng.integers(1, 11, size=lines),
+        })
+
+    def save(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            np.savez(f, **self.arrays)
+
+    @staticmethod
+    def load(path: str) -> 'TxnInputStream':
+        with np.load(path) as data:
+            return TxnInputStream({name: data[name] for name in _COLUMNS})
+
+    def shard(self, index: int, count: int) -> 'TxnInputStream':
+        """按事务连续切分为 count 段, 返回第 index 段(从 0 开始)"""
+        n = len(self)
+        lo, hi = n * index // count, n * (index + 1) // count
+        ol_lo, ol_hi = self.arrays['ol_offset'][lo], self.arrays['ol_offset'][hi]
+        arrays = {name: self.arrays[name][lo:hi] for name in _COLUMNS if not name.startswith('ol_')}
+        arrays['ol_offset'] = self.arrays['ol_offset'][lo:hi + 1] - ol_lo
+        for name in ('ol_i_id', 'ol_supply_w_id', 'ol_quantity'):
+            arrays[name] = self.arrays[name][ol_lo:ol_hi]
+        return TxnInputStream(arrays)
+
+    def args(self, i: int) -> Tuple[TpccTransactionType, tuple]:
+        """第 i 个事务的类型和参数, 参数顺序与 TpccDriver.txn_args 相同"""
+        rows = self._rows
+        txn = TpccTransactionType(rows['txn'][i])
+        w_id, d_id = rows['w_id'][i], rows['d_id'][i]
+        if txn == TpccTransactionType.NewOrder:
+            lo, hi = rows['ol_offset'][i], rows['ol_offset'][i + 1]
+            return txn, (w_id, d_id, rows['c_id'][i], rows['ol_i_id'][lo:hi],
+                         rows['ol_supply_w_id'][lo:hi], rows['ol_quantity'][lo:hi])
+        elif txn == TpccTransactionType.Payment:
+            return txn, (w_id, d_id, rows['c_w_id'][i], rows['c_d_id'][i], rows['c_id'][i], rows['h_amount'][i])
+        elif txn == TpccTransactionType.Delivery:
+            return txn, (w_id, rows['o_carrier_id'][i])
+        elif txn == TpccTransactionType.OrderStatus:
+            return txn, (w_id, d_id, rows['c_last'][i] if rows['by_last'][i] else rows['c_id'][i])
+        else:
+            return txn, (w_id, d_id, rows['threshold'][i])
+
+    def __iter__(self) -> Iterator[Tuple[TpccTransactionType, tuple]]:
+        for i in range(len(self)):
+            yield self.args(i)
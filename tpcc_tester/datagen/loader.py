@@ -0,0 +1,171 @@
+import errno
+import os
+import shutil
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from tpcc_tester.client.base import DBClient
+from tpcc_tester.common import setup_logging
+from tpcc_tester.db.table_layouts import *
+from tpcc_tester.datagen.generator import TpccDataGenerator, TableChunk
+
+
+@dataclass
+class TableLoadStat:
+    table: str
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+def report_load_stats(stats: List[TableLoadStat], total_time: float):
+    """按表输出导入行数和速度, 以及总导入时间"""
+    df = pd.DataFrame([{'table': stat.table,
+                        'rows': stat.rows,
+                        'time(s)': round(stat.seconds, 2),
+                        'rows/s': round(stat.rows_per_second)} for stat in stats])
+    print(df.to_string(index=False))
+    print(f"total rows: {sum(stat.rows for stat in stats)}, total load time: {total_time:.2f}s")
+
+
+class StreamLoader(ABC):
+    """边生成边发送: 数据块直接进入数据库连接, 不经过中间csv文件"""
+    def __init__(self, client: DBClient, generator: TpccDataGenerator):
+        self.client = client
+        self.generator = generator
+        self.logger = setup_logging(f"{__name__}")
+
+    @abstractmethod
+    def load_table(self, table: str, keys: Optional[List[int]] = None) -> int:
+        pass
+
+    def load(self, tables: Optional[List[str]] = None) -> List[TableLoadStat]:
+        stats = []
+        # 批量语句很大, 不写入sql日志
+        with self.client.without_record():
+            for table in tables or load_order:
+                t1 = time.time()
+                rows = self.load_table(table)
+                stats.append(TableLoadStat(table, rows, time.time() - t1))
+                self.logger.info(f"loaded {table}: {rows} rows in {stats[-1].seconds:.2f}s")
+        return stats
+
+
+class InsertStreamLoader(StreamLoader):
+    """
+    多行 INSERT ... VALUES (...),(...) 批量发送.
+
+    不依赖服务器的 load 命令和客户端本地文件, 适用于任何能执行 INSERT 的服务器;
+    batch_rows=1 时退化为逐行 INSERT, 用于不支持多行 VALUES 的服务器.
+    """
+    def __init__(self, client: DBClient, generator: TpccDataGenerator, batch_rows: int = 500):
+        super().__init__(client, generator)
+        self.batch_rows = batch_rows
+
+    @staticmethod
+    def render_values(chunk: TableChunk) -> List[bytes]:
+        """每行渲染成 b'(v1,v2,...)', char 列加单引号"""
+        columns = []
+        for (_, col_type), col in zip(table_columns[chunk.table], chunk.columns):
+            if col_type == CHAR:
+                col = np.char.add(np.char.add(b"'", col), b"'")
+            columns.append(col.tolist())
+        return [b'(' + b','.join(row) + b')' for row in zip(*columns)]
+
+    def iter_statements(self, table: str, keys: Optional[List[int]] = None) -> Iterator[tuple[str, int]]:
+        prefix = f"insert into {table} values ".encode()
+        for chunk in self.generator.iter_table(table, keys):
+            values = self.render_values(chunk)
+            for i in range(0, len(values), self.batch_rows):
+                batch = values[i:i + self.batch_rows]
+                yield (prefix + b','.join(batch) + b';').decode(), len(batch)
+
+    def load_table(self, table: str, keys: Optional[List[int]] = None) -> int:
+        rows = 0
+        for sql, batch_rows in self.iter_statements(table, keys):
+            self.client.send_dml(sql).ok_or_throw()
+            rows += batch_rows
+        return rows
+
+
+class FifoBuffer:
+    """
+    命名管道: 后台线程把数据块写入管道, 读端直接从内存读取.
+
+    用于 LOAD DATA LOCAL INFILE, 客户端驱动按文件名打开的是管道而不是磁盘文件.
+    生成数据时的异常会让读端提前读到 EOF, 所以保存下来在退出 with 时重新抛出, 不把不完整的表当作成功.
+    """
+    def __init__(self, chunks: Iterable[bytes]):
+        self.dir = tempfile.mkdtemp(prefix='tpcc_')
+        self.path = os.path.join(self.dir, 'stream.csv')
+        os.mkfifo(self.path)
+        self.stop = threading.Event()
+        self.error: Optional[BaseException] = None
+        self.thread = threading.Thread(target=self._feed, args=(chunks,), daemon=True)
+
+    def _open_writer(self) -> Optional[int]:
+        # 非阻塞地等待读端打开(没有读端时 open 返回 ENXIO);
+        # 语句在读文件前就失败时读端永远不会打开, 由 stop 事件让写线程退出
+        while not self.stop.is_set():
+            try:
+                fd = os.open(self.path, os.O_WRONLY | os.O_NONBLOCK)
+            except OSError as e:
+                if e.errno != errno.ENXIO:
+                    raise
+                time.sleep(0.01)
+                continue
+            os.set_blocking(fd, True)
+            return fd
+        return None
+
+    def _feed(self, chunks: Iterable[bytes]):
+        try:
+            fd = self._open_writer()
+            if fd is None:
+                return
+            with open(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        except BrokenPipeError:
+            # 读端提前关闭(语句执行失败)
+            pass
+        except BaseException as e:
+            self.error = e
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        self.thread.join()
+        shutil.rmtree(self.dir, ignore_errors=True)
+        if self.error is not None:
+            raise self.error
+
+
+class LocalInfileStreamLoader(StreamLoader):
+    """MySQL: LOAD DATA LOCAL INFILE, 数据来自内存中的命名管道"""
+    def load_table(self, table: str, keys: Optional[List[int]] = None) -> int:
+        rows = 0
+
+        def chunks():
+            nonlocal rows
+            for chunk in self.generator.iter_table(table, keys):
+                rows += chunk.rows
+                yield chunk.to_csv()
+
+        with FifoBuffer(chunks()) as fifo:
+            self.client.send_dml(f"load data local infile '{fifo.path}' into table {table} "
+                                 "fields terminated by ',' lines terminated by '\\n';").ok_or_throw()
+        return rows
@@ -0,0 +1,83 @@
+import string
+
+import numpy as np
+
+# util.py 的向量化版本: 一次生成一整列, 而不是逐字符 random.choice
+# 字符串列统一使用 numpy 的定长 bytes (dtype 'S'), 尾部的 \0 会被 numpy 自动去掉
+
+_LETTERS = np.frombuffer(string.ascii_letters.encode(), dtype=np.uint8)
+_DIGITS = np.frombuffer(string.digits.encode(), dtype=np.uint8)
+_NAMES = np.frombuffer(b''.join([b'BARR', b'OUGH', b'ABLE', b'PRII', b'PRES', b'ESEE', b'ANTI', b'CALL', b'ATIO', b'EING']),
+                       dtype=np.uint8).reshape(10, 4)
+_ORIGINAL = np.frombuffer(b'ORIGINAL', dtype=np.uint8)
+_FRAC = {places: np.array([str(i).zfill(places).encode() for i in range(10 ** places)]) for places in (2, 4)}
+
+
+def _rand_chars(rng: np.random.Generator, n: int, lower: int, upper: int, alphabet: np.ndarray):
+    """返回 (n, upper - 1) 的字符矩阵和每行的长度, 长度之外的位置为 0"""
+    if upper == 0:
+        upper = lower + 1
+    width = upper - 1
+    chars = alphabet[rng.integers(0, len(alphabet), size=(n, width))]
+    lengths = np.full(n, width) if upper - lower == 1 else rng.integers(lower, upper, size=n)
+    chars[np.arange(width) >= lengths[:, None]] = 0
+    return chars, lengths
+
+
+def _to_bytes(chars: np.ndarray) -> np.ndarray:
+    return np.ascontiguousarray(chars).view(f'S{chars.shape[1]}').ravel()
+
+
+def rand_str(rng: np.random.Generator, n: int, lower: int, upper: int = 0) -> np.ndarray:
+    chars, _ = _rand_chars(rng, n, lower, upper, _LETTERS)
+    return _to_bytes(chars)
+
+
+def rand_dat(rng: np.random.Generator, n: int, lower: int, upper: int) -> np.ndarray:
+    """TPC-C 4.3.3.1: 10% 的行在随机位置包含 'ORIGINAL'"""
+    chars, lengths = _rand_chars(rng, n, lower, upper, _LETTERS)
+    rows = np.flatnonzero(rng.random(n) < 0.1)
+    pos = rng.integers(0, lengths[rows] - len(_ORIGINAL) + 1)
+    chars[rows[:, None], pos[:, None] + np.arange(len(_ORIGINAL))] = _ORIGINAL
+    return _to_bytes(chars)
+
+
+def rand_digit(rng: np.random.Generator, n: int, num: int) -> np.ndarray:
+    chars, _ = _rand_chars(rng, n, num, 0, _DIGITS)
+    return _to_bytes(chars)
+
+
+def zip_code(rng: np.random.Generator, n: int) -> np.ndarray:
+    return np.char.add(rand_digit(rng, n, 4), b'11111')
+
+
+def NURand(rng: np.random.Generator, n: int, A: int, x: int, y: int, C: int) -> np.ndarray:
+    return ((rng.integers(0, A + 1, size=n) | rng.integers(x, y + 1, size=n)) + C) % (y - x + 1) + x
+
+
+def c_last(k: np.ndarray) -> np.ndarray:
+    """k in [0, 999], 与 util.get_c_last 的拼接规则相同"""
+    chars = np.concatenate([_NAMES[k // 100], _NAMES[(k // 10) % 10], _NAMES[k % 10]], axis=1)
+    return _to_bytes(chars)
+
+
+def rand_decimal(rng: np.random.Generator, n: int, lower: float, upper: float, places: int = 2) -> np.ndarray:
+    """[lower, upper] 内精确到 places 位小数的均匀分布, 直接格式化为 bytes"""
+    scale = 10 ** places
+    values = rng.integers(round(lower * scale), round(upper * scale) + 1, size=n)
+    return format_decimal(values, places)
+
+
+def format_decimal(values: np.ndarray, places: int = 2) -> np.ndarray:
+    """values 为非负的定点整数 (实际值 * 10^places)"""
+    scale = 10 ** places
+    return np.char.add(np.char.add((values // scale).astype('S'), b'.'), _FRAC[places][values % scale])
+
+
+def const(value: bytes, n: int) -> np.ndarray:
+    return np.full(n, value)
+
+
+def seq(lower: int, upper: int) -> np.ndarray:
+    """[lower, upper) 的整数列"""
+    return np.arange(lower, upper).astype('S')
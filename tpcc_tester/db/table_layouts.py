@@ -76,6 +76,7 @@ H_C_W_ID = 'h_c_w_id'
 H_D_ID = 'h_d_id'
 H_W_ID = 'h_w_id'
 H_DATE = 'h_date'
+H_DATETIME = 'h_datetime'
 H_AMOUNT = 'h_amount'
 H_DATA = 'h_data'
 
@@ -171,3 +172,38 @@ population = {ITEM: 100000,
               STOCK: 100000,
               CUSTOMER: 3000,
               DISTRICT: 10}
+
+# 与 db/create_tables.sql 中的列顺序和类型一致
+INT = 'int'
+FLOAT = 'float'
+CHAR = 'char'
+
+table_columns = {WAREHOUSE: [(W_ID, INT), (W_NAME, CHAR), (W_STREET_1, CHAR), (W_STREET_2, CHAR), (W_CITY, CHAR),
+                             (W_STATE, CHAR), (W_ZIP, CHAR), (W_TAX, FLOAT), (W_YTD, FLOAT)],
+                 ITEM: [(I_ID, INT), (I_IM_ID, INT), (I_NAME, CHAR), (I_PRICE, FLOAT), (I_DATA, CHAR)],
+                 STOCK: [(S_I_ID, INT), (S_W_ID, INT), (S_QUANTITY, INT),
+                         (S_DIST_01, CHAR), (S_DIST_02, CHAR), (S_DIST_03, CHAR), (S_DIST_04, CHAR), (S_DIST_05, CHAR),
+                         (S_DIST_06, CHAR), (S_DIST_07, CHAR), (S_DIST_08, CHAR), (S_DIST_09, CHAR), (S_DIST_10, CHAR),
+                         (S_YTD, FLOAT), (S_ORDER_CNT, INT), (S_REMOTE_CNT, INT), (S_DATA, CHAR)],
+                 DISTRICT: [(D_ID, INT), (D_W_ID, INT), (D_NAME, CHAR), (D_STREET_1, CHAR), (D_STREET_2, CHAR),
+                            (D_CITY, CHAR), (D_STATE, CHAR), (D_ZIP, CHAR), (D_TAX, FLOAT), (D_YTD, FLOAT),
+                            (D_NEXT_O_ID, INT)],
+                 CUSTOMER: [(C_ID, INT), (C_D_ID, INT), (C_W_ID, INT), (C_FIRST, CHAR), (C_MIDDLE, CHAR), (C_LAST, CHAR),
+                            (C_STREET_1, CHAR), (C_STREET_2, CHAR), (C_CITY, CHAR), (C_STATE, CHAR), (C_ZIP, CHAR),
+                            (C_PHONE, CHAR), (C_SINCE, CHAR), (C_CREDIT, CHAR), (C_CREDIT_LIM, FLOAT),
+                            (C_DISCOUNT, FLOAT), (C_BALANCE, FLOAT), (C_YTD_PAYMENT, FLOAT), (C_PAYMENT_CNT, INT),
+                            (C_DELIVERY_CNT, INT), (C_DATA, CHAR)],
+                 HISTORY: [(H_C_ID, INT), (H_C_D_ID, INT), (H_C_W_ID, INT), (H_D_ID, INT), (H_W_ID, INT),
+                           (H_DATETIME, CHAR), (H_AMOUNT, FLOAT), (H_DATA, CHAR)],
+                 ORDERS: [(O_ID, INT), (O_D_ID, INT), (O_W_ID, INT), (O_C_ID, INT), (O_ENTRY_D, CHAR),
+                          (O_CARRIER_ID, INT), (O_OL_CNT, INT), (O_ALL_LOCAL, INT)],
+                 NEW_ORDERS: [(NO_O_ID, INT), (NO_D_ID, INT), (NO_W_ID, INT)],
+                 ORDER_LINE: [(OL_O_ID, INT), (OL_D_ID, INT), (OL_W_ID, INT), (OL_NUMBER, INT), (OL_I_ID, INT),
+                              (OL_SUPPLY_W_ID, INT), (OL_DELIVERY_D, CHAR), (OL_QUANTITY, INT), (OL_AMOUNT, FLOAT),
+                              (OL_DIST_INFO, CHAR)]}
+
+# 导入顺序与原 load_csvs.sql 一致
+load_order = [WAREHOUSE, ITEM, STOCK, DISTRICT, CUSTOMER, HISTORY, ORDERS, NEW_ORDERS, ORDER_LINE]
+
+# 列名 -> 类型, 各表的列名带表前缀, 不会重复
+column_types = {col: col_type for columns in table_columns.values() for col, col_type in columns}
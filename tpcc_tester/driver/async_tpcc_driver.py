@@ -0,0 +1,111 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, List, Optional
+
+from tpcc_tester.client.async_rmdb_client import AsyncRMDBClient
+from tpcc_tester.client.pool import async_connect_with_backoff
+from tpcc_tester.common import ServerState, TpccState, setup_logging
+from tpcc_tester.config import get_config
+from tpcc_tester.datagen import TxnInputStream
+from tpcc_tester.driver.tpcc_driver import TpccDriver
+from tpcc_tester.driver.transactions import TpccTransactions, run_calls_async
+from tpcc_tester.record.live import IntervalReporter
+from tpcc_tester.record.phases import ClientTimings, PhaseBreakdown, PhaseTimer, current_phase_breakdown
+from tpcc_tester.record.process_record import ProcessTxnRecorder, TpccTransactionType
+from tpcc_tester.util import *
+
+config = get_config()
+
+
+class AsyncTpccDriver(TpccTransactions):
+    """
+    TpccDriver 的 asyncio 版本: 每个实例是一个终端, 持有一个 AsyncRMDBClient 连接.
+
+    一个进程内用 run_terminals 并发驱动多个终端, 终端数不再受进程数限制.
+    事务体与 TpccDriver 共用(TpccTransactions), 区别只在于每条语句由 run_calls_async await.
+    """
+    def __init__(self, client: AsyncRMDBClient, scale: int, recorder: ProcessTxnRecorder = None):
+        self._scale = scale
+        self._client = client
+        self._recorder = recorder
+        self._phases: Optional[PhaseTimer] = None
+        self.logger = setup_logging(f"{__name__}")
+
+    async def connect(self):
+        await async_connect_with_backoff(self._client, config.reconnect_retries, config.reconnect_backoff)
+        breakdown = current_phase_breakdown()
+        if breakdown is not None:
+            await self.enable_phases(breakdown)
+        return self
+
+    async def enable_phases(self, breakdown: PhaseBreakdown, pings: int = 10):
+        """与 TpccDriver.enable_phases 相同"""
+        rtts = []
+        for _ in range(pings):
+            t0 = time.perf_counter_ns()
+            if await self._client.ping() != ServerState.OK:
+                break
+            rtts.append(time.perf_counter_ns() - t0)
+        self._client.timings = ClientTimings()
+        self._phases = PhaseTimer(self._client.timings, breakdown, min(rtts, default=0))
+
+    async def recover(self):
+        """与 TpccDriver.recover 相同"""
+        if await self._client.ping() == ServerState.OK:
+            return
+        self.logger.warning("connection lost, reconnecting")
+        await async_connect_with_backoff(self._client, config.reconnect_retries, config.reconnect_backoff)
+
+    async def close(self):
+        await self._client.close()
+
+    def txn_func(self, txn: TpccTransactionType) -> Callable[..., Awaitable[TpccState]]:
+        body = self.txn_body(txn)
+        return lambda *args: run_calls_async(self._client, self.transaction(body, *args))
+
+    async def run_test(self, txns, txn_prob=[10 / 23, 10 / 23, 1 / 23, 1 / 23, 1 / 23],
+                       t_start: Optional[int] = None, deadline: Optional[int] = None,
+                       reporter: Optional[IntervalReporter] = None, inputs: Optional[TxnInputStream] = None,
+                       rng: Optional[TerminalRandom] = None):
+        """与 TpccDriver.run_test 相同; 同一进程的终端共享 recorder 和 reporter(单线程, 无需加锁)"""
+        t_start = t_start or time.time_ns()
+        rng = rng or TerminalRandom(config.seed)
+
+        for txn, inputs_args in TpccDriver.txn_inputs(rng, txns, txn_prob, deadline, inputs):
+            ret = TpccState.Error
+            retry = 0
+
+            while ret != TpccState.OK and (deadline is None or time.time_ns() < deadline):
+                args = inputs_args or TpccDriver.txn_args(rng, txn, self._scale)
+                if self._phases:
+                    self._phases.begin(txn.name)
+                t1 = time.time_ns()
+                ret = await self.txn_func(txn)(*args)
+                t2 = time.time_ns()
+                if self._phases:
+                    self._phases.end()
+
+                self.record_txn(txn, ret, t1 - t_start, t2 - t_start, retry, reporter)
+                if ret == TpccState.ServerAbort or ret == TpccState.ClientAbort:
+                    retry += 1
+                elif ret == TpccState.Error:
+                    await self.recover()
+
+
+async def run_terminals(terminals: int, txns: int, txn_prob: List[float], scale: int,
+                        recorder: ProcessTxnRecorder = None, t_start: Optional[int] = None,
+                        deadline: Optional[int] = None, reporter: Optional[IntervalReporter] = None,
+                        inputs: Optional[TxnInputStream] = None, seed: int = 42, tid: int = 1):
+    """
+    在当前事件循环上并发运行 terminals 个终端, 每个终端 txns 个事务(按时间运行时忽略);
+    有 inputs 时每个终端消费其中一段, 否则每个终端使用独立的随机流 (seed, tid, 终端)
+    """
+    drivers = [await AsyncTpccDriver(AsyncRMDBClient(), scale, recorder).connect() for _ in range(terminals)]
+    try:
+        await asyncio.gather(*[driver.run_test(txns, txn_prob, t_start, deadline, reporter,
+                                               inputs.shard(i, terminals) if inputs is not None else None,
+                                               TerminalRandom(seed, tid, i))
+                               for i, driver in enumerate(drivers)])
+    finally:
+        for driver in drivers:
+            await driver.close()
@@ -1,5 +1,6 @@
 import pathlib
-from typing import override
+from pathlib import Path
+from typing import Callable, override
 
 file_path = pathlib.Path(__file__)
 file_dir = file_path.parent
@@ -7,13 +8,91 @@ project_dir = file_dir.parent
 
 from tpcc_tester.driver.tpcc_driver import TpccDriver
 from tpcc_tester.client import MySQLClient
+from tpcc_tester.client.pool import ConnectionPool
+from tpcc_tester.client.base import sql_literal
+from tpcc_tester.common import ServerState, TpccState
 from tpcc_tester.record.record import Recorder
+from tpcc_tester.datagen import TpccDataGenerator
+from tpcc_tester.datagen.loader import StreamLoader, LocalInfileStreamLoader
+from tpcc_tester.config import get_config
+from tpcc_tester.record.process_record import TpccTransactionType
+from tpcc_tester.util import current_time
+
+config = get_config()
 
 class MySQLDriver(TpccDriver):
-    def __init__(self, client: MySQLClient, scale: int, recorder: Recorder = None):
-        super().__init__(client, scale, recorder)
+    def __init__(self, client: MySQLClient, scale: int, recorder: Recorder = None, pool: ConnectionPool = None):
+        super().__init__(client, scale, recorder, pool)
+
+    @override
+    def build(self):
+        super().build()
+        self.create_procedures()
+
+    def create_procedures(self):
+        """安装 procedures.mysql 中的存储过程; 过程体内含有 ;, 按 DELIMITER $$ 切分"""
+        self.logger.info("Create procedures...")
+        text = open(f"{project_dir}/db/procedures.mysql", "r").read()
+        text = '\n'.join(line for line in text.split('\n') if not line.strip().upper().startswith('DELIMITER'))
+        for sql in text.split('$$'):
+            # 只有注释的片段不发送
+            if any(line.strip() and not line.strip().startswith('--') for line in sql.split('\n')):
+                self._client.send_cmd(sql.strip()).ok_or_throw()
+
+    @override
+    def txn_func(self, txn: TpccTransactionType) -> Callable[..., TpccState]:
+        if not config.stored_procedures:
+            return super().txn_func(txn)
+        return {
+            TpccTransactionType.NewOrder: self.call_new_order,
+            TpccTransactionType.Payment: self.call_payment,
+            TpccTransactionType.Delivery: self.call_delivery,
+            TpccTransactionType.OrderStatus: self.call_order_status,
+            TpccTransactionType.StockLevel: self.call_stock_level,
+        }[txn]
+
+    def call_procedure(self, name: str, *args) -> TpccState:
+        """一次 CALL 执行整个事务, 事务的开始/提交/回滚都在存储过程内"""
+        self.logger.info("call %s, args: %s", name, args)
+        result = self._client.send_cmd(f"CALL {name}({','.join(sql_literal(arg) for arg in args)});")
+        if result.state == ServerState.OK:
+            return TpccState.OK
+        if result.state == ServerState.ABORT:
+            return TpccState.ServerAbort
+        if 'Result is empty' in result.result_str:
+            return TpccState.ClientAbort
+        self.logger.warning("Server error; result: %s", result)
+        return TpccState.Error
+
+    def call_new_order(self, w_id: int, d_id: int, c_id: int, ol_i_id: list[int], ol_supply_w_id: list[int], ol_quantity: list[int]) -> TpccState:
+        join = lambda values: ','.join(map(str, values))
+        return self.call_procedure('tpcc_new_order', w_id, d_id, c_id, len(ol_i_id),
+                                   join(ol_i_id), join(ol_supply_w_id), join(ol_quantity), current_time())
+
+    def call_payment(self, w_id: int, d_id: int, c_w_id: int, c_d_id: int, c_query: int | str, h_amount: float) -> TpccState:
+        c_id, c_last = (None, c_query) if type(c_query) == str else (c_query, None)
+        return self.call_procedure('tpcc_payment', w_id, d_id, c_w_id, c_d_id, c_id, c_last, h_amount, current_time())
+
+    def call_order_status(self, w_id: int, d_id: int, c_query: int | str) -> TpccState:
+        c_id, c_last = (None, c_query) if type(c_query) == str else (c_query, None)
+        return self.call_procedure('tpcc_order_status', w_id, d_id, c_id, c_last)
+
+    def call_delivery(self, w_id: int, o_carrier_id: int) -> TpccState:
+        return self.call_procedure('tpcc_delivery', w_id, o_carrier_id, current_time())
+
+    def call_stock_level(self, w_id: int, d_id: int, level: int) -> TpccState:
+        return self.call_procedure('tpcc_stock_level', w_id, d_id, level)
 
     @override
-    def load_data(self):
+    def create_index(self):
+        self.logger.info("Create index...")
         self.send_file(f"{project_dir}/db/create_index.mysql")
-        self.send_file(f"{project_dir}/db/load_csvs.mysql")
\ No newline at end of file
+
+    @override
+    def stream_loader(self) -> StreamLoader:
+        return LocalInfileStreamLoader(self._client, TpccDataGenerator(config.warehouse, config.seed))
+
+    @override
+    def load_csv_sql(self, table: str, csv_file: Path) -> str:
+        return (f"load data local infile '{csv_file}' into table {table} "
+                "fields terminated by ',' lines terminated by '\\n' ignore 1 lines;")
\ No newline at end of file
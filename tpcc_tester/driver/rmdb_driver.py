@@ -1,4 +1,5 @@
 import pathlib
+from typing import List
 from typing import override
 
 file_path = pathlib.Path(__file__)
@@ -7,17 +8,19 @@ project_dir = file_dir.parent
 
 from tpcc_tester.driver.tpcc_driver import TpccDriver
 from tpcc_tester.client import RMDBClient
+from tpcc_tester.client.pool import ConnectionPool
 from tpcc_tester.record.record import Recorder
 from tpcc_tester.config import get_config
+from tpcc_tester.datagen.loader import TableLoadStat
 
 class RMDBDriver(TpccDriver):
-    def __init__(self, client: RMDBClient, scale: int, recorder: Recorder = None):
-        super().__init__(client, scale, recorder)
+    def __init__(self, client: RMDBClient, scale: int, recorder: Recorder = None, pool: ConnectionPool = None):
+        super().__init__(client, scale, recorder, pool)
 
     @override
-    def load_data(self):
-        self.send_file(f"{project_dir}/db/create_index.sql")
-        self.send_file(f"{project_dir}/db/load_csvs.sql")
+    def load_data(self) -> List[TableLoadStat]:
+        stats = super().load_data()
         config = get_config()
         if not config.output_file_on:
-            self._client.send_cmd("set output_file off;")
\ No newline at end of file
+            self._client.send_cmd("set output_file off;")
+        return stats
\ No newline at end of file
@@ -1,18 +1,24 @@
-import re
 import time
 import pathlib
 from pathlib import Path
 from tpcc_tester.record.process_record import ProcessTxnRecorder, TpccTransactionType
+from tpcc_tester.record.live import IntervalReporter
+from tpcc_tester.record.phases import ClientTimings, PhaseBreakdown, PhaseTimer, current_phase_breakdown
 from tqdm import tqdm
 from tqdm.contrib.logging import logging_redirect_tqdm
 
 from tpcc_tester.client.base import *
-from tpcc_tester.common import ResultEmpty, ServerError, TpccState, TransactionError, setup_logging
+from tpcc_tester.common import TpccState, setup_logging
 from tpcc_tester.db.table_layouts import *
 from tpcc_tester.client import *
+from tpcc_tester.client.pool import ConnectionPool, connect_with_backoff, get_pool
 from tpcc_tester.util import *
 from tpcc_tester.record.record import *
 from tpcc_tester.config import get_config
+from tpcc_tester.datagen import TpccDataGenerator, TxnInputStream, generate_csvs
+from tpcc_tester.datagen.loader import StreamLoader, InsertStreamLoader, TableLoadStat
+from tpcc_tester.driver.load_orchestrator import LoadOrchestrator
+from tpcc_tester.driver.transactions import TpccTransactions, run_calls
 
 
 config = get_config()
@@ -29,29 +35,35 @@ tables_info = [
     (HISTORY, 'count_history', config.CNT_HISTORY, 'count_history'),
     (NEW_ORDERS, 'count_new_orders', config.CNT_NEW_ORDERS, 'count_new_orders'),
     (ORDERS, 'count_orders', config.CNT_ORDERS, 'count_orders'),
-    (ORDER_LINE, 'count_order_line', config.CNT_ORDER_LINE, 'count_order_line'),
+    # o_ol_cnt 在 [5, 15] 内随机, order_line 的行数由 sum(o_ol_cnt) 决定
+    (ORDER_LINE, 'count_order_line', None, 'count_order_line'),
     (ITEM, 'count_item', config.CNT_ITEM, 'count_item'),
     (STOCK, 'count_stock', config.CNT_STOCK, 'count_stock')
 ]
 
 
-class TpccDriver:
+class TpccDriver(TpccTransactions):
     @staticmethod
     def from_type(client_type: ClientType, scale: int, recorder: ProcessTxnRecorder = None, global_lock: LockBase = None):
         from tpcc_tester.driver.rmdb_driver import RMDBDriver
         from tpcc_tester.driver.mysql_driver import MySQLDriver
 
+        # 连接来自本进程的连接池, delay_close 时放回, 之后的 driver 直接复用
         if client_type == ClientType.RMDB:
-            return RMDBDriver(RMDBClient(global_lock=global_lock), scale, recorder)
+            pool = get_pool(client_type, RMDBClient)
+            return RMDBDriver(pool.acquire(global_lock), scale, recorder, pool)
         elif client_type == ClientType.MYSQL:
-            return MySQLDriver(MySQLClient(global_lock=global_lock), scale, recorder)
+            pool = get_pool(client_type, lambda: MySQLClient(prepared=config.prepared_statements))
+            return MySQLDriver(pool.acquire(global_lock), scale, recorder, pool)
         else:
             raise ValueError(f'Invalid client type: {client_type}')
 
-    def __init__(self, client: DBClient, scale: int, recorder: ProcessTxnRecorder = None):
+    def __init__(self, client: DBClient, scale: int, recorder: ProcessTxnRecorder = None, pool: ConnectionPool = None):
+        """pool 不为空时 client 是从 pool 取出的已连接的连接, 否则在这里连接"""
         self._scale = scale
         self._client = client
         self._recorder = recorder
+        self._pool = pool
 
         self.logger = setup_logging(f"{__name__}")
         self.error_logger = setup_logging(
@@ -64,10 +76,42 @@ class TpccDriver:
         # self._delivery_t = Thread(target=self.process_delivery, args=(self._delivery_q,))
         # self._delivery_t.start()
         # self._delivery_stop = False
-        assert self._client.connect() == ServerState.OK
-
-    def load_data(self) -> bool:
-        pass
+        if pool is None:
+            assert self._client.connect() == ServerState.OK
+        # --phase-breakdown 时记录事务体中各阶段和客户端各部分的耗时
+        self._phases: Optional[PhaseTimer] = None
+        breakdown = current_phase_breakdown()
+        if breakdown is not None:
+            self.enable_phases(breakdown)
+
+    def enable_phases(self, breakdown: PhaseBreakdown, pings: int = 10):
+        """开启阶段计时; 先用 ping 测量连接的基线 RTT(取最小值)"""
+        rtts = []
+        for _ in range(pings):
+            t0 = time.perf_counter_ns()
+            if self._client.ping() != ServerState.OK:
+                break
+            rtts.append(time.perf_counter_ns() - t0)
+        self._client.timings = ClientTimings()
+        self._phases = PhaseTimer(self._client.timings, breakdown, min(rtts, default=0))
+
+    def recover(self):
+        """事务出错后检查连接, 已断开时按指数退避重连; 重连失败抛出 ConnectionError"""
+        if self._client.ping() == ServerState.OK:
+            return
+        self.logger.warning("connection lost, reconnecting")
+        connect_with_backoff(self._client, config.reconnect_retries, config.reconnect_backoff)
+
+    def load_data(self) -> List[TableLoadStat]:
+        # 先建索引则每行导入都要维护索引; defer_index 时导入完成后再建
+        if not config.defer_index:
+            self.create_index()
+        stats = self.load()
+        if config.defer_index:
+            t1 = time.time()
+            self.create_index()
+            self.logger.info(f"create index after load: {time.time() - t1:.2f}s")
+        return stats
 
     @staticmethod
     def redirect_tqdm(func):
@@ -76,96 +120,114 @@ class TpccDriver:
                 return func(*args, **kwargs)
         return wrapper
 
+    @staticmethod
+    def txn_iter(txns: int, deadline: Optional[int] = None):
+        """deadline(time.time_ns()) 为空时执行 txns 个事务, 否则一直执行到 deadline"""
+        if deadline is None:
+            yield from range(txns)
+            return
+        i = 0
+        while time.time_ns() < deadline:
+            yield i
+            i += 1
+
+    @staticmethod
+    def txn_inputs(rng: TerminalRandom, txns: int, txn_prob: List[float], deadline: Optional[int] = None,
+                   inputs: Optional[TxnInputStream] = None):
+        """
+        产生 (事务类型, 参数). 没有 inputs 时参数为 None, 每次执行(包括重试)由 txn_args 重新生成;
+        有 inputs 时按顺序消费预先生成的输入, 直到用完或到达 deadline, 重试使用同一组参数.
+        """
+        if inputs is None:
+            for _ in TpccDriver.txn_iter(txns, deadline):
+                yield TpccTransactionType(get_choice(rng, txn_prob)), None
+            return
+        for txn, args in inputs:
+            if deadline is not None and time.time_ns() >= deadline:
+                return
+            yield txn, args
+
+    @staticmethod
+    def txn_args(rng: TerminalRandom, txn: TpccTransactionType, scale: int) -> tuple:
+        """用终端的随机流生成一个事务的输入, 顺序与对应 do_* 的参数一致"""
+        if txn == TpccTransactionType.NewOrder:  # NewOrder
+            w_id = get_w_id(rng, config.CNT_W)
+            d_id = get_d_id(rng)  # 获得地区id，1～10的随机数
+            c_id = get_c_id(rng)  # 获得客户id，1～3000的随机数
+            ol_i_id = get_ol_i_id(rng)  # 获得新订单中的商品id列表
+            ol_supply_w_id = get_ol_supply_w_id(rng, w_id, scale, len(ol_i_id))  # 为新订单中每个商品选择一个供应仓库，当前设定就一个供应仓库
+            ol_quantity = get_ol_quantity(rng, len(ol_i_id))  # 为新订单中每个商品设置购买数量
+            return w_id, d_id, c_id, ol_i_id, ol_supply_w_id, ol_quantity
+
+        elif txn == TpccTransactionType.Payment:  # Payment
+            w_id = get_w_id(rng, config.CNT_W)
+            d_id = get_d_id(rng)  # 获得地区id，1～10的随机数
+            query_cus = query_cus_by(rng, True)
+            h_amount = get_h_amount(rng)
+            c_w_id, c_d_id = get_c_w_id_d_id(rng, w_id, d_id, scale)  # 获得客户所属的仓库id和地区id
+            return w_id, d_id, c_w_id, c_d_id, query_cus, h_amount
+
+        elif txn == TpccTransactionType.Delivery:  # Delivery
+            w_id = get_w_id(rng, config.CNT_W)
+            o_carrier_id = get_o_carrier_id(rng)
+            return w_id, o_carrier_id
+
+        elif txn == TpccTransactionType.OrderStatus:  # OrderStatus
+            w_id = get_w_id(rng, config.CNT_W)
+            d_id = get_d_id(rng)  # 获得地区id，1～10的随机数
+            query_cus = query_cus_by(rng)
+            return w_id, d_id, query_cus
+
+        else:  # StockLevel
+            w_id = get_w_id(rng, config.CNT_W)
+            d_id = get_d_id(rng)  # 获得地区id，1～10的随机数
+            threshold = get_level_threshold(rng)
+            return w_id, d_id, threshold
+
+    def txn_func(self, txn: TpccTransactionType) -> Callable[..., TpccState]:
+        body = self.txn_body(txn)
+        return lambda *args: run_calls(self._client, self.transaction(body, *args))
+
     # @redirect_tqdm
-    def run_test(self, txns, txn_prob=[10 / 23, 10 / 23, 1 / 23, 1 / 23, 1 / 23]):
+    def run_test(self, txns, txn_prob=[10 / 23, 10 / 23, 1 / 23, 1 / 23, 1 / 23],
+                 t_start: Optional[int] = None, deadline: Optional[int] = None,
+                 reporter: Optional[IntervalReporter] = None, inputs: Optional[TxnInputStream] = None,
+                 rng: Optional[TerminalRandom] = None):
         # self.logger.info(duration)
         # self.logger.info('Test')
         t1 = 0
         t2 = 0
 
-        w_id = 0
-        d_id = 0
-        c_id = 0
-        ol_i_id = 0
-        ol_supply_w_id = 0
-        ol_quantity = 0
-        o_carrier_id = 0
-        c_w_id = 0
-        c_d_id = 0
-        h_amount = 0
-        query_cus = 0
-        threshold = 0
-
-        t_start = time.time_ns()
+        # 多进程共享同一个 t_start 时, 记录的时间可以直接按测量窗口统计
+        t_start = t_start or time.time_ns()
+        rng = rng or TerminalRandom(config.seed)
 
         # print(f"===txn_prob: {[f"{prob:.2f}"for prob in txn_prob]}===")
-        for i in tqdm(range(txns), desc=""):
-            txn = TpccTransactionType(get_choice(txn_prob))
+        for txn, inputs_args in tqdm(self.txn_inputs(rng, txns, txn_prob, deadline, inputs), desc=""):
             ret = TpccState.Error
-
-            while ret != TpccState.OK:
-                if txn == TpccTransactionType.NewOrder:  # NewOrder
-                    w_id = get_w_id(config.CNT_W)
-                    d_id = get_d_id()  # 获得地区id，1～10的随机数
-                    c_id = get_c_id()  # 获得客户id，1～3000的随机数
-                    ol_i_id = get_ol_i_id()  # 获得新订单中的商品id列表
-                    ol_supply_w_id = get_ol_supply_w_id(w_id, self._scale, len(ol_i_id))  # 为新订单中每个商品选择一个供应仓库，当前设定就一个供应仓库
-                    ol_quantity = get_ol_quantity(len(ol_i_id))  # 为新订单中每个商品设置购买数量
-
-                    t1 = time.time_ns()
-                    ret = self.do_new_order(w_id, d_id, c_id, ol_i_id, ol_supply_w_id, ol_quantity)
-                    t2 = time.time_ns()
-                    # if self._recorder:
-                    #     self._recorder.put_new_order(t2 - t_start)
-
-                elif txn == TpccTransactionType.Payment:  # Payment
-                    w_id = get_w_id(config.CNT_W)
-                    d_id = get_d_id()  # 获得地区id，1～10的随机数
-                    query_cus = query_cus_by(True)
-                    h_amount = get_h_amount()
-                    c_w_id, c_d_id = get_c_w_id_d_id(w_id, d_id, self._scale)  # 获得客户所属的仓库id和地区id
-
-                    t1 = time.time_ns()
-                    ret = self.do_payment(w_id, d_id, c_w_id, c_d_id, query_cus, h_amount)
-                    t2 = time.time_ns()
-
-                elif txn == TpccTransactionType.Delivery:  # Delivery
-                    w_id = get_w_id(config.CNT_W)
-                    o_carrier_id = get_o_carrier_id()
-
-                    t1 = time.time_ns()
-                    ret = self.do_delivery(w_id, o_carrier_id)
-                    t2 = time.time_ns()
-
-                elif txn == TpccTransactionType.OrderStatus:  # OrderStatus
-                    w_id = get_w_id(config.CNT_W)
-                    d_id = get_d_id()  # 获得地区id，1～10的随机数
-                    query_cus = query_cus_by()
-
-                    t1 = time.time_ns()
-                    ret = self.do_order_status(w_id, d_id, query_cus)
-                    t2 = time.time_ns()
-
-                elif txn == TpccTransactionType.StockLevel:  # StockLevel
-                    w_id = get_w_id(config.CNT_W)
-                    d_id = get_d_id()  # 获得地区id，1～10的随机数
-                    threshold = get_level_threshold()
-
-                    t1 = time.time_ns()
-                    ret = self.do_stock_level(w_id, d_id, threshold)
-                    t2 = time.time_ns()
+            # 同一个事务因回滚而重试的次数
+            retry = 0
+
+            # 到达 deadline 后不再重试被回滚的事务
+            while ret != TpccState.OK and (deadline is None or time.time_ns() < deadline):
+                args = inputs_args or self.txn_args(rng, txn, self._scale)
+                if self._phases:
+                    self._phases.begin(txn.name)
+                t1 = time.time_ns()
+                ret = self.txn_func(txn)(*args)
+                t2 = time.time_ns()
+                if self._phases:
+                    self._phases.end()
 
                 # if ret != SQLState.ABORT:
                 #     put_txn(lock, txn, t2 - t1, True)
 
+                self.record_txn(txn, ret, t1 - t_start, t2 - t_start, retry, reporter)
                 if ret == TpccState.ServerAbort or ret == TpccState.ClientAbort:
-                    if self._recorder:
-                        self._recorder.put_txn(txn, t1 - t_start, t2 - t_start, False)
-                elif ret == TpccState.OK:
-                    if self._recorder:
-                        self._recorder.put_txn(txn, t1 - t_start, t2 - t_start, True)
-                # else:
-                #     self.logger.warning(f"transaction state: {ret}")
+                    retry += 1
+                elif ret == TpccState.Error:
+                    # 连接断开时重连一次后重试该事务, 而不是结束整个进程
+                    self.recover()
 
         # for i in range(txns):
         #     txn = get_choice(txn_prob)
@@ -221,7 +283,10 @@ class TpccDriver:
         self._flag = False
         # while not self._delivery_stop:
         #     continue
-        self._client.close()
+        if self._pool is not None:
+            self._pool.release(self._client)
+        else:
+            self._client.close()
 
     # def close(self):
     #     self._client.close()
@@ -241,16 +306,38 @@ class TpccDriver:
         self.logger.warning("Drop table schema...")
         self.send_file(f"{project_dir}/db/drop_table.sql")
 
-    def load(self):
-        self.load_csv()
+    def load(self) -> List[TableLoadStat]:
+        if config.load_mode == 'csv':
+            return self.load_csv()
+        if config.load_workers > 1:
+            self.logger.info(f"Streaming data with {config.load_workers} connections...")
+            return LoadOrchestrator(config.client_type, config.warehouse, config.seed, config.load_workers).run()
+        self.logger.info("Streaming data...")
+        return self.stream_loader().load()
+
+    def stream_loader(self) -> StreamLoader:
+        return InsertStreamLoader(self._client, TpccDataGenerator(config.warehouse, config.seed), config.insert_batch)
 
     def create_index(self):
         self.logger.info("Create index...")
         self.send_file(f"{project_dir}/db/create_index.sql")
 
-    def load_csv(self):
+    def load_csv(self) -> List[TableLoadStat]:
         self.logger.info("Loading data...")
-        self.send_file(f"{project_dir}/db/load_csvs.sql")
+        csv_files = generate_csvs(config.data_dir, config.warehouse, config.seed, force=config.gen_data,
+                                  workers=config.gen_workers)
+        stats = []
+        for table in tqdm(load_order, desc="Loading csv"):
+            t1 = time.time()
+            self._client.send_cmd(self.load_csv_sql(table, csv_files[table])).ok_or_throw()
+            seconds = time.time() - t1
+            with open(csv_files[table], 'rb') as f:
+                rows = sum(1 for _ in f) - 1  # 去掉表头
+            stats.append(TableLoadStat(table, rows, seconds))
+        return stats
+
+    def load_csv_sql(self, table: str, csv_file: Path) -> str:
+        return f"load {csv_file} into {table};"
 
     def send_sql_from_dir(self, sql_dir: str):
         sql_files = [f"{file}" for file in os.listdir(sql_dir) if file.endswith('.sql')]
@@ -270,7 +357,7 @@ class TpccDriver:
         """
         count_result = 0
         res = self._client.select(table=[table], col=(COUNT(alias=count_as),))
-        count_result = int(res.data[0][0])
+        count_result = res.data[0][0]
         if count_result != expected_count:
             self.logger.error(f'failed, {count_type}: {count_result}, expecting: {expected_count}')
 
@@ -278,40 +365,11 @@ class TpccDriver:
         print("Count star...")
         # 遍历每个表的信息并进行检查
         for table, count_as, expected_count, count_type in tables_info:
+            if expected_count is None:
+                res = self._client.select(table=[ORDERS], col=(SUM(O_OL_CNT),))
+                expected_count = int(res.data[0][0])
             self.count_and_check(table, count_as, expected_count, count_type)
 
-    @staticmethod
-    def transaction_handling(func: Callable[..., ServerState]):
-        def wrapper(self: 'TpccDriver', *args, **kwargs):
-            self.logger.info(f">>>")
-            res = TpccState.OK
-            try:
-                self._client.begin()
-                res = func(self, *args, **kwargs)
-                # if random.random() < 0.5:
-                #     self._client.abort()
-                #     return TpccState.ClientAbort
-                self._client.commit()
-                return TpccState.OK
-            except ResultEmpty as e:
-                self.logger.warning(f"Result is empty; error: {e}")
-                res = TpccState.ClientAbort
-                self._client.abort()
-            except TransactionError as e:
-                self.logger.warning(f"Transaction aborted; error: {e}")
-                # self._client.abort()
-                res = TpccState.ServerAbort
-            except ServerError as e:
-                self.logger.warning(f"Server error; error: {e}")
-                self._client.abort()
-                res = TpccState.Error
-            except Exception as e:
-                self.logger.exception(f"Error: {e}, function: {func.__name__}, args: {args}, kwargs: {kwargs}")
-                exit(-1)
-            self.logger.info(f"<<<")
-            return res
-        return wrapper
-
     def consistency_check(self):
         print("consistency checking...")
 
@@ -327,7 +385,7 @@ class TpccDriver:
                                  where=[(D_W_ID, EQ, w_id),
                                         (D_ID, EQ, d_id)]).is_not_empty_or_throw()
 
-                    d_next_o_id = int(res.data[0][0])
+                    d_next_o_id = res.data[0][0]
 
                     res = self._client.select(
                                  table=[ORDERS],
@@ -335,7 +393,7 @@ class TpccDriver:
                                  where=[(O_W_ID, EQ, w_id),
                                         (O_D_ID, EQ, d_id)]).is_not_empty_or_throw()
 
-                    max_o_id = int(res.data[0][0])
+                    max_o_id = res.data[0][0]
 
                     res = self._client.select(
                                  table=[NEW_ORDERS],
@@ -343,7 +401,7 @@ class TpccDriver:
                                  where=[(NO_W_ID, EQ, w_id),
                                         (NO_D_ID, EQ, d_id)]).is_not_empty_or_throw()
 
-                    max_no_o_id = int(res.data[0][0])
+                    max_no_o_id = res.data[0][0]
 
                     if d_next_o_id - 1 != max_o_id or d_next_o_id - 1 != max_no_o_id:
                         self.logger.error(
@@ -360,7 +418,7 @@ class TpccDriver:
                                  where=[(NO_W_ID, EQ, w_id),
                                         (NO_D_ID, EQ, d_id)]).is_not_empty_or_throw()
 
-                    num_no_o_id = int(res.data[0][0])
+                    num_no_o_id = res.data[0][0]
 
                     res = self._client.select(
                                  table=[NEW_ORDERS],
@@ -368,7 +426,7 @@ class TpccDriver:
                                  where=[(NO_W_ID, EQ, w_id),
                                         (NO_D_ID, EQ, d_id)]).is_not_empty_or_throw()
 
-                    max_no_o_id = int(res.data[0][0])
+                    max_no_o_id = res.data[0][0]
 
                     res = self._client.select(
                                  table=[NEW_ORDERS],
@@ -376,7 +434,7 @@ class TpccDriver:
                                  where=[(NO_W_ID, EQ, w_id),
                                         (NO_D_ID, EQ, d_id)]).is_not_empty_or_throw()
 
-                    min_no_o_id = int(res.data[0][0])
+                    min_no_o_id = res.data[0][0]
 
                     if num_no_o_id != max_no_o_id - min_no_o_id + 1:
                         self.logger.error(
@@ -393,7 +451,7 @@ class TpccDriver:
                                  where=[(O_W_ID, EQ, w_id),
                                         (O_D_ID, EQ, d_id)]).is_not_empty_or_throw()
 
-                    sum_o_ol_cnt = int(float(res.data[0][0]))
+                    sum_o_ol_cnt = int(res.data[0][0])
 
                     res = self._client.select(
                                  table=[ORDER_LINE],
@@ -401,7 +459,7 @@ class TpccDriver:
                                  where=[(OL_W_ID, EQ, w_id),
                                         (OL_D_ID, EQ, d_id)]).is_not_empty_or_throw()
 
-                    num_ol_o_id = int(float(res.data[0][0]))
+                    num_ol_o_id = int(res.data[0][0])
 
                     if sum_o_ol_cnt != num_ol_o_id:
                         self.logger.error(
@@ -422,7 +480,7 @@ class TpccDriver:
                          col=(COUNT(alias='count_orders'),),
                          ).is_not_empty_or_throw()
 
-            cnt_orders = int(res.data[0][0])
+            cnt_orders = res.data[0][0]
             if cnt_orders == config.CNT_ORDERS + cnt_new_orders:
                 print("all pass!")
                 return True
@@ -432,442 +490,3 @@ class TpccDriver:
         except Exception as e:
             self.error_logger.exception(f"Exception occurred; error: {e}")
             self.logger.warning("consistency checking 2 error!")
-
-    @transaction_handling
-    def do_new_order(self, w_id: int, d_id: int, c_id: int, ol_i_id: list[int], ol_supply_w_id: list[int], ol_quantity: list[int]):
-        self.logger.info(f"do_new_order, w_id: {w_id}, d_id: {d_id}, c_id: {c_id}, ol_i_id: {ol_i_id}, ol_supply_w_id: {ol_supply_w_id}, ol_quantity: {ol_quantity}")
-        res = []
-        ol_cnt = len(ol_i_id)
-        ol_amount = 0
-        total_amount = 0
-        brand_generic = ''
-        s_data = ''
-
-        # transcation
-        # self._client.begin()
-        # self.logger.info('+ New Order')
-        # phase 1
-        # 检索仓库（warehouse）税率、区域（district）税率和下一个可用订单号。
-        res = self._client.select(
-                        table=[DISTRICT],
-                        col=(D_TAX, D_NEXT_O_ID),
-                        where=[(D_ID, EQ, d_id),
-                            (D_W_ID, EQ, w_id)]).is_not_empty_or_throw()
-
-        d_tax, d_next_o_id = res.data[0]
-        d_tax = float(d_tax)
-        d_next_o_id = int(d_next_o_id)
-
-        self._client.update(
-                  table=DISTRICT,
-                  row=[(D_NEXT_O_ID, d_next_o_id + 1)],
-                  where=[(D_ID, EQ, d_id), (D_W_ID, EQ, w_id)]).ok_or_throw()
-
-        res = self._client.select(
-                        table=[CUSTOMER, WAREHOUSE],
-                        col=(C_DISCOUNT, C_LAST, C_CREDIT, W_TAX),
-                        where=[(W_ID, EQ, w_id), (C_W_ID, EQ, W_ID), (C_D_ID, EQ, d_id), (C_ID, EQ, c_id)]
-                        ).is_not_empty_or_throw()
-
-        c_discount, c_last_, c_credit, w_tax = res.data[0]
-        c_discount = float(c_discount)
-        w_tax = float(w_tax)
-
-        # phase 2
-        # 插入订单（order）、新订单（new-order）和新订单行（order-line）。
-        order_time = "'" + current_time() + "'"
-        self._client.insert(
-                  table=ORDERS,
-                  rows=(d_next_o_id, d_id, w_id, c_id, order_time, 0, ol_cnt,
-                        int(len(set(ol_supply_w_id)) == 1))).ok_or_throw()
-
-        self._client.insert(
-                  table=NEW_ORDERS,
-                  rows=(d_next_o_id, d_id, w_id)).ok_or_throw()
-
-        # phase 3
-        for i in range(ol_cnt):
-            res = self._client.select(
-                            table=[ITEM],
-                            col=(I_PRICE, I_NAME, I_DATA),
-                            where=[(I_ID, EQ, ol_i_id[i])]).is_not_empty_or_throw()
-            # TPC-C 规范要求, 大约有 1% 的概率, 输入的商品ID是无效的. 在这种情况下, 整个事务必须 回滚 (Abort)
-            i_price, i_name, i_data = res.data[0]
-            i_price = float(i_price)
-
-            res = self._client.select(
-                            table=[STOCK],
-                            col=(
-                                S_QUANTITY, S_DIST_01, S_DIST_02, S_DIST_03, S_DIST_04, S_DIST_05, S_DIST_06,
-                                S_DIST_07,
-                                S_DIST_08, S_DIST_09, S_DIST_10, S_YTD, S_ORDER_CNT, S_REMOTE_CNT, S_DATA),
-                            where=[(S_I_ID, EQ, ol_i_id[i]),
-                                (S_W_ID, EQ, ol_supply_w_id[i])]).is_not_empty_or_throw()
-
-            s_quantity, *s_dist, s_ytd, s_order_cnt, s_remote_cnt, s_data = res.data[0]
-            s_quantity = float(s_quantity)
-            s_ytd = float(s_ytd)
-            s_order_cnt = float(s_order_cnt)
-            s_remote_cnt = float(s_remote_cnt)
-
-            if s_quantity - ol_quantity[i] >= 10:
-                s_quantity -= ol_quantity[i]
-            else:
-                s_quantity = s_quantity - ol_quantity[i] + 91
-
-            s_ytd += ol_quantity[i]
-            s_order_cnt += 1
-
-            if ol_supply_w_id[i] != w_id:
-                s_remote_cnt += 1
-
-            self._client.update(
-                      table=STOCK,
-                      row=[(S_QUANTITY, s_quantity),
-                           (S_YTD, s_ytd),
-                           (S_ORDER_CNT, s_order_cnt),
-                           (S_REMOTE_CNT, s_remote_cnt)],
-                      where=[(S_I_ID, EQ, ol_i_id[i]),
-                             (S_W_ID, EQ, ol_supply_w_id[i])]).ok_or_throw()
-            ol_amount = ol_quantity[i] * i_price
-            brand_generic = 'B' if re.search('ORIGINAL', i_data) and re.search('ORIGINAL', s_data) else 'G'
-
-            self._client.insert(
-                        table=ORDER_LINE,
-                        rows=(d_next_o_id, d_id, w_id, i, ol_i_id[i], ol_supply_w_id[i], order_time, ol_quantity[i],
-                            ol_amount, "'" + s_dist[d_id - 1] + "'")).ok_or_throw()
-
-            total_amount += ol_amount
-
-        total_amount *= (1 - c_discount) * (1 + w_tax + d_tax)
-
-        # self._client.commit()
-        # self.logger.info('- New Order')
-        return ServerState.OK
-
-    @transaction_handling
-    def do_payment(self, w_id: int, d_id: int, c_w_id: int, c_d_id: int, c_query: int | str, h_amount: float):
-        self.logger.info(f"do_payment, w_id: {w_id}, d_id: {d_id}, c_w_id: {c_w_id}, c_d_id: {c_d_id}, c_query: {c_query}, h_amount: {h_amount}")
-        c_balance = 0
-        c_ytd_payment = 0
-        c_payment_cnt = 0
-        c_credit = 'GC'
-        c_id = 0
-        # self._client.begin()
-        # self.logger.info('+ Payment')
-        res = self._client.select(
-                        table=[WAREHOUSE],
-                        col=(W_NAME, W_STREET_1, W_STREET_2, W_CITY, W_STATE, W_ZIP, W_YTD),
-                        where=[(W_ID, EQ, w_id)]).is_not_empty_or_throw()
-
-        w_name, w_street_1, w_street_2, w_city, w_state, w_zip, w_ytd = res.data[0]
-        # w_ytd = eval(w_ytd)
-        self._client.update(
-                  table=WAREHOUSE,
-                  row=[(W_YTD, W_YTD + '+' + str(h_amount))],
-                  where=[(W_ID, EQ, w_id)]).ok_or_throw()
-
-        res = self._client.select(
-                        table=[DISTRICT],
-                        col=(D_NAME, D_STREET_1, D_STREET_2, D_CITY, D_STATE, D_ZIP, D_YTD),
-                        where=[(D_W_ID, EQ, w_id), (D_ID, EQ, d_id)]).is_not_empty_or_throw()
-
-        d_name, d_street_1, d_street_2, d_city, d_state, d_zip, d_ytd = res.data[0]
-
-        # d_ytd = eval(d_ytd)
-        self._client.update(
-                  table=DISTRICT,
-                  row=[(D_YTD, D_YTD + '+' + str(h_amount))],
-                  where=[(D_W_ID, EQ, w_id), (D_ID, EQ, d_id)]).ok_or_throw()
-
-        if type(c_query) == str:
-            c_query = "'" + c_query + "'"
-
-            # TPC-C 2.5.2.2: The customer is selected based on customer last name.
-            # Get the count of matching customers
-            res_count = self._client.select(
-                table=[CUSTOMER],
-                col=(COUNT(C_ID),),
-                where=[(C_LAST, EQ, c_query), (C_W_ID, EQ, c_w_id), (C_D_ID, EQ, c_d_id)]
-            ).is_not_empty_or_throw()
-            customer_count = int(res_count.data[0][0])
-
-            # Select all matching customers ordered by first name
-            res_customers = self._client.select(
-                table=[CUSTOMER],
-                col=(C_ID, C_FIRST, C_MIDDLE, C_LAST, C_STREET_1, C_STREET_2, C_CITY, C_STATE,
-                     C_ZIP, C_PHONE, C_SINCE, C_CREDIT, C_CREDIT_LIM, C_DISCOUNT,
-                     C_BALANCE, C_YTD_PAYMENT, C_PAYMENT_CNT),
-                where=[(C_LAST, EQ, c_query), (C_W_ID, EQ, c_w_id), (C_D_ID, EQ, c_d_id)],
-                order_by=C_FIRST,
-                asc=True
-            ).is_not_empty_or_throw()
-
-            # TPC-C specifies "the row at position (n+1)/2 rounded up..."
-            # For a 0-indexed list, this is (customer_count - 1) // 2
-            middle_index = (customer_count - 1) // 2
-            customer_data = res_customers.data[middle_index]
-
-            # Unpack customer data into local variables
-            c_id, c_first, c_midele, c_last, \
-                c_street_1, c_street_2, c_city, c_state, \
-                c_zip, c_phone, c_since, \
-                c_credit, c_credit_lim, c_discount, c_balance, c_ytd_payment, c_payment_cnt = customer_data
-
-            c_id = int(c_id)
-            c_balance = float(c_balance)
-            c_ytd_payment = float(c_ytd_payment)
-            c_payment_cnt = int(c_payment_cnt)
-        else:
-            res = self._client.select(
-                            table=[CUSTOMER],
-                            col=(C_ID, C_FIRST, C_MIDDLE, C_LAST, C_STREET_1, C_STREET_2, C_CITY, C_STATE,
-                                    C_ZIP, C_PHONE, C_SINCE, C_CREDIT, C_CREDIT_LIM, C_DISCOUNT,
-                                    C_BALANCE, C_YTD_PAYMENT, C_PAYMENT_CNT),
-                            where=[(C_ID, EQ, c_query),
-                                    (C_W_ID, EQ, c_w_id),
-                                    (C_D_ID, EQ, c_d_id)]).is_not_empty_or_throw()
-            res = res.data[0]
-            c_id, c_first, c_midele, c_last, \
-                c_street_1, c_street_2, c_city, c_state, \
-                c_zip, c_phone, c_since, \
-                c_credit, c_credit_lim, c_discount, c_balance, c_ytd_payment, c_payment_cnt = res  # result[len(result)//2]
-            c_id = int(c_id)
-            c_balance = float(c_balance)
-            c_ytd_payment = float(c_ytd_payment)
-            c_payment_cnt = int(c_payment_cnt)
-        self._client.update(
-                  table=CUSTOMER,
-                  # doubt：这里应该是加，因为支付是客户给银行钱，所以是减少余额，增加ytd_payment
-                  row=[(C_BALANCE, c_balance - h_amount),
-                       (C_YTD_PAYMENT, c_ytd_payment + h_amount),
-                       (C_PAYMENT_CNT, c_payment_cnt + 1)],
-                  where=[(C_W_ID, EQ, c_w_id), (C_D_ID, EQ, c_d_id), (C_ID, EQ, c_id)]).ok_or_throw()
-        if c_credit == 'BC':
-            res = self._client.select(
-                                table=[CUSTOMER],
-                                col=(C_DATA,),
-                                where=[(C_ID, EQ, c_id),
-                                        (C_W_ID, EQ, c_w_id),
-                                        (C_D_ID, EQ, c_d_id)]).is_not_empty_or_throw()
-            c_data = (''.join(map(str, [c_id, c_d_id, c_w_id, d_id, h_amount]))
-                        + res.data[0][0])[0:config.DATA_MAX]
-            self._client.update(
-                      table=CUSTOMER,
-                      row=[(C_DATA, "'" + c_data + "'")],
-                      where=[(C_W_ID, EQ, c_w_id), (C_D_ID, EQ, c_d_id), (C_ID, EQ, c_id)]).ok_or_throw()
-
-        # 4 blank space
-        h_data = w_name + '    ' + d_name
-        self._client.insert(
-                  table=HISTORY,
-                  rows=(c_id, c_d_id, c_w_id, d_id, w_id, "'" + current_time() + "'", h_amount,
-                        "'" + h_data + "'")).ok_or_throw()
-
-        # self._client.commit()
-        # self.logger.info('- Payment')
-        return ServerState.OK
-
-    @transaction_handling
-    def do_order_status(self, w_id: int, d_id: int, c_query: int | str) -> ServerState:
-        self.logger.info(f"do_order_status, w_id: {w_id}, d_id: {d_id}, c_query: {c_query}")
-        c_id = 0 # 不会查出任何结果
-        # self._client.begin()
-        # self.logger.info('+ Order Status')
-        # 60% 执⾏
-        if type(c_query) == str:
-            # 当 c_query 是字符串时, 没有正确提取 c_id
-            # c_id 为 0, 导致后续查询 orders 表时找不到记录
-            # 导致 IndexError, 然后事务 ABORT, 进入死循环
-            # 当按姓名查询时, 如果有多个同名客户, 应该选择中间的那个(按 c_first 排序)
-            c_query = "'" + c_query + "'"
-            # 首先查询客户数量
-            res = self._client.select(
-                            table=[CUSTOMER],
-                            col=(COUNT(C_ID, "count_c_id"),),
-                            where=[(C_LAST, EQ, c_query),
-                                    (C_W_ID, EQ, w_id),
-                                    (C_D_ID, EQ, d_id)]).is_not_empty_or_throw()
-
-            customer_count = int(res.data[0][0])
-            if customer_count == 0:
-                # 没有找到客户, 应该abort事务
-                # self._client.abort()
-                return ServerState.ABORT
-
-            # 查询客户信息, 按 c_first 排序
-            res = self._client.select(
-                            table=[CUSTOMER],
-                            col=(C_ID, C_BALANCE, C_FIRST, C_MIDDLE, C_LAST),
-                            where=[(C_LAST, EQ, c_query),
-                                    (C_W_ID, EQ, w_id),
-                                    (C_D_ID, EQ, d_id)],
-                            order_by=C_FIRST,
-                            asc=True).is_not_empty_or_throw()
-
-            # 根据 TPC-C 规范, 选择中间的客户
-            middle_index = customer_count // 2
-            c_id, c_balance, c_first, c_middle, c_last = res.data[middle_index]
-            c_id = int(c_id)
-
-        else:
-            res = self._client.select(
-                            table=[CUSTOMER],
-                            col=(C_ID, C_BALANCE, C_FIRST, C_MIDDLE, C_LAST),
-                            where=[(C_ID, EQ, c_query),
-                                    (C_W_ID, EQ, w_id),
-                                    (C_D_ID, EQ, d_id)]).is_not_empty_or_throw()
-
-            c_id, c_balance, c_first, c_middle, c_last = res.data[0]
-            c_id = int(c_id)
-
-        # 查询最新的订单
-        res = self._client.select(
-                        table=[ORDERS],
-                        col=(O_ID, O_ENTRY_D, O_CARRIER_ID),
-                        where=[(O_W_ID, EQ, w_id),
-                            (O_D_ID, EQ, d_id),
-                            (O_C_ID, EQ, c_id)],
-                        order_by=O_ID,
-                        asc=False  # 降序，获取最新的订单
-                        ).is_not_empty_or_throw()
-
-        if len(res.data) == 0:
-            # 该客户没有订单，应该abort事务
-            # self._client.abort()
-            return ServerState.ABORT
-
-        o_id, o_entry_id, o_carrier_id = res.data[0]
-        o_id = int(o_id)
-
-        # 查询订单行
-        res = self._client.select(  # ol_i_id,ol_supply_w_id,ol_quantity,ol_amount,ol_delivery_d
-                        table=[ORDER_LINE],
-                        col=(OL_I_ID, OL_SUPPLY_W_ID, OL_QUANTITY, OL_AMOUNT, OL_DELIVERY_D),
-                        where=[(OL_W_ID, EQ, w_id),
-                            (OL_D_ID, EQ, d_id),
-                            (OL_O_ID, EQ, o_id)]).is_not_empty_or_throw()
-
-        order_lines = res.data  # 获取所有订单行
-
-        # self._client.commit()
-        # self.logger.info('- Order Status')
-        return ServerState.OK
-
-    @transaction_handling
-    def do_delivery(self, w_id: int, o_carrier_id: int) -> ServerState:
-        self.logger.info(f"do_delivery, w_id: {w_id}, o_carrier_id: {o_carrier_id}")
-        # t1 = time.time()
-        # self._client.begin()
-        # self.logger.info('+ Delivery')
-        # dat = q.get()
-        # w_id = dat['w_id']
-        # o_carrier_id = dat['o_carrier_id']
-        for d_id in range(1, 11):
-            res = self._client.select(
-                            table=[NEW_ORDERS],
-                            col=(MIN(NO_O_ID),),
-                            where=[(NO_W_ID, EQ, w_id), (NO_D_ID, EQ, d_id)],
-                            # order_by=NO_O_ID,
-                            # asc=True
-                            ).is_not_empty_or_throw()
-
-            o_id = int(res.data[0][0])
-            self._client.delete(
-                      table=NEW_ORDERS,
-                      where=[(NO_W_ID, EQ, w_id), (NO_D_ID, EQ, d_id), (NO_O_ID, EQ, o_id)]).ok_or_throw()
-
-            res = self._client.select(
-                            table=[ORDERS],
-                            col=(O_C_ID,),
-                            where=[(O_ID, EQ, o_id), (O_W_ID, EQ, w_id), (O_D_ID, EQ, d_id)]).is_not_empty_or_throw()
-            o_c_id = res.data[0][0]
-            o_c_id = int(o_c_id)
-
-            self._client.update(
-                      table=ORDERS,
-                      row=[(O_CARRIER_ID, o_carrier_id)],
-                      where=[(O_ID, EQ, o_id), (O_W_ID, EQ, w_id), (O_D_ID, EQ, d_id)]).ok_or_throw()
-
-            res = self._client.select(
-                            table=[ORDER_LINE],
-                            where=[(OL_W_ID, EQ, w_id), (OL_D_ID, EQ, d_id), (OL_O_ID, EQ, o_id)]).is_not_empty_or_throw()
-            order_lines = res.data
-
-            res = self._client.select(
-                            table=[ORDER_LINE],
-                            col=(SUM(OL_AMOUNT),),
-                            where=[(OL_W_ID, EQ, w_id), (OL_D_ID, EQ, d_id), (OL_O_ID, EQ, o_id)]).is_not_empty_or_throw()
-            ol_amount = float(res.data[0][0])
-
-            for line in order_lines:
-                self._client.update(
-                          table=ORDER_LINE,
-                          row=[(OL_DELIVERY_D, "'" + current_time() + "'")],
-                          where=[(OL_W_ID, EQ, w_id), (OL_D_ID, EQ, d_id),
-                                 (OL_O_ID, EQ, int(line[0]))]).ok_or_throw()
-
-            res = self._client.select(
-                            table=[CUSTOMER],
-                            col=(C_BALANCE, C_DELIVERY_CNT),
-                            where=[(C_W_ID, EQ, w_id), (C_D_ID, EQ, d_id), (C_ID, EQ, o_c_id)]).is_not_empty_or_throw()
-            c_balance, c_delivery_cnt = res.data[0]
-            c_balance = float(c_balance)
-            c_delivery_cnt = int(c_delivery_cnt)
-
-            # self.logger.info(c_balance, ol_amount, c_delivery_cnt)
-            self._client.update(
-                      table=CUSTOMER,
-                      row=[(C_BALANCE, c_balance + ol_amount), (C_DELIVERY_CNT, c_delivery_cnt + 1)],
-                      where=[(C_W_ID, EQ, w_id), (C_D_ID, EQ, d_id), (C_ID, EQ, o_c_id)]).ok_or_throw()
-        # self._client.commit()
-        # t2 = time.time()
-        # put_txn(lock,Delivery,t2-t1,True)
-        # self.logger.info('- Delivery')
-
-        self._delivery_stop = True
-        return ServerState.OK
-
-    @transaction_handling
-    def do_stock_level(self, w_id: int, d_id: int, level: int) -> ServerState:
-        self.logger.info(f"do_stock_level, w_id: {w_id}, d_id: {d_id}, level: {level}")
-        # self._client.begin()
-        # self.logger.info('+ Stock Level')
-        res = self._client.select(
-                        table=[DISTRICT],
-                        col=(D_NEXT_O_ID,),
-                        where=[(D_W_ID, EQ, w_id), (D_ID, EQ, d_id)]).is_not_empty_or_throw()
-
-        d_next_o_id = int(res.data[0][0])
-
-        # self.logger.info("d_next_o_id", d_next_o_id)
-        res = self._client.select(
-                        table=[ORDER_LINE],
-                        where=[(OL_W_ID, EQ, w_id),
-                            (OL_D_ID, EQ, d_id),
-                            (OL_O_ID, GE, d_next_o_id - 20),
-                            (OL_O_ID, LT, d_next_o_id)]).is_not_empty_or_throw()
-
-        order_lines = res.data
-        # self.logger.info(order_lines)
-        items = set([int(order_line[5]) for order_line in order_lines])
-        # self.logger.info(items)
-
-        low_stock = 0
-        for item in items:
-            res = self._client.select(
-                            table=[STOCK],
-                            col=(S_QUANTITY,),
-                            where=[(S_I_ID, EQ, item),
-                                (S_W_ID, EQ, w_id),
-                                (S_QUANTITY, LT, level)]).is_not_empty_or_throw()
-
-            cur_quantity = int(res.data[0][0])
-            # low_stock += eval(cur_quantity)
-        # low_stock = self._client.select(
-        #                     table=[STOCK],
-        #                     col=S_QUANTITY,
-        #                     where=[(S_W_ID,eq,w_id),(S_I_ID,eq,ol_i_id),(S_QUANTITY,lt,level)])
-        # self._client.commit()
-        # self.logger.info('- Stock Level')
-        return ServerState.OK
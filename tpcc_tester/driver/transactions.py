@@ -0,0 +1,577 @@
+import logging
+import re
+from typing import Any, Callable, Dict, Generator, List, NamedTuple, Optional
+
+from tpcc_tester.client.base import *
+from tpcc_tester.common import ResultEmpty, ServerError, TpccState, TransactionError
+from tpcc_tester.config import get_config
+from tpcc_tester.db.table_layouts import *
+from tpcc_tester.record.live import IntervalReporter
+from tpcc_tester.record.phases import PhaseTimer
+from tpcc_tester.record.process_record import TpccTransactionType
+from tpcc_tester.util import *
+
+config = get_config()
+
+
+class Call(NamedTuple):
+    """事务体中的一次客户端调用, 如 Call('select', (), {'table': [...], ...})"""
+    method: str
+    args: tuple
+    kwargs: Dict[str, Any]
+
+
+class _CallBuilder:
+    """db.select(...) 返回对应的 Call, 而不是执行它"""
+    def __getattr__(self, method: str) -> Callable[..., Call]:
+        return lambda *args, **kwargs: Call(method, args, kwargs)
+
+
+db = _CallBuilder()
+
+# 事务体: yield 客户端调用, 由执行器在真正的客户端上执行后把 Result send 回来
+TxnBody = Generator[Call, Result, Any]
+
+
+def run_calls(client: DBClient, calls: TxnBody) -> Any:
+    """在同步客户端上执行事务体, 返回事务体的返回值; 客户端抛出的异常交给事务体处理"""
+    try:
+        call = next(calls)
+        while True:
+            try:
+                result = getattr(client, call.method)(*call.args, **call.kwargs)
+            except Exception as e:
+                call = calls.throw(e)
+                continue
+            call = calls.send(result)
+    except StopIteration as e:
+        return e.value
+
+
+async def run_calls_async(client, calls: TxnBody) -> Any:
+    """run_calls 的 asyncio 版本: 客户端的方法返回协程(AsyncRMDBClient)"""
+    try:
+        call = next(calls)
+        while True:
+            try:
+                result = await getattr(client, call.method)(*call.args, **call.kwargs)
+            except Exception as e:
+                call = calls.throw(e)
+                continue
+            call = calls.send(result)
+    except StopIteration as e:
+        return e.value
+
+
+class TpccTransactions:
+    """
+    五种事务的逻辑, TpccDriver(同步)和 AsyncTpccDriver(asyncio)共用.
+
+    事务体是生成器, 每条语句写作 (yield db.select(...)), 不直接访问客户端;
+    两个 driver 只在执行方式上不同: run_calls 直接调用, run_calls_async 逐条 await.
+    子类需要提供 logger, _recorder 和 _phases.
+    """
+    logger: logging.Logger
+    _recorder: Any
+    _phases: Optional[PhaseTimer]
+
+    def phase(self, name: str):
+        """事务体中开始名为 name 的阶段, 上一个阶段在此结束; 未开启阶段计时时什么都不做"""
+        if self._phases is not None:
+            self._phases.phase(name)
+
+    def txn_body(self, txn: TpccTransactionType) -> Callable[..., TxnBody]:
+        return {
+            TpccTransactionType.NewOrder: self.new_order,
+            TpccTransactionType.Payment: self.payment,
+            TpccTransactionType.Delivery: self.delivery,
+            TpccTransactionType.OrderStatus: self.order_status,
+            TpccTransactionType.StockLevel: self.stock_level,
+        }[txn]
+
+    def record_txn(self, txn: TpccTransactionType, ret: TpccState, t1: int, t2: int, retry: int,
+                   reporter: Optional[IntervalReporter]):
+        """记录一次提交或回滚的执行(相对 t_start 的时间); 出错的执行不记录"""
+        if ret == TpccState.Error:
+            return
+        success = ret == TpccState.OK
+        if self._recorder:
+            self._recorder.put_txn(txn, t1, t2, success, retry)
+        if reporter:
+            reporter.put_txn(txn, t1, t2, success)
+
+    def transaction(self, body: Callable[..., TxnBody], *args) -> TxnBody:
+        """在 begin/commit 之间执行事务体, 按异常类型回滚, 返回 TpccState"""
+        self.logger.info(">>>")
+        res = TpccState.OK
+        try:
+            self.phase('begin')
+            yield db.begin()
+            yield from body(*args)
+            # if random.random() < 0.5:
+            #     self._client.abort()
+            #     return TpccState.ClientAbort
+            self.phase('commit')
+            yield db.commit()
+            return TpccState.OK
+        except ResultEmpty as e:
+            self.logger.warning("Result is empty; error: %s", e)
+            res = TpccState.ClientAbort
+            self.phase('abort')
+            yield db.abort()
+        except TransactionError as e:
+            self.logger.warning("Transaction aborted; error: %s", e)
+            # self._client.abort()
+            res = TpccState.ServerAbort
+        except ServerError as e:
+            self.logger.warning("Server error; error: %s", e)
+            self.phase('abort')
+            yield db.abort()
+            res = TpccState.Error
+        except Exception as e:
+            # 未预料的异常只结束这一个事务, 由 run_test 检查连接后继续
+            self.logger.exception("Error: %s, function: %s, args: %s", e, body.__name__, args)
+            self.phase('abort')
+            yield db.abort()
+            res = TpccState.Error
+        self.logger.info("<<<")
+        return res
+
+    @staticmethod
+    def item_stock_queries(i_id: int, supply_w_id: int) -> List[dict]:
+        """NewOrder 中一个商品的 ITEM 和 STOCK 查询(select 的参数)"""
+        return [dict(table=[ITEM],
+                     col=(I_PRICE, I_NAME, I_DATA),
+                     where=[(I_ID, EQ, i_id)]),
+                dict(table=[STOCK],
+                     col=(S_QUANTITY, S_DIST_01, S_DIST_02, S_DIST_03, S_DIST_04, S_DIST_05, S_DIST_06,
+                          S_DIST_07, S_DIST_08, S_DIST_09, S_DIST_10, S_YTD, S_ORDER_CNT, S_REMOTE_CNT, S_DATA),
+                     where=[(S_I_ID, EQ, i_id), (S_W_ID, EQ, supply_w_id)])]
+
+    def new_order(self, w_id: int, d_id: int, c_id: int, ol_i_id: list[int], ol_supply_w_id: list[int], ol_quantity: list[int]) -> TxnBody:
+        self.logger.info("do_new_order, w_id: %s, d_id: %s, c_id: %s, ol_i_id: %s, ol_supply_w_id: %s, ol_quantity: %s",
+                         w_id, d_id, c_id, ol_i_id, ol_supply_w_id, ol_quantity)
+        res = []
+        ol_cnt = len(ol_i_id)
+        ol_amount = 0
+        total_amount = 0
+        brand_generic = ''
+        s_data = ''
+
+        # transcation
+        # self._client.begin()
+        # self.logger.info('+ New Order')
+        # phase 1
+        # 检索仓库（warehouse）税率、区域（district）税率和下一个可用订单号。
+        self.phase('district')
+        res = (yield db.select(
+                        table=[DISTRICT],
+                        col=(D_TAX, D_NEXT_O_ID),
+                        where=[(D_ID, EQ, d_id),
+                            (D_W_ID, EQ, w_id)])).is_not_empty_or_throw()
+
+        d_tax, d_next_o_id = res.data[0]
+
+        (yield db.update(
+                  table=DISTRICT,
+                  row=[(D_NEXT_O_ID, d_next_o_id + 1)],
+                  where=[(D_ID, EQ, d_id), (D_W_ID, EQ, w_id)])).ok_or_throw()
+
+        self.phase('customer_warehouse')
+        res = (yield db.select(
+                        table=[CUSTOMER, WAREHOUSE],
+                        col=(C_DISCOUNT, C_LAST, C_CREDIT, W_TAX),
+                        where=[(W_ID, EQ, w_id), (C_W_ID, EQ, SqlExpr(W_ID)), (C_D_ID, EQ, d_id), (C_ID, EQ, c_id)]
+                        )).is_not_empty_or_throw()
+
+        c_discount, c_last_, c_credit, w_tax = res.data[0]
+
+        # phase 2
+        # 插入订单（order）、新订单（new-order）和新订单行（order-line）。
+        self.phase('insert_order')
+        order_time = current_time()
+        (yield db.insert(
+                  table=ORDERS,
+                  rows=(d_next_o_id, d_id, w_id, c_id, order_time, 0, ol_cnt,
+                        int(len(set(ol_supply_w_id)) == 1)))).ok_or_throw()
+
+        (yield db.insert(
+                  table=NEW_ORDERS,
+                  rows=(d_next_o_id, d_id, w_id))).ok_or_throw()
+
+        # phase 3
+        # order_line 在循环结束后一次插入(MySQL 预处理语句模式下为 executemany)
+        self.phase('items')
+        order_lines = []
+        queries = [query for i in range(ol_cnt) for query in self.item_stock_queries(ol_i_id[i], ol_supply_w_id[i])]
+        # 各商品的 ITEM 和 STOCK 查询互不依赖, pipeline 时一次发送, 再按顺序取各自的响应
+        results = (yield db.select_many(queries)) if config.pipeline else None
+        # 同一商品出现多次时, 后面的行使用本事务更新后的库存, 而不是 pipeline 中读到的旧值
+        stock_updates = {}
+        for i in range(ol_cnt):
+            res = results[2 * i] if results else (yield db.select(**queries[2 * i]))
+            # TPC-C 规范要求, 大约有 1% 的概率, 输入的商品ID是无效的. 在这种情况下, 整个事务必须 回滚 (Abort)
+            i_price, i_name, i_data = res.is_not_empty_or_throw().data[0]
+
+            res = results[2 * i + 1] if results else (yield db.select(**queries[2 * i + 1]))
+            s_quantity, *s_dist, s_ytd, s_order_cnt, s_remote_cnt, s_data = res.is_not_empty_or_throw().data[0]
+            if results and (ol_i_id[i], ol_supply_w_id[i]) in stock_updates:
+                s_quantity, s_ytd, s_order_cnt, s_remote_cnt = stock_updates[(ol_i_id[i], ol_supply_w_id[i])]
+
+            if s_quantity - ol_quantity[i] >= 10:
+                s_quantity -= ol_quantity[i]
+            else:
+                s_quantity = s_quantity - ol_quantity[i] + 91
+
+            s_ytd += ol_quantity[i]
+            s_order_cnt += 1
+
+            if ol_supply_w_id[i] != w_id:
+                s_remote_cnt += 1
+
+            (yield db.update(
+                      table=STOCK,
+                      row=[(S_QUANTITY, s_quantity),
+                           (S_YTD, s_ytd),
+                           (S_ORDER_CNT, s_order_cnt),
+                           (S_REMOTE_CNT, s_remote_cnt)],
+                      where=[(S_I_ID, EQ, ol_i_id[i]),
+                             (S_W_ID, EQ, ol_supply_w_id[i])])).ok_or_throw()
+            stock_updates[(ol_i_id[i], ol_supply_w_id[i])] = (s_quantity, s_ytd, s_order_cnt, s_remote_cnt)
+            ol_amount = ol_quantity[i] * i_price
+            brand_generic = 'B' if re.search('ORIGINAL', i_data) and re.search('ORIGINAL', s_data) else 'G'
+
+            order_lines.append((d_next_o_id, d_id, w_id, i, ol_i_id[i], ol_supply_w_id[i], order_time, ol_quantity[i],
+                                ol_amount, s_dist[d_id - 1]))
+
+            total_amount += ol_amount
+
+        self.phase('insert_order_lines')
+        (yield db.insert_many(table=ORDER_LINE, rows=order_lines)).ok_or_throw()
+
+        total_amount *= (1 - c_discount) * (1 + w_tax + d_tax)
+
+        # self._client.commit()
+        # self.logger.info('- New Order')
+        return ServerState.OK
+
+    def payment(self, w_id: int, d_id: int, c_w_id: int, c_d_id: int, c_query: int | str, h_amount: float) -> TxnBody:
+        self.logger.info("do_payment, w_id: %s, d_id: %s, c_w_id: %s, c_d_id: %s, c_query: %s, h_amount: %s",
+                         w_id, d_id, c_w_id, c_d_id, c_query, h_amount)
+        c_balance = 0
+        c_ytd_payment = 0
+        c_payment_cnt = 0
+        c_credit = 'GC'
+        c_id = 0
+        # self._client.begin()
+        # self.logger.info('+ Payment')
+        self.phase('warehouse')
+        res = (yield db.select(
+                        table=[WAREHOUSE],
+                        col=(W_NAME, W_STREET_1, W_STREET_2, W_CITY, W_STATE, W_ZIP, W_YTD),
+                        where=[(W_ID, EQ, w_id)])).is_not_empty_or_throw()
+
+        w_name, w_street_1, w_street_2, w_city, w_state, w_zip, w_ytd = res.data[0]
+        # w_ytd = eval(w_ytd)
+        (yield db.update(
+                  table=WAREHOUSE,
+                  row=[(W_YTD, SqlExpr(W_YTD + '+{}', h_amount))],
+                  where=[(W_ID, EQ, w_id)])).ok_or_throw()
+
+        self.phase('district')
+        res = (yield db.select(
+                        table=[DISTRICT],
+                        col=(D_NAME, D_STREET_1, D_STREET_2, D_CITY, D_STATE, D_ZIP, D_YTD),
+                        where=[(D_W_ID, EQ, w_id), (D_ID, EQ, d_id)])).is_not_empty_or_throw()
+
+        d_name, d_street_1, d_street_2, d_city, d_state, d_zip, d_ytd = res.data[0]
+
+        # d_ytd = eval(d_ytd)
+        (yield db.update(
+                  table=DISTRICT,
+                  row=[(D_YTD, SqlExpr(D_YTD + '+{}', h_amount))],
+                  where=[(D_W_ID, EQ, w_id), (D_ID, EQ, d_id)])).ok_or_throw()
+
+        self.phase('customer')
+        if type(c_query) == str:
+
+            # TPC-C 2.5.2.2: The customer is selected based on customer last name.
+            # Get the count of matching customers
+            res_count = (yield db.select(
+                table=[CUSTOMER],
+                col=(COUNT(C_ID),),
+                where=[(C_LAST, EQ, c_query), (C_W_ID, EQ, c_w_id), (C_D_ID, EQ, c_d_id)]
+            )).is_not_empty_or_throw()
+            customer_count = res_count.data[0][0]
+
+            # Select all matching customers ordered by first name
+            res_customers = (yield db.select(
+                table=[CUSTOMER],
+                col=(C_ID, C_FIRST, C_MIDDLE, C_LAST, C_STREET_1, C_STREET_2, C_CITY, C_STATE,
+                     C_ZIP, C_PHONE, C_SINCE, C_CREDIT, C_CREDIT_LIM, C_DISCOUNT,
+                     C_BALANCE, C_YTD_PAYMENT, C_PAYMENT_CNT),
+                where=[(C_LAST, EQ, c_query), (C_W_ID, EQ, c_w_id), (C_D_ID, EQ, c_d_id)],
+                order_by=C_FIRST,
+                asc=True
+            )).is_not_empty_or_throw()
+
+            # TPC-C specifies "the row at position (n+1)/2 rounded up..."
+            # For a 0-indexed list, this is (customer_count - 1) // 2
+            middle_index = (customer_count - 1) // 2
+            customer_data = res_customers.data[middle_index]
+
+            # Unpack customer data into local variables
+            c_id, c_first, c_midele, c_last, \
+                c_street_1, c_street_2, c_city, c_state, \
+                c_zip, c_phone, c_since, \
+                c_credit, c_credit_lim, c_discount, c_balance, c_ytd_payment, c_payment_cnt = customer_data
+
+        else:
+            res = (yield db.select(
+                            table=[CUSTOMER],
+                            col=(C_ID, C_FIRST, C_MIDDLE, C_LAST, C_STREET_1, C_STREET_2, C_CITY, C_STATE,
+                                    C_ZIP, C_PHONE, C_SINCE, C_CREDIT, C_CREDIT_LIM, C_DISCOUNT,
+                                    C_BALANCE, C_YTD_PAYMENT, C_PAYMENT_CNT),
+                            where=[(C_ID, EQ, c_query),
+                                    (C_W_ID, EQ, c_w_id),
+                                    (C_D_ID, EQ, c_d_id)])).is_not_empty_or_throw()
+            res = res.data[0]
+            c_id, c_first, c_midele, c_last, \
+                c_street_1, c_street_2, c_city, c_state, \
+                c_zip, c_phone, c_since, \
+                c_credit, c_credit_lim, c_discount, c_balance, c_ytd_payment, c_payment_cnt = res  # result[len(result)//2]
+        (yield db.update(
+                  table=CUSTOMER,
+                  # doubt：这里应该是加，因为支付是客户给银行钱，所以是减少余额，增加ytd_payment
+                  row=[(C_BALANCE, c_balance - h_amount),
+                       (C_YTD_PAYMENT, c_ytd_payment + h_amount),
+                       (C_PAYMENT_CNT, c_payment_cnt + 1)],
+                  where=[(C_W_ID, EQ, c_w_id), (C_D_ID, EQ, c_d_id), (C_ID, EQ, c_id)])).ok_or_throw()
+        if c_credit == 'BC':
+            res = (yield db.select(
+                                table=[CUSTOMER],
+                                col=(C_DATA,),
+                                where=[(C_ID, EQ, c_id),
+                                        (C_W_ID, EQ, c_w_id),
+                                        (C_D_ID, EQ, c_d_id)])).is_not_empty_or_throw()
+            c_data = (''.join(map(str, [c_id, c_d_id, c_w_id, d_id, h_amount]))
+                        + res.data[0][0])[0:config.DATA_MAX]
+            (yield db.update(
+                      table=CUSTOMER,
+                      row=[(C_DATA, c_data)],
+                      where=[(C_W_ID, EQ, c_w_id), (C_D_ID, EQ, c_d_id), (C_ID, EQ, c_id)])).ok_or_throw()
+
+        # 4 blank space
+        self.phase('history')
+        h_data = w_name + '    ' + d_name
+        (yield db.insert(
+                  table=HISTORY,
+                  rows=(c_id, c_d_id, c_w_id, d_id, w_id, current_time(), h_amount,
+                        h_data))).ok_or_throw()
+
+        # self._client.commit()
+        # self.logger.info('- Payment')
+        return ServerState.OK
+
+    def order_status(self, w_id: int, d_id: int, c_query: int | str) -> TxnBody:
+        self.logger.info("do_order_status, w_id: %s, d_id: %s, c_query: %s", w_id, d_id, c_query)
+        c_id = 0 # 不会查出任何结果
+        # self._client.begin()
+        # self.logger.info('+ Order Status')
+        self.phase('customer')
+        # 60% 执⾏
+        if type(c_query) == str:
+            # 当 c_query 是字符串时, 没有正确提取 c_id
+            # c_id 为 0, 导致后续查询 orders 表时找不到记录
+            # 导致 IndexError, 然后事务 ABORT, 进入死循环
+            # 当按姓名查询时, 如果有多个同名客户, 应该选择中间的那个(按 c_first 排序)
+            # 首先查询客户数量
+            res = (yield db.select(
+                            table=[CUSTOMER],
+                            col=(COUNT(C_ID, "count_c_id"),),
+                            where=[(C_LAST, EQ, c_query),
+                                    (C_W_ID, EQ, w_id),
+                                    (C_D_ID, EQ, d_id)])).is_not_empty_or_throw()
+
+            customer_count = res.data[0][0]
+            if customer_count == 0:
+                # 没有找到客户, 应该abort事务
+                # self._client.abort()
+                return ServerState.ABORT
+
+            # 查询客户信息, 按 c_first 排序
+            res = (yield db.select(
+                            table=[CUSTOMER],
+                            col=(C_ID, C_BALANCE, C_FIRST, C_MIDDLE, C_LAST),
+                            where=[(C_LAST, EQ, c_query),
+                                    (C_W_ID, EQ, w_id),
+                                    (C_D_ID, EQ, d_id)],
+                            order_by=C_FIRST,
+                            asc=True)).is_not_empty_or_throw()
+
+            # 根据 TPC-C 规范, 选择中间的客户
+            middle_index = customer_count // 2
+            c_id, c_balance, c_first, c_middle, c_last = res.data[middle_index]
+
+        else:
+            res = (yield db.select(
+                            table=[CUSTOMER],
+                            col=(C_ID, C_BALANCE, C_FIRST, C_MIDDLE, C_LAST),
+                            where=[(C_ID, EQ, c_query),
+                                    (C_W_ID, EQ, w_id),
+                                    (C_D_ID, EQ, d_id)])).is_not_empty_or_throw()
+
+            c_id, c_balance, c_first, c_middle, c_last = res.data[0]
+
+        self.phase('order')
+        # 查询最新的订单
+        res = (yield db.select(
+                        table=[ORDERS],
+                        col=(O_ID, O_ENTRY_D, O_CARRIER_ID),
+                        where=[(O_W_ID, EQ, w_id),
+                            (O_D_ID, EQ, d_id),
+                            (O_C_ID, EQ, c_id)],
+                        order_by=O_ID,
+                        asc=False  # 降序，获取最新的订单
+                        )).is_not_empty_or_throw()
+
+        if len(res.data) == 0:
+            # 该客户没有订单，应该abort事务
+            # self._client.abort()
+            return ServerState.ABORT
+
+        o_id, o_entry_id, o_carrier_id = res.data[0]
+
+        self.phase('order_lines')
+        # 查询订单行
+        res = (yield db.select(  # ol_i_id,ol_supply_w_id,ol_quantity,ol_amount,ol_delivery_d
+                        table=[ORDER_LINE],
+                        col=(OL_I_ID, OL_SUPPLY_W_ID, OL_QUANTITY, OL_AMOUNT, OL_DELIVERY_D),
+                        where=[(OL_W_ID, EQ, w_id),
+                            (OL_D_ID, EQ, d_id),
+                            (OL_O_ID, EQ, o_id)])).is_not_empty_or_throw()
+
+        order_lines = res.data  # 获取所有订单行
+
+        # self._client.commit()
+        # self.logger.info('- Order Status')
+        return ServerState.OK
+
+    def delivery(self, w_id: int, o_carrier_id: int) -> TxnBody:
+        self.logger.info("do_delivery, w_id: %s, o_carrier_id: %s", w_id, o_carrier_id)
+        # t1 = time.time()
+        # self._client.begin()
+        # self.logger.info('+ Delivery')
+        # dat = q.get()
+        # w_id = dat['w_id']
+        # o_carrier_id = dat['o_carrier_id']
+        for d_id in range(1, 11):
+            self.phase('new_order')
+            res = (yield db.select(
+                            table=[NEW_ORDERS],
+                            col=(MIN(NO_O_ID),),
+                            where=[(NO_W_ID, EQ, w_id), (NO_D_ID, EQ, d_id)],
+                            # order_by=NO_O_ID,
+                            # asc=True
+                            )).is_not_empty_or_throw()
+
+            o_id = res.data[0][0]
+            (yield db.delete(
+                      table=NEW_ORDERS,
+                      where=[(NO_W_ID, EQ, w_id), (NO_D_ID, EQ, d_id), (NO_O_ID, EQ, o_id)])).ok_or_throw()
+
+            self.phase('order')
+            res = (yield db.select(
+                            table=[ORDERS],
+                            col=(O_C_ID,),
+                            where=[(O_ID, EQ, o_id), (O_W_ID, EQ, w_id), (O_D_ID, EQ, d_id)])).is_not_empty_or_throw()
+            o_c_id = res.data[0][0]
+
+            (yield db.update(
+                      table=ORDERS,
+                      row=[(O_CARRIER_ID, o_carrier_id)],
+                      where=[(O_ID, EQ, o_id), (O_W_ID, EQ, w_id), (O_D_ID, EQ, d_id)])).ok_or_throw()
+
+            self.phase('order_lines')
+            res = (yield db.select(
+                            table=[ORDER_LINE],
+                            where=[(OL_W_ID, EQ, w_id), (OL_D_ID, EQ, d_id), (OL_O_ID, EQ, o_id)])).is_not_empty_or_throw()
+            order_lines = res.data
+
+            res = (yield db.select(
+                            table=[ORDER_LINE],
+                            col=(SUM(OL_AMOUNT),),
+                            where=[(OL_W_ID, EQ, w_id), (OL_D_ID, EQ, d_id), (OL_O_ID, EQ, o_id)])).is_not_empty_or_throw()
+            ol_amount = res.data[0][0]
+
+            for line in order_lines:
+                (yield db.update(
+                          table=ORDER_LINE,
+                          row=[(OL_DELIVERY_D, current_time())],
+                          where=[(OL_W_ID, EQ, w_id), (OL_D_ID, EQ, d_id),
+                                 (OL_O_ID, EQ, line[0])])).ok_or_throw()
+
+            self.phase('customer')
+            res = (yield db.select(
+                            table=[CUSTOMER],
+                            col=(C_BALANCE, C_DELIVERY_CNT),
+                            where=[(C_W_ID, EQ, w_id), (C_D_ID, EQ, d_id), (C_ID, EQ, o_c_id)])).is_not_empty_or_throw()
+            c_balance, c_delivery_cnt = res.data[0]
+
+            # self.logger.info(c_balance, ol_amount, c_delivery_cnt)
+            (yield db.update(
+                      table=CUSTOMER,
+                      row=[(C_BALANCE, c_balance + ol_amount), (C_DELIVERY_CNT, c_delivery_cnt + 1)],
+                      where=[(C_W_ID, EQ, w_id), (C_D_ID, EQ, d_id), (C_ID, EQ, o_c_id)])).ok_or_throw()
+        # self._client.commit()
+        # t2 = time.time()
+        # put_txn(lock,Delivery,t2-t1,True)
+        # self.logger.info('- Delivery')
+
+        return ServerState.OK
+
+    def stock_level(self, w_id: int, d_id: int, level: int) -> TxnBody:
+        self.logger.info("do_stock_level, w_id: %s, d_id: %s, level: %s", w_id, d_id, level)
+        # self._client.begin()
+        # self.logger.info('+ Stock Level')
+        self.phase('district')
+        res = (yield db.select(
+                        table=[DISTRICT],
+                        col=(D_NEXT_O_ID,),
+                        where=[(D_W_ID, EQ, w_id), (D_ID, EQ, d_id)])).is_not_empty_or_throw()
+
+        d_next_o_id = res.data[0][0]
+
+        # self.logger.info("d_next_o_id", d_next_o_id)
+        self.phase('order_lines')
+        res = (yield db.select(
+                        table=[ORDER_LINE],
+                        where=[(OL_W_ID, EQ, w_id),
+                            (OL_D_ID, EQ, d_id),
+                            (OL_O_ID, GE, d_next_o_id - 20),
+                            (OL_O_ID, LT, d_next_o_id)])).is_not_empty_or_throw()
+
+        order_lines = res.data
+        # self.logger.info(order_lines)
+        items = set([order_line[5] for order_line in order_lines])
+        # self.logger.info(items)
+
+        self.phase('stock')
+        low_stock = 0
+        for item in items:
+            res = (yield db.select(
+                            table=[STOCK],
+                            col=(S_QUANTITY,),
+                            where=[(S_I_ID, EQ, item),
+                                (S_W_ID, EQ, w_id),
+                                (S_QUANTITY, LT, level)])).is_not_empty_or_throw()
+
+            cur_quantity = res.data[0][0]
+            # low_stock += eval(cur_quantity)
+        # low_stock = self._client.select(
+        #                     table=[STOCK],
+        #                     col=S_QUANTITY,
+        #                     where=[(S_W_ID,eq,w_id),(S_I_ID,eq,ol_i_id),(S_QUANTITY,lt,level)])
+        # self._client.commit()
+        # self.logger.info('- Stock Level')
+        return ServerState.OK
@@ -0,0 +1,21 @@
+# python -m tpcc_tester.record --records result/records_all
+from pathlib import Path
+
+from tpcc_tester.config import get_config
+from tpcc_tester.record.process_record import trace_statistics
+
+base_dir = Path('.')
+
+
+def main():
+    config = get_config()
+    result_df = trace_statistics(config.records)
+    print(result_df.to_string(index=False))
+    statistics_file = f'{base_dir.absolute()}/result/trace_statistics.csv'
+    Path(statistics_file).parent.mkdir(exist_ok=True)
+    result_df.to_csv(statistics_file, index=False, sep='\t')
+    print(f"save trace statistics to {statistics_file}")
+
+
+if __name__ == '__main__':
+    main()
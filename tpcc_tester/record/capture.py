@@ -0,0 +1,117 @@
+import json
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+# 捕获文件: 每个进程一个 capture-<pid>.jsonl, 每行一条语句:
+# {"conn": "<pid>-<n>", "txn": 3, "sql": "...", "send": ns, "recv": ns, "state": "OK"}
+# conn 为连接, txn 为该连接上第几个事务(BEGIN 开始, COMMIT/ABORT 结束; 事务外的语句为 null),
+# send/recv 为 time.time_ns(), 不同进程的时间可以直接比较
+
+_BEGIN = ('BEGIN',)
+_END = ('COMMIT', 'ABORT', 'ROLLBACK')
+
+
+class CaptureWriter:
+    def __init__(self, capture_dir: str):
+        Path(capture_dir).mkdir(parents=True, exist_ok=True)
+        self.path = f"{capture_dir}/capture-{os.getpid()}.jsonl"
+        self.f = open(self.path, 'a', buffering=1 << 20)
+        self.connections = 0
+        # conn -> 当前事务序号, 不在事务中为 None
+        self.txns: Dict[str, Optional[int]] = {}
+        self.txn_seq: Dict[str, int] = {}
+
+    def new_connection(self) -> str:
+        conn = f"{os.getpid()}-{self.connections}"
+        self.connections += 1
+        self.txns[conn] = None
+        self.txn_seq[conn] = 0
+        return conn
+
+    def write(self, conn: str, sql: str, state: str, t_send: int, t_recv: int):
+        keyword = sql.lstrip()[:8].rstrip(' ;').upper()
+        if keyword in _BEGIN:
+            self.txn_seq[conn] += 1
+            self.txns[conn] = self.txn_seq[conn]
+        txn = self.txns[conn]
+        if keyword in _END:
+            self.txns[conn] = None
+        self.f.write(json.dumps({'conn': conn, 'txn': txn, 'sql': sql, 'send': t_send, 'recv': t_recv,
+                                 'state': state}) + '\n')
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+_writer: Optional[CaptureWriter] = None
+
+
+def start_capture(capture_dir: str) -> CaptureWriter:
+    """在当前进程开始捕获, 之后创建的 DBClient 的语句都写入 capture_dir; 同一进程多次调用只打开一次"""
+    global _writer
+    if _writer is None or _writer.f.closed:
+        _writer = CaptureWriter(capture_dir)
+    return _writer
+
+
+def stop_capture():
+    global _writer
+    if _writer is not None:
+        _writer.close()
+        _writer = None
+
+
+def current_capture() -> Optional[CaptureWriter]:
+    return _writer
+
+
+def flush_capture():
+    """进程池的 worker 会被复用, 每次测试结束时把缓冲写入文件"""
+    if _writer is not None:
+        _writer.flush()
+
+
+@dataclass
+class CapturedStatement:
+    conn: str
+    txn: Optional[int]
+    sql: str
+    send: int
+    recv: int
+    state: str
+
+    @property
+    def latency(self) -> int:
+        return self.recv - self.send
+
+
+def iter_capture(capture_dir: str) -> Iterator[CapturedStatement]:
+    for path in sorted(Path(capture_dir).glob('capture-*.jsonl')):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    yield CapturedStatement(**json.loads(line))
+
+
+def load_capture(capture_dir: str) -> Dict[str, List[CapturedStatement]]:
+    """按连接分组, 每个连接内按发送时间排序"""
+    connections: Dict[str, List[CapturedStatement]] = {}
+    for stmt in iter_capture(capture_dir):
+        connections.setdefault(stmt.conn, []).append(stmt)
+    for stmts in connections.values():
+        stmts.sort(key=lambda stmt: stmt.send)
+    return connections
+
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def statement_shape(sql: str) -> str:
+    """把常量替换为 ?, 同一模板的语句归为一类"""
+    return _LITERAL.sub('?', sql)
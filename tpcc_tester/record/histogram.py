@@ -0,0 +1,63 @@
+from typing import List
+
+import numpy as np
+
+# HDR 风格的 log-linear 直方图:
+# 小于 2^SUB_BITS 的值每个整数一个桶, 之后每个 2 的幂区间等分为 2^(SUB_BITS-1) 个桶,
+# 相对误差不超过 1/2^(SUB_BITS-1) (约 1.6%); 桶数固定, 多进程之间直接按桶相加即可合并
+SUB_BITS = 7
+_HALF = 1 << (SUB_BITS - 1)
+# 最大可记录约 2^40 ns (18 分钟), 更大的值记入最后一个桶
+MAX_BITS = 40
+N_BUCKETS = (MAX_BITS - SUB_BITS + 2) * _HALF
+
+
+def bucket_index(value: int) -> int:
+    if value < (1 << SUB_BITS):
+        return max(value, 0)
+    shift = value.bit_length() - SUB_BITS
+    return min(shift * _HALF + (value >> shift), N_BUCKETS - 1)
+
+
+def bucket_upper(index: int) -> int:
+    """桶内的最大值"""
+    if index < (1 << SUB_BITS):
+        return index
+    shift = index // _HALF - 1
+    return ((index - shift * _HALF + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """固定大小的延迟直方图(单位 ns), 可跨进程合并"""
+    def __init__(self):
+        self.counts = np.zeros(N_BUCKETS, dtype=np.int64)
+        self.total = 0
+        self.sum = 0
+        self.max = 0
+
+    def record(self, value: int):
+        self.counts[bucket_index(value)] += 1
+        self.total += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: 'LatencyHistogram'):
+        self.counts += other.counts
+        self.total += other.total
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def mean(self) -> float:
+        return self.sum / self.total if self.total else 0.0
+
+    def percentile(self, q: float) -> int:
+        """q in [0, 100]; 返回第一个累计数达到 q% 的桶的上界, 不超过实际最大值"""
+        if self.total == 0:
+            return 0
+        rank = max(int(np.ceil(q / 100 * self.total)), 1)
+        index = int(np.searchsorted(np.cumsum(self.counts), rank))
+        return min(bucket_upper(index), self.max)
+
+    def percentiles(self, qs: List[float]) -> List[int]:
+        return [self.percentile(q) for q in qs]
@@ -0,0 +1,138 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from tpcc_tester.common import setup_logging
+from tpcc_tester.record.process_record import TpccTransactionType
+
+base_dir = Path('.')
+
+N_TXN_TYPES = len(TpccTransactionType)
+
+
+@dataclass
+class IntervalSample:
+    """一个进程在一个时间片内的计数, 按 TpccTransactionType.value 下标"""
+    index: int
+    commits: List[int] = field(default_factory=lambda: [0] * N_TXN_TYPES)
+    aborts: List[int] = field(default_factory=lambda: [0] * N_TXN_TYPES)
+    latency_ns: List[int] = field(default_factory=lambda: [0] * N_TXN_TYPES)
+
+    def merge(self, other: 'IntervalSample'):
+        for i in range(N_TXN_TYPES):
+            self.commits[i] += other.commits[i]
+            self.aborts[i] += other.aborts[i]
+            self.latency_ns[i] += other.latency_ns[i]
+
+
+class IntervalReporter:
+    """
+    worker 侧: 按时间片累计计数, 进入下一个时间片时把上一片推给协调进程.
+
+    时间以所有进程共享的 t_start 为起点, 同一时间片的样本可以直接相加.
+    """
+    def __init__(self, queue, t_start: int, interval: float = 1.0):
+        self.queue = queue
+        self.t_start = t_start
+        self.interval_ns = int(interval * 1_000_000_000)
+        self.sample: Optional[IntervalSample] = None
+
+    def put_txn(self, txn: TpccTransactionType, start_time: int, end_time: int, success: bool):
+        """start_time/end_time 为相对 t_start 的纳秒数, 与 ProcessTxnRecorder.put_txn 一致"""
+        index = end_time // self.interval_ns
+        if self.sample is None or self.sample.index != index:
+            self.flush()
+            self.sample = IntervalSample(index)
+        if success:
+            self.sample.commits[txn.value] += 1
+            self.sample.latency_ns[txn.value] += end_time - start_time
+        else:
+            self.sample.aborts[txn.value] += 1
+
+    def flush(self):
+        if self.sample is not None:
+            self.queue.put(self.sample)
+            self.sample = None
+
+
+class LiveMonitor:
+    """
+    协调进程侧: 后台线程汇总各 worker 的样本, 每个时间片输出一行 tpmC/回滚率.
+
+    worker 只在进入下一个时间片时才推送, 所以输出比当前时间滞后 lag 个时间片;
+    滞后到达的样本仍会计入 timeseries.csv.
+    """
+    def __init__(self, queue, t_start: int, interval: float = 1.0, lag: int = 2):
+        self.logger = setup_logging(f"{__name__}")
+        self.queue = queue
+        self.t_start = t_start
+        self.interval = interval
+        self.lag = lag
+        self.samples: Dict[int, IntervalSample] = {}
+        self.next_index = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._emit(max(self.samples, default=-1))
+
+    def _elapsed_index(self) -> int:
+        return int((time.time_ns() - self.t_start) / 1_000_000_000 / self.interval)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._drain(timeout=self.interval / 4)
+            self._emit(self._elapsed_index() - self.lag)
+        self._drain(timeout=0)
+
+    def _drain(self, timeout: float):
+        try:
+            sample: IntervalSample = self.queue.get(timeout=timeout) if timeout else self.queue.get_nowait()
+            while True:
+                self.samples.setdefault(sample.index, IntervalSample(sample.index)).merge(sample)
+                sample = self.queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _emit(self, upto: int):
+        while self.next_index <= upto:
+            sample = self.samples.get(self.next_index, IntervalSample(self.next_index))
+            print(self.format_line(sample, self.interval))
+            self.next_index += 1
+
+    @staticmethod
+    def format_line(sample: IntervalSample, interval: float) -> str:
+        new_order = TpccTransactionType.NewOrder.value
+        commits, aborts = sum(sample.commits), sum(sample.aborts)
+        abort_rate = aborts / (commits + aborts) * 100 if commits + aborts else 0
+        avg_ms = sample.latency_ns[new_order] / sample.commits[new_order] / 1_000_000 if sample.commits[new_order] else 0
+        return (f"[{(sample.index + 1) * interval:>7.1f}s] tpmC: {sample.commits[new_order] * 60 / interval:>9.1f}  "
+                f"tps: {commits / interval:>8.1f}  abort: {abort_rate:5.2f}%  NewOrder avg: {avg_ms:.2f}ms")
+
+    def to_df(self) -> pd.DataFrame:
+        data = []
+        for index in range(max(self.samples, default=-1) + 1):
+            sample = self.samples.get(index, IntervalSample(index))
+            row = {'time(s)': (index + 1) * self.interval}
+            for txn in TpccTransactionType:
+                row[f'{txn.name}_commit'] = sample.commits[txn.value]
+                row[f'{txn.name}_abort'] = sample.aborts[txn.value]
+            row['tpmC'] = sample.commits[TpccTransactionType.NewOrder.value] * 60 / self.interval
+            data.append(row)
+        return pd.DataFrame(data)
+
+    def save(self):
+        csv_file = f'{base_dir.absolute()}/result/timeseries.csv'
+        self.to_df().to_csv(csv_file, index=False, sep='\t')
+        print(f"save timeseries to {csv_file}")
@@ -0,0 +1,162 @@
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+base_dir = Path('.')
+
+# 一次语句调用在客户端的耗时划分:
+# render 渲染语句, send 写入 socket, wait 等待响应(网络 + 服务器), parse 解析响应, log 记录日志/捕获
+CLIENT_PARTS = ('render', 'send', 'wait', 'parse', 'log')
+
+
+class ClientTimings:
+    """一个连接上累计的客户端耗时(perf_counter_ns)和往返次数, 由 DBClient 在开启时更新"""
+    __slots__ = CLIENT_PARTS + ('round_trips',)
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    def add_call(self, send: int, wait: int, parse: int, round_trips: int = 1):
+        self.send += send
+        self.wait += wait
+        self.parse += parse
+        self.round_trips += round_trips
+
+    def snapshot(self) -> List[int]:
+        return [getattr(self, name) for name in self.__slots__]
+
+
+class PhaseBreakdown:
+    """按事务类型累计各阶段和客户端各部分的耗时(ns), 可跨进程合并"""
+    def __init__(self):
+        # 事务类型 -> 名称 -> 累计 ns; 名称为阶段名或 client:<part>
+        self.totals: Dict[str, Dict[str, int]] = {}
+        self.counts: Dict[str, int] = {}
+        self.rtts: List[int] = []
+
+    def add(self, txn: str, elapsed: int, spans: Dict[str, int]):
+        totals = self.totals.setdefault(txn, {})
+        totals['total'] = totals.get('total', 0) + elapsed
+        for name, value in spans.items():
+            totals[name] = totals.get(name, 0) + value
+        self.counts[txn] = self.counts.get(txn, 0) + 1
+
+    @staticmethod
+    def merge(breakdowns: List['PhaseBreakdown']) -> 'PhaseBreakdown':
+        merged = PhaseBreakdown()
+        for breakdown in breakdowns:
+            for txn, totals in breakdown.totals.items():
+                merged.counts[txn] = merged.counts.get(txn, 0) + breakdown.counts[txn]
+                merged_totals = merged.totals.setdefault(txn, {})
+                for name, value in totals.items():
+                    merged_totals[name] = merged_totals.get(name, 0) + value
+            merged.rtts += breakdown.rtts
+        return merged
+
+    def analysis(self) -> pd.DataFrame:
+        """每种事务平均每次执行(包括回滚的执行)的耗时(ms), 阶段列之和加 other 等于 total"""
+        data = []
+        for txn, totals in self.totals.items():
+            count = self.counts[txn]
+            row = {'type_name': txn, 'count': count}
+            phases = {name: value for name, value in totals.items() if name != 'total' and not name.startswith('client:')}
+            for name, value in phases.items():
+                row[name] = value
+            row['other'] = totals['total'] - sum(phases.values())
+            # 客户端划分: wait 中往返次数 x 基线 RTT 记为 network, 其余记为 server
+            client = {part: totals.get(f'client:{part}', 0) for part in CLIENT_PARTS}
+            network = min(totals.get('client:network', 0), client['wait'])
+            row['client:render'] = client['render']
+            row['client:send'] = client['send']
+            row['client:network'] = network
+            row['client:server'] = client['wait'] - network
+            row['client:parse'] = client['parse']
+            row['client:log'] = client['log']
+            row['client:driver'] = totals['total'] - sum(client.values())
+            row['total'] = totals['total']
+            for name in row:
+                if name not in ('type_name', 'count'):
+                    row[name] = row[name] / count / 1_000_000.0
+            data.append(row)
+        return pd.DataFrame(data).fillna(0.0)
+
+    def output_result(self) -> pd.DataFrame:
+        df = self.analysis()
+        Path(f'{base_dir.absolute()}/result').mkdir(exist_ok=True)
+        breakdown_file = f'{base_dir.absolute()}/result/phase_breakdown.csv'
+        df.to_csv(breakdown_file, index=False, sep='\t')
+        print(f"save phase breakdown to {breakdown_file}")
+        if self.rtts:
+            print(f"baseline RTT of {len(self.rtts)} connection(s): min {min(self.rtts) / 1000:.1f}us, "
+                  f"max {max(self.rtts) / 1000:.1f}us")
+        client_columns = [name for name in df.columns if name.startswith('client:')]
+        phase_columns = [name for name in df.columns
+                         if name not in client_columns and name not in ('type_name', 'count', 'total', 'other')] + ['other']
+        with pd.option_context('display.width', 250):
+            print("phase breakdown (avg ms per execution):")
+            print(df[['type_name', 'count'] + phase_columns + ['total']].round(3).to_string(index=False))
+            print("client time breakdown (avg ms per execution):")
+            print(df[['type_name'] + client_columns + ['total']].round(3).to_string(index=False))
+        return df
+
+
+class PhaseTimer:
+    """
+    一个终端(连接)的阶段计时: begin 开始一个事务, phase(name) 结束上一个阶段并开始新的阶段, end 结束事务.
+
+    同一事务中同名阶段的耗时相加(如 Delivery 的每个地区); 事务结束时同时累计连接上客户端各部分耗时的增量.
+    """
+    def __init__(self, timings: ClientTimings, breakdown: PhaseBreakdown, rtt: int = 0):
+        self.timings = timings
+        self.breakdown = breakdown
+        self.rtt = rtt
+        if rtt:
+            breakdown.rtts.append(rtt)
+        self.txn: Optional[str] = None
+        self.spans: Dict[str, int] = {}
+        self.name: Optional[str] = None
+        self.t_phase = 0
+        self.t_begin = 0
+        self.client_begin: List[int] = []
+
+    def begin(self, txn: str):
+        self.txn = txn
+        self.spans = {}
+        self.name = None
+        self.client_begin = self.timings.snapshot()
+        self.t_begin = self.t_phase = time.perf_counter_ns()
+
+    def phase(self, name: str):
+        now = time.perf_counter_ns()
+        if self.name is not None:
+            self.spans[self.name] = self.spans.get(self.name, 0) + now - self.t_phase
+        self.name, self.t_phase = name, now
+
+    def end(self):
+        if self.txn is None:
+            return
+        self.phase(None)
+        now = self.t_phase
+        spans = self.spans
+        for name, before, after in zip(ClientTimings.__slots__, self.client_begin, self.timings.snapshot()):
+            spans[f'client:{name}'] = after - before
+        spans['client:network'] = spans.pop('client:round_trips') * self.rtt
+        self.breakdown.add(self.txn, now - self.t_begin, spans)
+        self.txn = None
+
+
+_breakdown: Optional[PhaseBreakdown] = None
+
+
+def start_phase_breakdown() -> PhaseBreakdown:
+    """开始新的统计, 之后创建的 driver 的事务都计入返回的 breakdown"""
+    global _breakdown
+    _breakdown = PhaseBreakdown()
+    return _breakdown
+
+
+def current_phase_breakdown() -> Optional[PhaseBreakdown]:
+    return _breakdown
@@ -1,8 +1,7 @@
-from dataclasses import dataclass
 from enum import Enum
 import pathlib
 import sys
-from typing import List
+from typing import List, Optional, Tuple
 import numpy as np
 import pandas as pd
 from pathlib import Path
@@ -15,6 +14,15 @@ sys.path.append(str(project_dir.parent))
 
 from tpcc_tester.common import setup_logging
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+from tpcc_tester.record.histogram import LatencyHistogram
+from tpcc_tester.record.phases import PhaseBreakdown
+from tpcc_tester.record.sql_profile import SqlProfiler
+
 class TpccTransactionType(Enum):
     NewOrder = 0
     Payment = 1
@@ -22,93 +30,247 @@ class TpccTransactionType(Enum):
     OrderStatus = 3
     StockLevel = 4
 
-@dataclass
-class TxnRecord:
-    type: TpccTransactionType
-    start_time: int
-    end_time: int
-    success: bool
+class TxnRecordBuffer:
+    """
+    按列存储的事务明细: 每列一个预分配的 numpy 数组, 写满时容量翻倍.
+
+    每条记录约 22 字节; 导出 DataFrame 和跨进程合并都是整列操作, 没有逐行的 Python 对象.
+    """
+    COLUMNS = {
+        'type': np.int8,
+        'start_time': np.int64,
+        'end_time': np.int64,
+        'success': np.bool_,
+        'retry': np.int16,
+        'worker': np.int16,
+    }
+
+    def __init__(self, capacity: int = 4096):
+        self.size = 0
+        self.columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in self.COLUMNS.items()}
+
+    def __len__(self):
+        return self.size
+
+    def append(self, txn: int, start_time: int, end_time: int, success: bool, retry: int, worker: int):
+        if self.size == len(self.columns['type']):
+            self._grow()
+        i = self.size
+        columns = self.columns
+        columns['type'][i] = txn
+        columns['start_time'][i] = start_time
+        columns['end_time'][i] = end_time
+        columns['success'][i] = success
+        columns['retry'][i] = retry
+        columns['worker'][i] = worker
+        self.size += 1
+
+    def _grow(self):
+        capacity = max(len(self.columns['type']) * 2, 1)
+        for name, column in self.columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            self.columns[name] = grown
+
+    def column(self, name: str) -> np.ndarray:
+        """有效部分的视图, 不复制"""
+        return self.columns[name][:self.size]
+
+    def __getstate__(self):
+        # 跨进程传递时只序列化有效部分
+        return {'size': self.size, 'columns': {name: self.column(name).copy() for name in self.columns}}
+
+    @staticmethod
+    def concatenate(buffers: List['TxnRecordBuffer']) -> 'TxnRecordBuffer':
+        merged = TxnRecordBuffer(0)
+        if buffers:
+            merged.columns = {name: np.concatenate([buffer.column(name) for buffer in buffers])
+                              for name in TxnRecordBuffer.COLUMNS}
+            merged.size = sum(len(buffer) for buffer in buffers)
+        return merged
+
+# TPC-C 5.2.5.4: 各类事务 90% 的响应时间上限(秒)
+RESPONSE_TIME_LIMIT = {
+    TpccTransactionType.NewOrder: 5,
+    TpccTransactionType.Payment: 5,
+    TpccTransactionType.Delivery: 5,
+    TpccTransactionType.OrderStatus: 5,
+    TpccTransactionType.StockLevel: 20,
+}
+
+PERCENTILES = [50, 90, 95, 99, 99.9]
+
 
 class ProcessTxnRecorder:
-    def __init__(self, name: str = "all"):
+    """
+    按事务类型记录成功事务的延迟直方图和提交/回滚数, 内存占用与事务数无关.
+
+    raw=True 时额外保留每个事务的记录(用于 save 输出明细);
+    window 为 (start_time, end_time) 时直方图和回滚数只统计窗口内完成的事务(预热和冷却期的不计入),
+    committed 仍统计所有提交的事务, 用于和数据库中的行数核对.
+    """
+    def __init__(self, name: str = "all", raw: bool = False, window: Optional[Tuple[int, int]] = None, worker: int = 0):
         self.logger = setup_logging(f"{__name__}")
         self.name = name
-        self.transaction_records: list[TxnRecord] = []
+        self.worker = worker
+        self.raw = raw
+        self.window = window
+        self.histograms = {txn: LatencyHistogram() for txn in TpccTransactionType}
+        self.aborts = {txn: 0 for txn in TpccTransactionType}
+        self.committed = {txn: 0 for txn in TpccTransactionType}
+        self.transaction_records = TxnRecordBuffer()
+        # --profile-sql 时为本进程的语句统计
+        self.sql_profiler: Optional[SqlProfiler] = None
+        # --phase-breakdown 时为本进程各事务的阶段耗时
+        self.phase_breakdown: Optional[PhaseBreakdown] = None
+
+    def put_txn(self, txn: TpccTransactionType, start_time: int, end_time: int, success: bool, retry: int = 0):
+        if success:
+            self.committed[txn] += 1
+        if self.window is None or self.window[0] <= end_time < self.window[1]:
+            if success:
+                self.histograms[txn].record(end_time - start_time)
+            else:
+                self.aborts[txn] += 1
+        if self.raw:
+            self.transaction_records.append(txn.value, start_time, end_time, success, retry, self.worker)
 
-    def put_txn(self, txn: TpccTransactionType, start_time: int, end_time: int, success: bool):
-        self.logger.info(f"put_txn: txn: {txn}, start_time: {start_time}, end_time: {end_time}, success: {success}")
-        self.transaction_records.append(TxnRecord(txn, start_time, end_time, success))
+    def count_success(self, txn: TpccTransactionType) -> int:
+        """测量窗口内完成的成功事务数"""
+        return self.histograms[txn].total
 
     def to_df(self):
-        data = []
-        for record in self.transaction_records:
-            data.append({
-                'type': record.type.value,
-                'type_name': record.type.name,
-                'start_time': record.start_time,
-                'end_time': record.end_time,
-                'time': record.end_time - record.start_time,
-                'success': record.success
-            })
-
-        df = pd.DataFrame(data)
+        records = self.transaction_records
+        df = pd.DataFrame({name: records.column(name) for name in TxnRecordBuffer.COLUMNS}, copy=False)
+        df.insert(1, 'type_name', pd.Categorical.from_codes(records.column('type'),
+                                                            categories=[txn.name for txn in TpccTransactionType]))
+        df.insert(4, 'time', records.column('end_time') - records.column('start_time'))
         return df
 
-    def save(self):
-        df = self.to_df()
-        csv_file = f'{base_dir.absolute()}/result/records_{self.name}.csv'
-        df.to_csv(csv_file, index=False, sep ='\t')
-        print(f"save records to {csv_file}")
+    def save(self) -> Optional[Path]:
+        if not self.raw:
+            return None
+        path = save_records(self.transaction_records, base_dir.absolute() / 'result' / f'records_{self.name}')
+        print(f"save records to {path}")
+        return path
 
     @staticmethod
     def merge_records(records: List['ProcessTxnRecorder']):
-        merged_recorder = ProcessTxnRecorder()
+        # 所有进程使用相同的测量窗口
+        merged_recorder = ProcessTxnRecorder(raw=any(recorder.raw for recorder in records),
+                                             window=records[0].window if records else None)
         for recorder in records:
-            merged_recorder.transaction_records.extend(recorder.transaction_records)
-        print(f"merge records from {len(records)} process(es), total {len(merged_recorder.transaction_records)} transactions")
+            for txn in TpccTransactionType:
+                merged_recorder.histograms[txn].merge(recorder.histograms[txn])
+                merged_recorder.aborts[txn] += recorder.aborts[txn]
+                merged_recorder.committed[txn] += recorder.committed[txn]
+        merged_recorder.transaction_records = TxnRecordBuffer.concatenate(
+            [recorder.transaction_records for recorder in records])
+        profilers = [recorder.sql_profiler for recorder in records if recorder.sql_profiler is not None]
+        if profilers:
+            merged_recorder.sql_profiler = SqlProfiler.merge(profilers)
+        breakdowns = [recorder.phase_breakdown for recorder in records if recorder.phase_breakdown is not None]
+        if breakdowns:
+            merged_recorder.phase_breakdown = PhaseBreakdown.merge(breakdowns)
+        total = sum(merged_recorder.histograms[txn].total + merged_recorder.aborts[txn] for txn in TpccTransactionType)
+        print(f"merge records from {len(records)} process(es), total {total} transactions")
         return merged_recorder
 
     def analysis(self):
-        df = self.to_df()
-        # 按事务类型分组并计算统计信息
-        result_df = df.groupby(['type_name']).agg({
-            'time': ['mean', 'sum'],
-            'success': ['sum', 'count']
-        })
-
-        result_df.columns = ['avg_time(ns)', 'total_time(ns)', 'success', 'total']
-        result_df = result_df.reset_index()
+        data = []
+        for txn in TpccTransactionType:
+            histogram = self.histograms[txn]
+            row = {
+                'type_name': txn.name,
+                'success': histogram.total,
+                'total': histogram.total + self.aborts[txn],
+                'fail': self.aborts[txn],
+            }
+            # 延迟只统计成功的事务, time.time_ns() -> ms
+            row['avg_time(ms)'] = histogram.mean() / 1_000_000.0
+            for q, value in zip(PERCENTILES, histogram.percentiles(PERCENTILES)):
+                row[f'p{q}(ms)'] = value / 1_000_000.0
+            row['max(ms)'] = histogram.max / 1_000_000.0
+            row['total_time(s)'] = histogram.sum / 1_000_000_000.0
+            row['p90_ok'] = histogram.percentile(90) <= RESPONSE_TIME_LIMIT[txn] * 1_000_000_000
+            data.append(row)
 
+        result_df = pd.DataFrame(data)
+        result_df = result_df[result_df['total'] > 0].reset_index(drop=True)
         # 计算rollback_rate
-        result_df['fail'] = result_df['total'] - result_df['success']
         result_df['rbk_rate(%)'] = (result_df['fail'] / result_df['total']) * 100
 
-        # time.time_ns() -> ms
-        result_df['avg_time(ms)'] = result_df['avg_time(ns)'] / 1_000_000.0
-        result_df.drop(columns=['avg_time(ns)'], inplace=True)
-
-        result_df['total_time(s)'] = result_df['total_time(ns)'] / 1_000_000_000.0
-        result_df.drop(columns=['total_time(ns)'], inplace=True)
-
         statistics_file = f'{base_dir.absolute()}/result/statistics.csv'
         result_df.to_csv(statistics_file, index=False, sep ='\t')
         print(f"save statistics to {statistics_file}")
 
-        return df, result_df
+        return result_df
 
     def output_result(self) -> int:
-        df, result_df = self.analysis()
+        result_df = self.analysis()
 
         total_transactions = result_df['total'].sum()
         total_rollbacks = result_df['fail'].sum()
 
         total_rollback_rate = (total_rollbacks / total_transactions) * 100 if total_transactions > 0 else 0
-        print(result_df)
+        if self.window is not None:
+            print(f"transactions completed in window [{self.window[0] / 1e9:g}s, {self.window[1] / 1e9:g}s):")
+        print(result_df.to_string(index=False))
         print(f"Total Rollback Rate: {total_rollback_rate:.2f}%")
 
-        # 返回NewOrdersuccess量
-        new_order_success = result_df[result_df['type_name'] == 'NewOrder']['success'].sum() if not result_df.empty else 0
-        return int(new_order_success)
+        # 返回所有提交的 NewOrder 数(包括窗口外的), 用于核对 orders 表的行数
+        return self.committed[TpccTransactionType.NewOrder]
+
+
+def save_records(records: TxnRecordBuffer, path: Path, fmt: Optional[str] = None) -> Path:
+    """
+    二进制保存事务明细: fmt='parquet'(需要 pyarrow, 默认可用时使用)写 path.parquet,
+    fmt='npy' 写 path/ 目录下每列一个 .npy 文件, 读取时可以按列 mmap.
+    """
+    fmt = fmt or ('parquet' if pq is not None else 'npy')
+    if fmt == 'parquet':
+        file = path.with_suffix('.parquet')
+        table = pa.table({name: records.column(name) for name in TxnRecordBuffer.COLUMNS})
+        pq.write_table(table, file)
+        return file
+    path.mkdir(parents=True, exist_ok=True)
+    for name in TxnRecordBuffer.COLUMNS:
+        np.save(path / f'{name}.npy', records.column(name))
+    return path
+
+
+def load_records(path: Path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    读取 save_records 的输出, 只读取 columns 中的列; .npy 以 mmap 方式打开, 不会整体读入内存.
+    path 可以不带后缀(与 save_records 的参数相同), 此时 path.parquet 存在则读取它.
+    """
+    path = Path(path)
+    if path.suffix != '.parquet' and not path.is_dir() and path.with_suffix('.parquet').exists():
+        path = path.with_suffix('.parquet')
+    columns = columns or list(TxnRecordBuffer.COLUMNS)
+    if path.suffix == '.parquet':
+        return pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+    return pd.DataFrame({name: np.load(path / f'{name}.npy', mmap_mode='r') for name in columns}, copy=False)
+
+
+def trace_statistics(path: Path) -> pd.DataFrame:
+    """从保存的明细按事务类型统计, 只读取需要的列"""
+    df = load_records(path, ['type', 'start_time', 'end_time', 'success'])
+    types = df['type'].to_numpy()
+    success = df['success'].to_numpy()
+    latency = df['end_time'].to_numpy() - df['start_time'].to_numpy()
+    data = []
+    for txn in TpccTransactionType:
+        mask = types == txn.value
+        ok = latency[mask & success]
+        row = {'type_name': txn.name, 'success': len(ok), 'total': int(mask.sum())}
+        row['avg_time(ms)'] = ok.mean() / 1_000_000.0 if len(ok) else 0.0
+        for q in PERCENTILES:
+            row[f'p{q}(ms)'] = np.percentile(ok, q) / 1_000_000.0 if len(ok) else 0.0
+        row['max(ms)'] = ok.max() / 1_000_000.0 if len(ok) else 0.0
+        data.append(row)
+    result_df = pd.DataFrame(data)
+    return result_df[result_df['total'] > 0].reset_index(drop=True)
 
 # %%
 
@@ -52,7 +52,7 @@ class Recorder:
 
     def put_new_order(self, time: float):
         self.lock.acquire()
-        self.logger.info(f"put_new_order: {time}")
+        self.logger.info("put_new_order: %s", time)
         cursor = self.conn.cursor()
         cursor.execute('begin transaction;')
         cursor.execute('select no from new_order_txn order by no desc;')
@@ -63,7 +63,7 @@ class Recorder:
 
     def put_txn(self, txn: int, time: float, success: bool):
         self.lock.acquire()
-        self.logger.info(f"put_txn: txn: {txn}, time: {time}, success: {success}")
+        self.logger.info("put_txn: txn: %s, time: %s, success: %s", txn, time, success)
         cursor = self.conn.cursor()
         cursor.execute('begin transaction;')
         cursor.execute('select avg, total, success from test_result where txn = ?', (txn,))
@@ -0,0 +1,71 @@
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from tpcc_tester.record.capture import statement_shape
+from tpcc_tester.record.histogram import LatencyHistogram
+
+base_dir = Path('.')
+
+
+class SqlProfiler:
+    """按语句模板(常量替换为 ?)统计客户端看到的语句耗时(perf_counter_ns), 可跨进程合并"""
+    def __init__(self):
+        self.histograms: Dict[str, LatencyHistogram] = {}
+
+    def record(self, sql: str, elapsed: int):
+        shape = statement_shape(sql)
+        histogram = self.histograms.get(shape)
+        if histogram is None:
+            histogram = self.histograms[shape] = LatencyHistogram()
+        histogram.record(elapsed)
+
+    @staticmethod
+    def merge(profilers: List['SqlProfiler']) -> 'SqlProfiler':
+        merged = SqlProfiler()
+        for profiler in profilers:
+            for shape, histogram in profiler.histograms.items():
+                merged.histograms.setdefault(shape, LatencyHistogram()).merge(histogram)
+        return merged
+
+    def analysis(self) -> pd.DataFrame:
+        data = []
+        for shape, histogram in self.histograms.items():
+            data.append({
+                'template': shape,
+                'count': histogram.total,
+                'avg_time(ms)': histogram.mean() / 1_000_000.0,
+                'p99(ms)': histogram.percentile(99) / 1_000_000.0,
+                'max(ms)': histogram.max / 1_000_000.0,
+                'total_time(s)': histogram.sum / 1_000_000_000.0,
+            })
+        df = pd.DataFrame(data, columns=['template', 'count', 'avg_time(ms)', 'p99(ms)', 'max(ms)', 'total_time(s)'])
+        total = df['total_time(s)'].sum()
+        df['share(%)'] = df['total_time(s)'] / total * 100 if total else 0.0
+        return df.sort_values(by='total_time(s)', ascending=False).reset_index(drop=True)
+
+    def output_result(self, top: int = 20) -> pd.DataFrame:
+        df = self.analysis()
+        Path(f'{base_dir.absolute()}/result').mkdir(exist_ok=True)
+        profile_file = f'{base_dir.absolute()}/result/sql_profile.csv'
+        df.to_csv(profile_file, index=False, sep='\t')
+        print(f"save sql profile to {profile_file}")
+        print(f"top {min(top, len(df))} of {len(df)} statement templates by total time:")
+        with pd.option_context('display.max_colwidth', 100, 'display.width', 250):
+            print(df.head(top).round(3).to_string(index=False))
+        return df
+
+
+_profiler: Optional[SqlProfiler] = None
+
+
+def start_sql_profile() -> SqlProfiler:
+    """开始新的统计, 之后创建的 DBClient 的语句都计入返回的 profiler"""
+    global _profiler
+    _profiler = SqlProfiler()
+    return _profiler
+
+
+def current_sql_profiler() -> Optional[SqlProfiler]:
+    return _profiler
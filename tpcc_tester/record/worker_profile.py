@@ -0,0 +1,196 @@
+import cProfile
+import io
+import pickle
+import pstats
+import shutil
+import sysconfig
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+    from pyinstrument.renderers import ConsoleRenderer, HTMLRenderer
+    from pyinstrument.session import Session
+except ImportError:
+    SamplingProfiler = ConsoleRenderer = HTMLRenderer = Session = None
+
+base_dir = Path('.')
+
+# 每个 worker 的原始统计写入 result/profile/, 主进程合并后写入 result/profile_*
+PROFILE_DIR = 'result/profile'
+_STDLIB_DIR = Path(sysconfig.get_paths()['stdlib'])
+_PROJECT_DIR = Path(__file__).parent.parent.parent
+
+
+def profile_dir() -> Path:
+    return Path(f'{base_dir.absolute()}/{PROFILE_DIR}')
+
+
+def reset_profile_dir():
+    """删除上一次运行的 worker 统计, 避免合并到本次的报告中"""
+    shutil.rmtree(profile_dir(), ignore_errors=True)
+    profile_dir().mkdir(parents=True)
+
+
+class WorkerProfile:
+    """
+    在 with 块中对一个 worker 做 CPU 和内存分析, 退出时写入 profile_dir():
+    CPU 使用 pyinstrument(采样, 已安装时)或 cProfile(确定性, 开销较大), 内存使用 tracemalloc.
+
+    with WorkerProfile(tid):
+        ...
+    """
+    # 每个 worker 保存的分配位置数, 合并时按总大小排序
+    MEMORY_TOP = 200
+
+    def __init__(self, tid: int):
+        self.tid = tid
+        self.profiler = SamplingProfiler() if SamplingProfiler is not None else cProfile.Profile()
+
+    def __enter__(self) -> 'WorkerProfile':
+        tracemalloc.start()
+        if SamplingProfiler is not None:
+            self.profiler.start()
+        else:
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if SamplingProfiler is not None:
+            self.profiler.stop()
+        else:
+            self.profiler.disable()
+        # 先停止 tracemalloc, 导出 CPU 统计的分配不计入内存统计
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+            tracemalloc.Filter(False, '*/pyinstrument/*'),
+        ])
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        path = profile_dir()
+        path.mkdir(parents=True, exist_ok=True)
+        if SamplingProfiler is not None:
+            self.profiler.last_session.save(path / f'worker-{self.tid}.pyisession')
+        else:
+            self.profiler.dump_stats(path / f'worker-{self.tid}.prof')
+        stats = [(stat.traceback[0].filename, stat.traceback[0].lineno, stat.size, stat.count)
+                 for stat in snapshot.statistics('lineno')[:self.MEMORY_TOP]]
+        with open(path / f'worker-{self.tid}.mem.pkl', 'wb') as f:
+            pickle.dump({'current': current, 'peak': peak, 'stats': stats}, f)
+        return False
+
+
+def module_of(filename: str) -> str:
+    """把文件名归到模块: 项目内为相对路径, 第三方库为包名, 标准库为模块名"""
+    if filename.startswith('<frozen '):
+        return filename[len('<frozen '):-1]
+    if filename.startswith('<') or filename == '~':
+        return '<builtin>'
+    path = Path(filename)
+    if 'site-packages' in path.parts:
+        return path.parts[path.parts.index('site-packages') + 1].split('.')[0]
+    if path.is_relative_to(_PROJECT_DIR):
+        return str(path.relative_to(_PROJECT_DIR))
+    if path.is_relative_to(_STDLIB_DIR):
+        return path.relative_to(_STDLIB_DIR).parts[0].removesuffix('.py')
+    return filename
+
+
+def module_times(stats: pstats.Stats) -> pd.DataFrame:
+    """
+    按模块汇总 cProfile 的自身时间(tottime), 直接看出 logging/tqdm/记录/解析各占多少.
+
+    内置函数(socket.recv, list.sort 等)的时间按调用方计入调用方所在的模块.
+    """
+    totals: Dict[str, Tuple[float, int]] = {}
+
+    def add(module: str, tottime: float, ncalls: int):
+        time_, calls = totals.get(module, (0.0, 0))
+        totals[module] = (time_ + tottime, calls + ncalls)
+
+    for (filename, _, _), (_, ncalls, tottime, _, callers) in stats.stats.items():
+        if filename == '~' and callers:
+            for (caller_file, _, _), (_, caller_ncalls, caller_tottime, _) in callers.items():
+                add(module_of(caller_file), caller_tottime, caller_ncalls)
+        else:
+            add(module_of(filename), tottime, ncalls)
+    df = pd.DataFrame([{'module': module, 'calls': calls, 'tottime(s)': time_}
+                       for module, (time_, calls) in totals.items()],
+                      columns=['module', 'calls', 'tottime(s)'])
+    total = df['tottime(s)'].sum()
+    df['share(%)'] = df['tottime(s)'] / total * 100 if total else 0.0
+    return df.sort_values(by='tottime(s)', ascending=False).reset_index(drop=True)
+
+
+def merge_cpu(files: List[Path], top: int) -> str:
+    """合并各 worker 的 CPU 统计, 返回文本报告; 合并后的统计写入 result/profile_cpu.*"""
+    result_dir = profile_dir().parent
+    if files[0].suffix == '.pyisession':
+        session = Session.load(files[0])
+        for file in files[1:]:
+            session = Session.combine(session, Session.load(file))
+        with open(result_dir / 'profile_cpu.html', 'w') as f:
+            f.write(HTMLRenderer().render(session))
+        return ConsoleRenderer(unicode=False, color=False).render(session)
+
+    stats = pstats.Stats(*[str(file) for file in files])
+    stats.dump_stats(result_dir / 'profile_cpu.prof')
+    modules = module_times(stats)
+    modules.to_csv(result_dir / 'profile_modules.csv', index=False, sep='\t')
+    stream = io.StringIO()
+    stream.write(f"self time by module (top {top}):\n")
+    stream.write(modules.head(top).round(3).to_string(index=False))
+    stream.write('\n\n')
+    stats.stream = stream
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(top)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+    return stream.getvalue()
+
+
+def merge_memory(files: List[Path]) -> Tuple[pd.DataFrame, List[Dict]]:
+    """合并各 worker 结束时仍存活的分配(按代码行), 返回合并表和每个 worker 的当前/峰值内存"""
+    rows = []
+    workers = []
+    for file in files:
+        with open(file, 'rb') as f:
+            data = pickle.load(f)
+        workers.append({'worker': file.name.split('.')[0], 'current(MB)': data['current'] / 2 ** 20,
+                        'peak(MB)': data['peak'] / 2 ** 20})
+        rows += [{'file': filename, 'line': lineno, 'size': size, 'count': count}
+                 for filename, lineno, size, count in data['stats']]
+    df = pd.DataFrame(rows, columns=['file', 'line', 'size', 'count'])
+    df = df.groupby(['file', 'line'], as_index=False).sum()
+    df['module'] = df['file'].map(module_of)
+    df['size(KB)'] = df.pop('size') / 1024
+    return df.sort_values(by='size(KB)', ascending=False).reset_index(drop=True), workers
+
+
+def merge_profiles(top: int = 30) -> str:
+    """合并 profile_dir() 中所有 worker 的统计, 打印并保存报告"""
+    path = profile_dir()
+    result_dir = path.parent
+    cpu_files = sorted(path.glob('worker-*.prof')) + sorted(path.glob('worker-*.pyisession'))
+    memory_files = sorted(path.glob('worker-*.mem.pkl'))
+    if not cpu_files:
+        print(f"no worker profile in {path}")
+        return ''
+
+    report = merge_cpu(cpu_files, top)
+    memory, workers = merge_memory(memory_files)
+    memory.to_csv(result_dir / 'profile_memory.csv', index=False, sep='\t')
+    with pd.option_context('display.max_colwidth', 80, 'display.width', 250):
+        report += f"\nmemory per worker:\n{pd.DataFrame(workers).round(2).to_string(index=False)}\n"
+        report += f"\nlive allocations at exit by line (top {top}):\n"
+        report += memory.head(top)[['module', 'line', 'size(KB)', 'count']].round(1).to_string(index=False)
+
+    report_file = result_dir / 'profile.txt'
+    with open(report_file, 'w') as f:
+        f.write(report)
+    print(report)
+    print(f"save profile of {len(cpu_files)} worker(s) to {report_file}")
+    return report
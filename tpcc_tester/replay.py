@@ -0,0 +1,152 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List
+import pathlib
+import sys
+
+file_path = pathlib.Path(__file__)
+file_dir = file_path.parent
+project_dir = file_dir
+base_dir = Path('.')
+sys.path.append(str(project_dir.parent))
+
+import pandas as pd
+
+from tpcc_tester.client import *
+from tpcc_tester.common import Result, ServerState, setup_logging
+from tpcc_tester.config import get_config
+from tpcc_tester.record.capture import CapturedStatement, load_capture, statement_shape
+
+config = get_config()
+
+Unit = List[CapturedStatement]
+
+
+class ReplayEngine:
+    """
+    重放 --capture 捕获的语句: 每个捕获的连接整体分配给一个重放连接, 连接内保持原来的顺序.
+
+    speed > 0 时按原来的时间间隔(除以 speed)发送, 0 为尽快发送;
+    BEGIN/COMMIT/ABORT 通过客户端各自的事务语句发送, 所以可以重放到另一种数据库.
+    事务中某条语句被 abort 时跳过该事务剩余的语句.
+    """
+    def __init__(self, capture_dir: str, client_factory: Callable[[], DBClient], connections: int = 0, speed: float = 1.0):
+        self.capture = load_capture(capture_dir)
+        self.client_factory = client_factory
+        # 0 表示与捕获时的连接数相同
+        self.connections = connections or len(self.capture)
+        self.speed = speed
+        self.logger = setup_logging(f"{__name__}")
+
+    @staticmethod
+    def split_units(stmts: List[CapturedStatement]) -> List[Unit]:
+        """一个事务的语句为一个单元, 事务外的语句各自为一个单元"""
+        units: List[Unit] = []
+        for stmt in stmts:
+            if units and stmt.txn is not None and units[-1][0].txn == stmt.txn:
+                units[-1].append(stmt)
+            else:
+                units.append([stmt])
+        return units
+
+    def assign(self) -> List[List[Unit]]:
+        """按连接的开始时间轮流分配给各重放连接, 每个重放连接上的单元按开始时间排序"""
+        workers: List[List[Unit]] = [[] for _ in range(self.connections)]
+        conns = sorted(self.capture.values(), key=lambda stmts: stmts[0].send)
+        for i, stmts in enumerate(conns):
+            workers[i % self.connections].extend(self.split_units(stmts))
+        for units in workers:
+            units.sort(key=lambda unit: unit[0].send)
+        return workers
+
+    @staticmethod
+    def execute(client: DBClient, sql: str) -> Result:
+        keyword = sql.strip().rstrip(';').strip().upper()
+        if keyword == 'BEGIN':
+            return client.begin()
+        if keyword == 'COMMIT':
+            return client.commit()
+        if keyword in ('ABORT', 'ROLLBACK'):
+            return client.abort()
+        return client.send_cmd(sql)
+
+    def _replay(self, units: List[Unit], t0_capture: int, t0_replay: int) -> List[Dict]:
+        client = self.client_factory()
+        assert client.connect() == ServerState.OK
+        rows = []
+        try:
+            for unit in units:
+                for stmt in unit:
+                    if self.speed > 0:
+                        delay = t0_replay + (stmt.send - t0_capture) / self.speed - time.time_ns()
+                        if delay > 0:
+                            time.sleep(delay / 1_000_000_000)
+                    t1 = time.time_ns()
+                    result = self.execute(client, stmt.sql)
+                    t2 = time.time_ns()
+                    rows.append({'conn': stmt.conn, 'txn': stmt.txn, 'sql': stmt.sql, 'shape': statement_shape(stmt.sql),
+                                 'captured_ns': stmt.latency, 'replay_ns': t2 - t1,
+                                 'captured_state': stmt.state, 'replay_state': result.state.value})
+                    if result.state == ServerState.ABORT:
+                        break
+        finally:
+            client.close()
+        return rows
+
+    def run(self) -> pd.DataFrame:
+        """返回每条语句的捕获延迟和重放延迟"""
+        workers = self.assign()
+        t0_capture = min(stmts[0].send for stmts in self.capture.values())
+        t0_replay = time.time_ns()
+        self.logger.info(f"replaying {sum(len(stmts) for stmts in self.capture.values())} statements "
+                         f"from {len(self.capture)} connections over {self.connections} connections, speed: {self.speed}")
+        with ThreadPoolExecutor(max_workers=self.connections) as executor:
+            futures = [executor.submit(self._replay, units, t0_capture, t0_replay) for units in workers if units]
+            rows = [row for future in futures for row in future.result()]
+        return pd.DataFrame(rows)
+
+    @staticmethod
+    def report(df: pd.DataFrame, top: int = 20) -> pd.DataFrame:
+        """按语句模板汇总延迟变化(ms), 按总变化量排序"""
+        ok = df[(df['captured_state'] == 'OK') & (df['replay_state'] == 'OK')]
+        summary = ok.groupby('shape').agg(count=('sql', 'size'),
+                                          captured_ms=('captured_ns', 'mean'),
+                                          replay_ms=('replay_ns', 'mean'),
+                                          captured_p99_ms=('captured_ns', lambda x: x.quantile(0.99)),
+                                          replay_p99_ms=('replay_ns', lambda x: x.quantile(0.99)))
+        summary[['captured_ms', 'replay_ms', 'captured_p99_ms', 'replay_p99_ms']] /= 1_000_000
+        summary['delta_ms'] = summary['replay_ms'] - summary['captured_ms']
+        summary['delta_pct'] = summary['delta_ms'] / summary['captured_ms'] * 100
+        summary['total_delta_ms'] = summary['delta_ms'] * summary['count']
+        summary = summary.sort_values(by='total_delta_ms', key=abs, ascending=False)
+
+        mismatch = (df['captured_state'] != df['replay_state']).sum()
+        print(f"statements: {len(df)}, state mismatches: {mismatch}, "
+              f"captured: {df['captured_ns'].sum() / 1e9:.2f}s, replay: {df['replay_ns'].sum() / 1e9:.2f}s")
+        with pd.option_context('display.max_colwidth', 80, 'display.width', 200):
+            print(summary.head(top).round(3).to_string())
+        return summary
+
+    @staticmethod
+    def save(df: pd.DataFrame, summary: pd.DataFrame):
+        Path(f'{base_dir.absolute()}/result').mkdir(exist_ok=True)
+        csv_file = f'{base_dir.absolute()}/result/replay.csv'
+        df.to_csv(csv_file, index=False, sep='\t')
+        summary.to_csv(f'{base_dir.absolute()}/result/replay_summary.csv', sep='\t')
+        print(f"save replay result to {csv_file}")
+
+
+# useage: python replay.py --replay result/capture --client mysql --replay-connections 8 --replay-speed 0
+def main():
+    if not config.replay:
+        raise ValueError("--replay DIR is required")
+    engine = ReplayEngine(config.replay, lambda: DBClient.from_type(config.client_type),
+                          config.replay_connections, config.replay_speed)
+    df = engine.run()
+    summary = engine.report(df)
+    engine.save(df, summary)
+
+
+if __name__ == '__main__':
+    main()
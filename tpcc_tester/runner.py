@@ -1,6 +1,7 @@
+import asyncio
 import multiprocessing
 import time
-from typing import List
+from typing import List, Optional, Tuple
 from concurrent.futures import ProcessPoolExecutor, Future
 from multiprocessing.synchronize import Lock as LockBase
 import pathlib
@@ -13,13 +14,26 @@ base_dir = '.'
 sys.path.append(str(project_dir.parent))
 
 from tpcc_tester.client import *
-from tpcc_tester.record.process_record import ProcessTxnRecorder
+from tpcc_tester.record.process_record import ProcessTxnRecorder, TpccTransactionType
+from tpcc_tester.record.live import IntervalReporter, LiveMonitor
+from tpcc_tester.record.capture import flush_capture, start_capture
+from tpcc_tester.record.sql_profile import start_sql_profile
+from tpcc_tester.record.phases import start_phase_breakdown
+from tpcc_tester.record.worker_profile import WorkerProfile, merge_profiles, reset_profile_dir
 from tpcc_tester.driver.tpcc_driver import TpccDriver
+from tpcc_tester.driver.async_tpcc_driver import run_terminals
 from tpcc_tester.common import setup_logging
 from tpcc_tester.config import get_config
+from tpcc_tester.datagen import TxnInputStream
+from tpcc_tester.datagen.loader import report_load_stats
+from tpcc_tester.util import TerminalRandom, run_constants
 
 config = get_config()
 
+# 读写阶段为标准的事务比例, 只读阶段只有 OrderStatus 和 StockLevel
+RW_TXN_PROB = [10 / 23, 10 / 23, 1 / 23, 1 / 23, 1 / 23]
+RO_TXN_PROB = [0, 0, 0, 0.5, 0.5]
+
 # TestRunner只需要一个就行
 class TestRunner:
     def __init__(self, client_type: ClientType):
@@ -35,6 +49,7 @@ class TestRunner:
                 driver.drop()
             except:
                 pass
+        driver.delay_close()
 
     def prepare(self):
         # Driver是每次任务一个
@@ -43,7 +58,7 @@ class TestRunner:
         # driver.send_sql_from_dir(f'{project_dir}/../../tpcc-generator/tpcc_sql/')
         # driver.send_file(f'{project_dir}/../../tpcc-generator/demo.sql')
 
-        driver.load_data()
+        stats = driver.load_data()
 
         if config.validate:
             driver.count_star()
@@ -52,39 +67,113 @@ class TestRunner:
         # driver.create_index() # 建立除history表外其余表的索引
         # driver.load()  # 加载csv数据到9张表
         driver.delay_close()
+        return stats
+
+    def test(self, tid, *args, **kwargs):
+        if not config.profile:
+            return self._test(tid, *args, **kwargs)
+        # 每个 worker 写入自己的 CPU/内存统计, 主进程在所有 worker 结束后合并
+        with WorkerProfile(tid):
+            return self._test(tid, *args, **kwargs)
 
-    def test(self, tid, txns=150, txn_prob=None, seed: int=42, global_lock: LockBase = None):
-        self.logger.info(f'+ Test_{tid} Begin(txns: {txns}, txn_prob: {txn_prob}, seed: {seed})')
+    def _test(self, tid, txns=150, txn_prob=None, seed: int=42, global_lock: LockBase = None,
+              t_start: int = None, deadline: int = None, live_queue=None, input_file: str = None):
+        self.logger.info(f'+ Test_{tid} Begin(txns: {txns}, txn_prob: {txn_prob}, seed: {seed}, deadline: {deadline})')
         # Driver每个线程一个
-        # random seed 不会从父进程复制
+        # 每个进程(终端)使用由 (seed, tid) 派生的独立随机流, 不依赖全局 random 的状态
         # https://152334h.github.io/blog/multiprocessing-and-random/
-        import random
-        random.seed(seed + tid)
         if config.analyze:
-            recorder = ProcessTxnRecorder(f'{tid}')
+            # 按时间运行时只统计测量窗口内完成的事务
+            window = ((config.warmup * 1_000_000_000, (config.warmup + config.duration) * 1_000_000_000)
+                      if config.duration else None)
+            recorder = ProcessTxnRecorder(f'{tid}', raw=config.raw_records, window=window, worker=tid)
+            if config.profile_sql:
+                # 之后创建的连接的语句都计入本进程的统计, 随 recorder 返回给主进程合并
+                recorder.sql_profiler = start_sql_profile()
+            if config.phase_breakdown:
+                # 之后创建的 driver 测量基线 RTT 并记录各阶段耗时
+                recorder.phase_breakdown = start_phase_breakdown()
         else:
             recorder = None
 
+        reporter = IntervalReporter(live_queue, t_start, config.report_interval) if live_queue is not None else None
+        # 预先生成的输入在计时开始前载入, 每个进程消费其中一段; 只读阶段的 tid 接在读写阶段之后
+        inputs = TxnInputStream.load(input_file).shard((tid - 1) % config.thread_num, config.thread_num) if input_file else None
+        if config.capture:
+            # 之后创建的连接的语句都写入本进程的捕获文件
+            start_capture(config.capture)
+
+        if config.terminals > 1:
+            # 一个进程用 asyncio 驱动多个终端, 每个终端一个连接
+            try:
+                asyncio.run(run_terminals(config.terminals, txns // config.terminals, txn_prob, config.CNT_W,
+                                          recorder, t_start, deadline, reporter, inputs, seed, tid))
+            except KeyboardInterrupt:
+                self.logger.info(f'Test_{tid} Canceled')
+            finally:
+                if reporter:
+                    reporter.flush()
+                flush_capture()
+            self.logger.info(f'- Test_{tid} Finished')
+            return recorder
+
         driver = TpccDriver.from_type(self.client_type, scale=config.CNT_W, recorder=recorder, global_lock=global_lock)
         try:
-            driver.run_test(txns, txn_prob)
+            driver.run_test(txns, txn_prob, t_start, deadline, reporter, inputs, TerminalRandom(seed, tid, 0))
         except KeyboardInterrupt:
             self.logger.info(f'Test_{tid} Canceled')
+        finally:
+            if reporter:
+                reporter.flush()
+            flush_capture()
         self.logger.info(f'- Test_{tid} Finished')
         driver.delay_close()
         return recorder
 
+def generate_inputs(path: str, txns: int, txn_prob: List[float], seed: int):
+    if pathlib.Path(path).exists():
+        return
+    t1 = time.time()
+    # 运行时常量只由 config.seed 决定, 读写和只读的输入使用同一组
+    inputs = TxnInputStream.generate(txns, txn_prob, config.CNT_W, seed, *run_constants(config.seed))
+    inputs.save(path)
+    print(f"generate {txns} transaction inputs to {path} in {time.time() - t1:.2f}s")
+
+
+def prepare_inputs() -> Tuple[str, Optional[str]]:
+    """
+    --input-file 不存在时按 --input-txns(默认 --rw) 生成, 之后的运行(包括其他数据库)复用同一个文件;
+    有 --ro 时只读阶段的输入(--ro 个)生成到同目录的 <name>.ro.npz. 返回 (读写输入, 只读输入)
+    """
+    txns = config.input_txns or config.rw
+    if not pathlib.Path(config.input_file).exists() and not txns:
+        raise ValueError("--input-txns (or --rw) is required to generate --input-file")
+    generate_inputs(config.input_file, txns, RW_TXN_PROB, config.seed)
+    if not config.ro:
+        return config.input_file, None
+    ro_file = str(pathlib.Path(config.input_file).with_suffix('.ro.npz'))
+    generate_inputs(ro_file, config.ro, RO_TXN_PROB, config.seed + 1)
+    return config.input_file, ro_file
+
+
 # useage: python runner.py --prepare --thread 8 --rw 150 --ro 150 --analyze
 def main():
     print(f"config: {config}")
+    if config.terminals > 1 and config.client_type != ClientType.RMDB:
+        raise ValueError("--terminals is only supported with --client rmdb")
+    if (config.prepared_statements or config.stored_procedures) and config.client_type != ClientType.MYSQL:
+        raise ValueError("--prepared-statements and --stored-procedures are only supported with --client mysql")
+    if (config.profile_sql or config.phase_breakdown) and not config.analyze:
+        raise ValueError("--profile-sql and --phase-breakdown require --analyze")
+    if config.duration and config.ro:
+        raise ValueError("--ro is not supported with --duration (the timed run uses the read-write mix only)")
 
     runner = TestRunner(config.client_type)
 
-    if config.global_lock:
-        m = multiprocessing.Manager()
-        global_lock = m.Lock()
-    else:
-        global_lock = None
+    m = multiprocessing.Manager() if config.global_lock or config.report_interval else None
+    global_lock = m.Lock() if config.global_lock else None
+    # worker 按时间片推送计数, 协调进程实时输出吞吐
+    live_queue = m.Queue() if config.report_interval else None
 
     if config.clean:
         print("clean all tables!!!")
@@ -95,30 +184,55 @@ def main():
     runner.clean(drop_db=config.prepare)
     if config.prepare:
         lt1 = time.time()
-        runner.prepare()
-        runner.logger.info(f'load time: {time.time() - lt1}')
+        stats = runner.prepare()
+        report_load_stats(stats, time.time() - lt1)
+
+    input_file, ro_input_file = prepare_inputs() if config.input_file else (None, None)
+
+    if config.profile:
+        reset_profile_dir()
 
     t1 = 0
     t2 = 0
     t3 = 0
     futures: List[Future] = []
-    if config.thread_num:
+    # 所有进程的记录都以 t_start 为起点
+    t_start = time.time_ns()
+    monitor = LiveMonitor(live_queue, t_start, config.report_interval).start() if live_queue is not None and config.thread_num else None
+    if config.thread_num and config.duration:
+        # 按时间运行: 所有进程共享 deadline, 只统计测量窗口内完成的事务
+        t1 = time.time()
+        deadline = t_start + (config.warmup + config.duration + config.cooldown) * 1_000_000_000
+        with ProcessPoolExecutor(max_workers=config.thread_num) as executor:
+            for i in range(config.thread_num):
+                future = executor.submit(runner.test, i + 1, 0, RW_TXN_PROB, config.seed, global_lock, t_start, deadline, live_queue, input_file)
+                futures.append(future)
+        t2 = t3 = time.time()
+    elif config.thread_num:
         t1 = time.time()
         if config.rw:
             with ProcessPoolExecutor(max_workers=config.thread_num) as executor:
                 for i in range(config.thread_num):
-                    future = executor.submit(runner.test, i + 1, config.rw // config.thread_num, [10 / 23, 10 / 23, 1 / 23, 1 / 23, 1 / 23], config.seed, global_lock)
+                    future = executor.submit(runner.test, i + 1, config.rw // config.thread_num, RW_TXN_PROB, config.seed, global_lock, t_start, None, live_queue, input_file)
                     futures.append(future)
 
         t2 = time.time()
         if config.ro:
             with ProcessPoolExecutor(max_workers=config.thread_num) as executor:
                 for i in range(config.thread_num):
-                    future = executor.submit(runner.test, 1, config.ro // config.thread_num, [0, 0, 0, 0.5, 0.5], config.seed, global_lock)
+                    # 只读阶段的 tid 接在读写阶段之后, 每个进程的随机流和记录都不同
+                    future = executor.submit(runner.test, config.thread_num + i + 1, config.ro // config.thread_num, RO_TXN_PROB, config.seed, global_lock, t_start, None, live_queue, ro_input_file)
                     futures.append(future)
 
         t3 = time.time()
 
+    if monitor:
+        monitor.stop()
+        monitor.save()
+
+    if config.profile:
+        merge_profiles()
+
     if config.analyze:
         records: List[ProcessTxnRecorder] = []
 
@@ -128,6 +242,10 @@ def main():
         all_records = ProcessTxnRecorder.merge_records(records)
         all_records.save()
         new_order_success = all_records.output_result()
+        if all_records.sql_profiler is not None:
+            all_records.sql_profiler.output_result(config.profile_sql)
+        if all_records.phase_breakdown is not None:
+            all_records.phase_breakdown.output_result()
 
     if config.validate:
         driver = TpccDriver.from_type(config.client_type, scale=config.warehouse, recorder=None)
@@ -135,12 +253,19 @@ def main():
 
         if config.analyze:
             driver.consistency_check2(new_order_success)
+        driver.delay_close()
 
     if config.analyze:
         print(f'total time of rw txns: {t2 - t1}')
         print(f'total time of ro txns: {t3 - t2}')
         print(f'total time: {t3 - t1}')
-        print(f'tpmC: {new_order_success / ((t3 - t1) / 60)}')
+        if config.duration:
+            new_order_window = all_records.count_success(TpccTransactionType.NewOrder)
+            print(f'measurement window: [{config.warmup}s, {config.warmup + config.duration}s), '
+                  f'new order success: {new_order_window}')
+            print(f'tpmC: {new_order_window / (config.duration / 60)}')
+        else:
+            print(f'tpmC: {new_order_success / ((t3 - t1) / 60)}')
 
 
 if __name__ == '__main__':
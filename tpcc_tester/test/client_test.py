@@ -55,7 +55,7 @@ class ClientTestCase(unittest.TestCase):
             self.assertEqual(result.state, ServerState.OK)
             result = client.send_dql("SELECT * FROM test;")
             self.assertEqual(result.state, ServerState.OK)
-            self.assertEqual(result.data, [['1', 'test']])
+            self.assertEqual(result.data, [[1, 'test']])
             self.logger.info("\n" + result.result_str)
 
     def update(self):
@@ -64,7 +64,7 @@ class ClientTestCase(unittest.TestCase):
             self.assertEqual(result.state, ServerState.OK)
             result = client.send_dql("SELECT * FROM test;")
             self.assertEqual(result.state, ServerState.OK)
-            self.assertEqual(result.data, [['1', 'test2']])
+            self.assertEqual(result.data, [[1, 'test2']])
             self.logger.info("\n" + result.result_str)
 
     def delete(self):
@@ -86,7 +86,7 @@ class ClientTestCase(unittest.TestCase):
             self.assertEqual(result.state, ServerState.OK)
             result = client.send_dql("SELECT * FROM test;")
             self.assertEqual(result.state, ServerState.OK)
-            self.assertEqual(result.data, [['2', 'test2']])
+            self.assertEqual(result.data, [[2, 'test2']])
             self.logger.info("\n" + result.result_str)
 
     def rollback(self):
@@ -99,7 +99,7 @@ class ClientTestCase(unittest.TestCase):
             self.assertEqual(result.state, ServerState.OK)
             result = client.send_dql("SELECT * FROM test;")
             self.assertEqual(result.state, ServerState.OK)
-            self.assertEqual(result.data, [['2', 'test2']])
+            self.assertEqual(result.data, [[2, 'test2']])
             self.logger.info("\n" + result.result_str)
 
 if __name__ == "__main__":
@@ -0,0 +1,156 @@
+# PYTHONPATH=. python test/datagen_test.py
+import pathlib
+import sys
+import tempfile
+
+file_path = pathlib.Path(__file__)
+file_dir = file_path.parent
+sys.path.append(str(file_dir.parent.parent))
+
+import unittest
+from tpcc_tester.datagen import TpccDataGenerator, TxnInputStream, generate_csvs
+from tpcc_tester.datagen.loader import FifoBuffer, InsertStreamLoader
+from tpcc_tester.db.table_layouts import *
+from tpcc_tester.client.base import ClientType
+from tpcc_tester.driver.load_orchestrator import LoadOrchestrator
+from tpcc_tester.record.process_record import TpccTransactionType
+from tpcc_tester.driver.tpcc_driver import TpccDriver
+from tpcc_tester.util import TerminalRandom
+
+
+class DataGenTestCase(unittest.TestCase):
+    def setUp(self):
+        self.generator = TpccDataGenerator(warehouses=2, seed=42)
+
+    def test_columns(self):
+        for table in load_order:
+            chunk = next(self.generator.iter_table(table))
+            self.assertEqual(len(chunk.columns), num_of_cols[table])
+            self.assertTrue(all(len(col) == chunk.rows for col in chunk.columns))
+
+    def test_row_counts(self):
+        rows = {table: sum(chunk.rows for chunk in self.generator.iter_table(table)) for table in load_order}
+        self.assertEqual(rows[WAREHOUSE], 2)
+        self.assertEqual(rows[ITEM], 100000)
+        self.assertEqual(rows[STOCK], 2 * 100000)
+        self.assertEqual(rows[CUSTOMER], 2 * 10 * 3000)
+        self.assertEqual(rows[NEW_ORDERS], 2 * 10 * 900)
+        o_ol_cnt = [int(cnt) for w_id in (1, 2) for cnt in self.generator.orders(w_id).columns[6].tolist()]
+        self.assertTrue(all(5 <= cnt <= 15 for cnt in o_ol_cnt))
+        self.assertEqual(rows[ORDER_LINE], sum(o_ol_cnt))
+
+    def test_ol_number(self):
+        chunk = self.generator.order_line(1)
+        o_id, ol_number = chunk.columns[0].tolist(), chunk.columns[3].tolist()
+        self.assertEqual(ol_number[0], b'1')
+        # 每个订单的 ol_number 连续递增, 新订单从 1 开始
+        for i in range(1, 200):
+            expected = int(ol_number[i - 1]) + 1 if o_id[i] == o_id[i - 1] else 1
+            self.assertEqual(int(ol_number[i]), expected)
+
+    def test_string_lengths(self):
+        chunk = self.generator.item(1, 1001)
+        i_name = chunk.columns[2]
+        lengths = [len(name) for name in i_name.tolist()]
+        self.assertGreaterEqual(min(lengths), 14)
+        self.assertLessEqual(max(lengths), 24)
+        self.assertTrue(all(name.isalpha() for name in i_name.tolist()))
+
+    def test_deterministic(self):
+        other = TpccDataGenerator(warehouses=2, seed=42)
+        self.assertEqual(self.generator.customer(2).to_csv(), other.customer(2).to_csv())
+        self.assertNotEqual(self.generator.customer(2).to_csv(), TpccDataGenerator(2, seed=7).customer(2).to_csv())
+
+    def test_generate_csvs(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            csv_files = generate_csvs(data_dir, warehouses=1, seed=42)
+            with open(csv_files[DISTRICT]) as f:
+                lines = f.read().splitlines()
+            self.assertEqual(lines[0].split(','), [name for name, _ in table_columns[DISTRICT]])
+            self.assertEqual(len(lines), 1 + 10)
+
+    def test_parallel_identical(self):
+        with tempfile.TemporaryDirectory() as serial_dir, tempfile.TemporaryDirectory() as parallel_dir:
+            serial = TpccDataGenerator(warehouses=2, seed=42).write_csvs(serial_dir)
+            parallel = TpccDataGenerator(warehouses=2, seed=42).write_csvs(parallel_dir, workers=3)
+            for table in load_order:
+                self.assertEqual(serial[table].read_bytes(), parallel[table].read_bytes(), table)
+            self.assertEqual(list(pathlib.Path(parallel_dir).glob('*.part')), [])
+
+    def test_insert_statements(self):
+        loader = InsertStreamLoader(client=None, generator=self.generator, batch_rows=4)
+        statements = list(loader.iter_statements(DISTRICT, keys=[1]))
+        self.assertEqual([rows for _, rows in statements], [4, 4, 2])
+        sql = statements[0][0]
+        self.assertTrue(sql.startswith("insert into district values (1,1,'"))
+        self.assertTrue(sql.endswith(",3001);"))
+
+    def test_fifo_buffer(self):
+        chunks = [b'1,2\n', b'3,4\n']
+        with FifoBuffer(chunks) as fifo:
+            with open(fifo.path, 'rb') as f:
+                self.assertEqual(f.read(), b''.join(chunks))
+        # 读端从未打开时也能正常退出
+        with FifoBuffer(chunks):
+            pass
+
+        # 生成数据时的异常在退出时重新抛出, 读端此时只读到部分数据
+        def broken():
+            yield b'1,2\n'
+            raise ValueError('bad row')
+        with self.assertRaises(ValueError):
+            with FifoBuffer(broken()) as fifo:
+                with open(fifo.path, 'rb') as f:
+                    self.assertEqual(f.read(), b'1,2\n')
+
+    def test_load_tasks(self):
+        orchestrator = LoadOrchestrator(ClientType.RMDB, warehouses=3, workers=2)
+        tasks = orchestrator.tasks()
+        # 大表先提交, 每张大表最多分成 workers 份且覆盖所有仓库
+        self.assertEqual(tasks[0][0], ORDER_LINE)
+        for table in [ORDER_LINE, STOCK]:
+            keys = sorted(k for t, ks in tasks if t == table for k in ks)
+            self.assertEqual(keys, [1, 2, 3])
+        self.assertIn((ITEM, None), tasks)
+
+    def test_input_stream(self):
+        inputs = TxnInputStream.generate(2000, [10 / 23, 10 / 23, 1 / 23, 1 / 23, 1 / 23], scale=2, seed=42,
+                                         C_LAST=1, C_ID=2, C_OL_I_ID=3)
+        txns = [txn for txn, _ in inputs]
+        self.assertAlmostEqual(txns.count(TpccTransactionType.NewOrder) / len(txns), 10 / 23, delta=0.05)
+        for txn, args in inputs:
+            if txn == TpccTransactionType.NewOrder:
+                w_id, d_id, c_id, ol_i_id, ol_supply_w_id, ol_quantity = args
+                self.assertTrue(5 <= len(ol_i_id) <= 15)
+                self.assertEqual(len(ol_i_id), len(ol_supply_w_id))
+                self.assertEqual(len(ol_i_id), len(ol_quantity))
+                self.assertTrue(all(1 <= i_id <= 100000 for i_id in ol_i_id))
+                self.assertTrue(1 <= c_id <= 3000 and 1 <= d_id <= 10 and w_id in (1, 2))
+            elif txn == TpccTransactionType.OrderStatus:
+                self.assertIsInstance(args[2], (int, str))
+
+        # 保存后载入, 按进程切分后拼接与原序列相同
+        with tempfile.TemporaryDirectory() as tmp:
+            inputs.save(f"{tmp}/inputs.npz")
+            loaded = TxnInputStream.load(f"{tmp}/inputs.npz")
+        shards = [loaded.shard(i, 3) for i in range(3)]
+        self.assertEqual(sum(len(shard) for shard in shards), len(inputs))
+        self.assertEqual([args for shard in shards for args in shard], list(inputs))
+
+
+    def test_terminal_random(self):
+        def stream(*spawn_key):
+            rng = TerminalRandom(42, *spawn_key)
+            return [TpccDriver.txn_args(rng, TpccTransactionType.NewOrder, 2) for _ in range(20)]
+
+        # 同一 (seed, tid, 终端) 的输入可复现, 不同终端的输入互相独立
+        self.assertEqual(stream(1, 0), stream(1, 0))
+        self.assertNotEqual(stream(1, 0), stream(2, 0))
+        self.assertNotEqual(stream(1, 0), stream(1, 1))
+        # NURand 的常量只取决于 seed
+        first, second = TerminalRandom(42, 1, 0), TerminalRandom(42, 2, 3)
+        self.assertEqual((first.C_LAST, first.C_ID, first.C_OL_I_ID), (second.C_LAST, second.C_ID, second.C_OL_I_ID))
+
+
+if __name__ == "__main__":
+    unittest.main()
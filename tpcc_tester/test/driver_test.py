@@ -0,0 +1,80 @@
+# PYTHONPATH=. python test/driver_test.py
+import pathlib
+import sys
+
+file_path = pathlib.Path(__file__)
+file_dir = file_path.parent
+sys.path.append(str(file_dir.parent.parent))
+
+import asyncio
+import unittest
+from tpcc_tester.common import Result, ServerState, TpccState, setup_logging
+from tpcc_tester.db.table_layouts import STOCK
+from tpcc_tester.driver.transactions import TpccTransactions, db, run_calls, run_calls_async
+
+
+class FakeClient:
+    """记录每次调用的方法名; 查询返回一行全为 1 的结果, empty 中的表返回空结果"""
+    def __init__(self, empty=()):
+        self.calls = []
+        self.empty = set(empty)
+
+    def __getattr__(self, method):
+        def call(*args, **kwargs):
+            self.calls.append(method)
+            if method != 'select':
+                return Result(ServerState.OK, [], [], '')
+            data = [] if kwargs['table'][0] in self.empty else [[1] * 10]
+            return Result(ServerState.OK, ['col'], data, '')
+        return call
+
+
+class AsyncFakeClient(FakeClient):
+    def __getattr__(self, method):
+        call = super().__getattr__(method)
+
+        async def async_call(*args, **kwargs):
+            return call(*args, **kwargs)
+        return async_call
+
+
+class Terminal(TpccTransactions):
+    def __init__(self):
+        self.logger = setup_logging(f"{__name__}")
+        self._recorder = None
+        self._phases = None
+
+
+class DriverTestCase(unittest.TestCase):
+    def test_sync_and_async_run_same_calls(self):
+        terminal = Terminal()
+        client, async_client = FakeClient(), AsyncFakeClient()
+        ret = run_calls(client, terminal.transaction(terminal.stock_level, 1, 1, 10))
+        async_ret = asyncio.run(run_calls_async(async_client, terminal.transaction(terminal.stock_level, 1, 1, 10)))
+        self.assertEqual(ret, TpccState.OK)
+        self.assertEqual(async_ret, TpccState.OK)
+        self.assertEqual(client.calls, ['begin', 'select', 'select', 'select', 'commit'])
+        self.assertEqual(async_client.calls, client.calls)
+
+    def test_empty_result_aborts(self):
+        terminal = Terminal()
+        client = FakeClient(empty=[STOCK])
+        ret = run_calls(client, terminal.transaction(terminal.stock_level, 1, 1, 10))
+        self.assertEqual(ret, TpccState.ClientAbort)
+        self.assertEqual(client.calls, ['begin', 'select', 'select', 'select', 'abort'])
+
+    def test_unexpected_error_returns_error(self):
+        terminal = Terminal()
+        client = FakeClient()
+
+        def broken(w_id):
+            yield db.select(table=[STOCK])
+            raise KeyError(w_id)
+        ret = run_calls(client, terminal.transaction(broken, 1))
+        # 不退出进程, 回滚后返回 Error, 由 run_test 检查连接后继续
+        self.assertEqual(ret, TpccState.Error)
+        self.assertEqual(client.calls, ['begin', 'select', 'abort'])
+
+
+if __name__ == "__main__":
+    unittest.main()
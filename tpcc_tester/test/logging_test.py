@@ -0,0 +1,78 @@
+# PYTHONPATH=. python test/logging_test.py
+import pathlib
+import sys
+
+file_path = pathlib.Path(__file__)
+file_dir = file_path.parent
+sys.path.append(str(file_dir.parent.parent))
+
+import logging
+import multiprocessing
+import os
+import tempfile
+import unittest
+from tpcc_tester.common import AsyncFileHandler, flush_logging, setup_file_handler
+
+
+def _log_in_child(logger_name: str):
+    logging.getLogger(logger_name).info("from child")
+    flush_logging()
+
+
+class _Expensive:
+    def __init__(self):
+        self.formatted_in = None
+
+    def __str__(self):
+        self.formatted_in = os.getpid(), __import__('threading').current_thread().name
+        return "expensive"
+
+
+class LoggingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def make_logger(self, name: str, max_bytes: int = 0) -> logging.Logger:
+        logger = logging.getLogger(name)
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+        handler = setup_file_handler(f"{self.dir.name}/{name}.log", logging.DEBUG, '%(message)s', max_bytes)
+        self.assertIsInstance(handler, AsyncFileHandler)
+        logger.addHandler(handler)
+        return logger
+
+    def test_background_writer(self):
+        logger = self.make_logger('logging_test_background')
+        arg = _Expensive()
+        logger.info("value: %s", arg)
+        flush_logging()
+        self.assertEqual(open(f"{self.dir.name}/logging_test_background.log").read(), "value: expensive\n")
+        # 参数在后台线程中格式化
+        self.assertNotEqual(arg.formatted_in[1], 'MainThread')
+
+    def test_per_process_file(self):
+        logger = self.make_logger('logging_test_child')
+        logger.info("from parent")
+        process = multiprocessing.get_context('fork').Process(target=_log_in_child, args=(logger.name,))
+        process.start()
+        process.join()
+        flush_logging()
+        self.assertEqual(open(f"{self.dir.name}/logging_test_child.log").read(), "from parent\n")
+        child_file = f"{self.dir.name}/{process.pid}/logging_test_child.log"
+        self.assertEqual(open(child_file).read(), "from child\n")
+
+    def test_rotation(self):
+        logger = self.make_logger('logging_test_rotate', max_bytes=1024)
+        for i in range(200):
+            logger.info(f"line {i:04d}")
+        flush_logging()
+        files = sorted(os.listdir(self.dir.name))
+        self.assertIn('logging_test_rotate.log.1.gz', files)
+        self.assertIn('logging_test_rotate.log', files)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+# PYTHONPATH=. python test/record_test.py
+import pathlib
+import sys
+
+file_path = pathlib.Path(__file__)
+file_dir = file_path.parent
+sys.path.append(str(file_dir.parent.parent))
+
+import unittest
+import pickle
+import queue
+import tempfile
+from pathlib import Path
+from tpcc_tester.record.live import IntervalReporter, LiveMonitor
+from tpcc_tester.record.histogram import LatencyHistogram
+from tpcc_tester.record.phases import ClientTimings, PhaseBreakdown, PhaseTimer
+from tpcc_tester.record.sql_profile import SqlProfiler
+from tpcc_tester.record import worker_profile
+from tpcc_tester.record.process_record import (PERCENTILES, ProcessTxnRecorder, TpccTransactionType,
+                                               load_records, pq, save_records, trace_statistics)
+
+
+class RecordTestCase(unittest.TestCase):
+    def test_count_success_in_window(self):
+        recorder = ProcessTxnRecorder('test', window=(10, 20))
+        recorder.put_txn(TpccTransactionType.NewOrder, 0, 5, True)     # 预热期内完成
+        recorder.put_txn(TpccTransactionType.NewOrder, 8, 12, True)    # 窗口内完成
+        recorder.put_txn(TpccTransactionType.NewOrder, 12, 15, False)  # 回滚
+        recorder.put_txn(TpccTransactionType.Payment, 12, 15, True)
+        recorder.put_txn(TpccTransactionType.NewOrder, 18, 20, True)   # 冷却期内完成
+        self.assertEqual(recorder.count_success(TpccTransactionType.NewOrder), 1)
+        self.assertEqual(len(recorder.transaction_records), 0)
+        # 窗口外的事务不计入直方图和回滚数, 但计入提交数
+        recorder.put_txn(TpccTransactionType.NewOrder, 20, 25, False)
+        self.assertEqual(recorder.histograms[TpccTransactionType.NewOrder].total, 1)
+        self.assertEqual(recorder.aborts[TpccTransactionType.NewOrder], 1)
+        self.assertEqual(recorder.committed[TpccTransactionType.NewOrder], 3)
+        merged = ProcessTxnRecorder.merge_records([recorder, recorder])
+        self.assertEqual(merged.window, (10, 20))
+        self.assertEqual(merged.count_success(TpccTransactionType.NewOrder), 2)
+        self.assertEqual(merged.committed[TpccTransactionType.NewOrder], 6)
+
+    def test_histogram_percentiles(self):
+        histogram = LatencyHistogram()
+        for value in range(1, 100_001):
+            histogram.record(value * 1000)
+        self.assertEqual(histogram.max, 100_000_000)
+        for q in PERCENTILES:
+            expected = q / 100 * 100_000_000
+            self.assertLessEqual(abs(histogram.percentile(q) - expected) / expected, 1 / 64)
+
+    def test_merge_histograms(self):
+        recorders = [ProcessTxnRecorder(f'{i}') for i in range(2)]
+        recorders[0].put_txn(TpccTransactionType.NewOrder, 0, 1_000_000, True)
+        recorders[1].put_txn(TpccTransactionType.NewOrder, 0, 3_000_000, True)
+        recorders[1].put_txn(TpccTransactionType.NewOrder, 0, 2_000_000, False)
+        merged = ProcessTxnRecorder.merge_records(recorders)
+        histogram = merged.histograms[TpccTransactionType.NewOrder]
+        self.assertEqual((histogram.total, histogram.max, histogram.mean()), (2, 3_000_000, 2_000_000))
+        self.assertEqual(merged.aborts[TpccTransactionType.NewOrder], 1)
+
+    def test_sql_profile(self):
+        recorders = []
+        for worker in range(2):
+            recorder = ProcessTxnRecorder(f'{worker}')
+            recorder.sql_profiler = SqlProfiler()
+            for w_id in range(1, 11):
+                recorder.sql_profiler.record(f"select w_tax from warehouse where w_id={w_id} ;", 1_000_000)
+            recorder.sql_profiler.record("update district set d_name='a''b' where d_id=3 ;", 5_000_000)
+            # worker 的结果通过 pickle 返回主进程
+            recorders.append(pickle.loads(pickle.dumps(recorder)))
+        df = ProcessTxnRecorder.merge_records(recorders).sql_profiler.analysis()
+        self.assertEqual(list(df['template']), ["select w_tax from warehouse where w_id=? ;",
+                                                "update district set d_name=? where d_id=? ;"])
+        self.assertEqual(list(df['count']), [20, 2])
+        self.assertAlmostEqual(df['total_time(s)'][0], 0.02)
+        self.assertAlmostEqual(df['share(%)'].sum(), 100)
+
+    def test_phase_breakdown(self):
+        breakdowns = []
+        for worker in range(2):
+            timings = ClientTimings()
+            timer = PhaseTimer(timings, PhaseBreakdown(), rtt=1000)
+            for _ in range(3):
+                timer.begin('NewOrder')
+                timer.phase('district')
+                timings.render += 10
+                timings.add_call(send=100, wait=5000, parse=200)
+                timer.phase('items')
+                timings.add_call(send=100, wait=500, parse=200)
+                timings.log += 50
+                timer.end()
+            breakdowns.append(pickle.loads(pickle.dumps(timer.breakdown)))
+        merged = PhaseBreakdown.merge(breakdowns)
+        self.assertEqual(merged.counts, {'NewOrder': 6})
+        self.assertEqual(merged.rtts, [1000, 1000])
+        row = merged.analysis().iloc[0]
+        # 阶段之和加 other 等于 total, 客户端各部分之和加 driver 也等于 total
+        self.assertAlmostEqual(row['district'] + row['items'] + row['other'], row['total'])
+        client = [name for name in row.index if name.startswith('client:')]
+        self.assertAlmostEqual(sum(row[name] for name in client), row['total'])
+        # 每个事务 2 次往返 x 1000ns 的基线 RTT 记为 network
+        self.assertAlmostEqual(row['client:network'], 2000 / 1_000_000)
+        self.assertAlmostEqual(row['client:server'], 3500 / 1_000_000)
+
+    def test_worker_profile(self):
+        def workload():
+            recorder = ProcessTxnRecorder('test')
+            for i in range(1000):
+                recorder.put_txn(TpccTransactionType.Payment, i, i + 1, True)
+            return recorder
+
+        old_base_dir = worker_profile.base_dir
+        with tempfile.TemporaryDirectory() as result_dir:
+            worker_profile.base_dir = Path(result_dir)
+            try:
+                worker_profile.reset_profile_dir()
+                kept = []
+                for tid in (1, 2):
+                    with worker_profile.WorkerProfile(tid):
+                        kept.append(workload())
+                self.assertEqual(len(list(worker_profile.profile_dir().glob('worker-*.mem.pkl'))), 2)
+                report = worker_profile.merge_profiles()
+                self.assertIn('put_txn', report)
+                self.assertIn('worker-2', report)
+                self.assertTrue((Path(result_dir) / 'result' / 'profile.txt').exists())
+                self.assertTrue((Path(result_dir) / 'result' / 'profile_memory.csv').exists())
+            finally:
+                worker_profile.base_dir = old_base_dir
+
+    def test_live_intervals(self):
+        q = queue.Queue()
+        second = 1_000_000_000
+        workers = [IntervalReporter(q, t_start=0), IntervalReporter(q, t_start=0)]
+        workers[0].put_txn(TpccTransactionType.NewOrder, 0, second // 2, True)
+        workers[1].put_txn(TpccTransactionType.NewOrder, 0, second // 2, False)
+        workers[0].put_txn(TpccTransactionType.Payment, second, 3 * second, True)
+        for worker in workers:
+            worker.flush()
+        monitor = LiveMonitor(q, t_start=0)
+        monitor._drain(timeout=0)
+        df = monitor.to_df()
+        self.assertEqual(df['NewOrder_commit'].tolist(), [1, 0, 0, 0])
+        self.assertEqual(df['NewOrder_abort'].tolist(), [1, 0, 0, 0])
+        self.assertEqual(df['Payment_commit'].tolist(), [0, 0, 0, 1])
+        self.assertEqual(df['tpmC'].tolist(), [60, 0, 0, 0])
+
+    def test_raw_records(self):
+        recorders = [ProcessTxnRecorder(f'{i}', raw=True, worker=i) for i in range(1, 3)]
+        for i in range(5000):
+            recorders[i % 2].put_txn(TpccTransactionType(i % 5), i, i + 10, i % 3 != 0, i % 3)
+        recorders = [pickle.loads(pickle.dumps(recorder)) for recorder in recorders]
+        df = ProcessTxnRecorder.merge_records(recorders).to_df()
+        self.assertEqual(len(df), 5000)
+        self.assertEqual(df['worker'].tolist()[:2500], [1] * 2500)
+        self.assertEqual(df['type_name'].iloc[2500], 'Payment')
+        self.assertTrue((df['time'] == 10).all())
+        self.assertEqual(int(df['success'].sum()), sum(1 for i in range(5000) if i % 3 != 0))
+
+    def test_save_load_records(self):
+        recorder = ProcessTxnRecorder('test', raw=True)
+        for i in range(100):
+            recorder.put_txn(TpccTransactionType(i % 5), i, i + 1_000_000, i % 4 != 0)
+        formats = ['npy'] + (['parquet'] if pq is not None else [])
+        for fmt in formats:
+            with tempfile.TemporaryDirectory() as data_dir:
+                path = save_records(recorder.transaction_records, Path(data_dir) / 'records', fmt)
+                df = load_records(path, ['type', 'success'])
+                self.assertEqual(list(df.columns), ['type', 'success'])
+                self.assertEqual(df['type'].tolist(), [i % 5 for i in range(100)])
+                # 与 save_records 相同的不带后缀的路径也能读取
+                self.assertEqual(len(load_records(Path(data_dir) / 'records', ['type'])), 100)
+                statistics = trace_statistics(path)
+                self.assertEqual(statistics['total'].tolist(), [20] * 5)
+                self.assertEqual(statistics['success'].sum(), 75)
+                self.assertEqual(statistics['p50(ms)'].tolist(), [1.0] * 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
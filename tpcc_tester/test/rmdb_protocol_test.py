@@ -0,0 +1,269 @@
+# PYTHONPATH=. python test/rmdb_protocol_test.py
+import pathlib
+import socket
+import socketserver
+import sys
+import threading
+
+file_path = pathlib.Path(__file__)
+file_dir = file_path.parent
+sys.path.append(str(file_dir.parent.parent))
+
+import asyncio
+import tempfile
+import unittest
+from tpcc_tester.client import AsyncRMDBClient, RMDBClient
+from tpcc_tester.client.base import SqlExpr, StatementTemplate
+from tpcc_tester.client.pool import ConnectionPool, connect_with_backoff
+from tpcc_tester.client.rmdb_client import FramedReader
+from tpcc_tester.client.result_parser import TypedResultParser
+from tpcc_tester.common import ServerState
+from tpcc_tester.record.phases import ClientTimings
+from tpcc_tester.record.capture import load_capture, start_capture, statement_shape, stop_capture
+from tpcc_tester.replay import ReplayEngine
+
+TABLE = "| id | name |\n| 1 | test |\n| 2 | more |\n"
+
+
+class FakeRMDBHandler(socketserver.BaseRequestHandler):
+    """按 \\0 切分请求, 每条请求回复 respond(sql) + \\0; 收到 drop; 时不回复并断开连接"""
+    def handle(self):
+        buffer = b''
+        while True:
+            data = self.request.recv(4096)
+            if not data:
+                return
+            buffer += data
+            while b'\0' in buffer:
+                request, buffer = buffer.split(b'\0', 1)
+                if request == b'drop;':
+                    return
+                self.request.sendall(self.server.respond(request.decode()).encode() + b'\0')
+
+
+class FakeRMDBServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeRMDBHandler)
+        self.requests = []
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def respond(self, sql: str) -> str:
+        self.requests.append(sql)
+        if sql.startswith('select'):
+            return TABLE
+        if sql.startswith('bad'):
+            return 'Error: syntax error'
+        return ''
+
+
+class RMDBProtocolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeRMDBServer()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_async_client(self):
+        async def run():
+            clients = [AsyncRMDBClient(port=self.server.port) for _ in range(4)]
+            for client in clients:
+                self.assertEqual(await client.connect(), ServerState.OK)
+            results = await asyncio.gather(*[client.select(table=['test'], where=[('id', '=', i)])
+                                             for i, client in enumerate(clients)])
+            error = await clients[0].send_cmd('bad;')
+            for client in clients:
+                await client.close()
+            return results, error
+
+        results, error = asyncio.run(run())
+        for result in results:
+            self.assertEqual(result.state, ServerState.OK)
+            self.assertEqual(result.metadata, ['id', 'name'])
+            self.assertEqual(result.data, [[1, 'test'], [2, 'more']])
+        self.assertEqual(error.state, ServerState.ERROR)
+        self.assertIn('select * from test where id=3  ;', self.server.requests)
+
+    def test_framed_reader(self):
+        left, right = socket.socketpair()
+        reader = FramedReader(right, buf_size=16)
+        # 一次收到多条响应, 以及跨多次 recv 的大响应
+        big = b'x' * 1_000_000
+        left.sendall(b'a\0bc\0' + big[:10])
+        self.assertEqual(reader.read_frame(), b'a\0')
+        self.assertEqual(reader.read_frame(), b'bc\0')
+        writer = threading.Thread(target=left.sendall, args=(big[10:] + b'\0tail',))
+        writer.start()
+        self.assertEqual(reader.read_frame(), big + b'\0')
+        writer.join()
+        left.close()
+        # 连接关闭时返回剩余数据
+        self.assertEqual(reader.read_frame(), b'tail')
+        self.assertEqual(reader.read_frame(), b'')
+        right.close()
+
+    def test_client(self):
+        client = RMDBClient(port=self.server.port)
+        self.assertEqual(client.connect(), ServerState.OK)
+        result = client.send_cmd('select * from test;')
+        self.assertEqual(result.data, [[1, 'test'], [2, 'more']])
+        self.assertEqual(client.send_cmd('bad;').state, ServerState.ERROR)
+        # ping 不记录日志, 阶段计时时统计每次往返的各部分耗时
+        requests = len(self.server.requests)
+        self.assertEqual(client.ping(), ServerState.OK)
+        self.assertEqual(self.server.requests[requests:], ['show tables;'])
+        client.timings = ClientTimings()
+        client.select(table=['test'], where=[('id', '=', 1)])
+        client.select_many([dict(table=['test'], where=[('id', '=', i)]) for i in range(3)])
+        self.assertEqual(client.timings.round_trips, 2)
+        self.assertTrue(all(value > 0 for value in client.timings.snapshot()))
+        client.close()
+
+    def test_connection_pool(self):
+        pool = ConnectionPool(lambda: RMDBClient(port=self.server.port), retries=2, backoff=0.001)
+        client = pool.acquire()
+        pool.release(client)
+        # 空闲连接 ping 之后复用
+        self.assertIs(pool.acquire(), client)
+        self.assertEqual(self.server.requests, ['show tables;', 'show tables;'])
+
+        # 服务器断开连接: 返回 DOWN 而不是退出进程, 下次取出时重连
+        self.assertEqual(client.send_cmd('drop;').state, ServerState.DOWN)
+        self.assertEqual(client.ping(), ServerState.DOWN)
+        pool.release(client)
+        self.assertIs(pool.acquire(), client)
+        self.assertEqual(client.send_cmd('select * from test;').state, ServerState.OK)
+        pool.release(client)
+
+        # 取出时的 ping 持有全局锁
+        class CountingLock:
+            count = 0
+
+            def __enter__(self):
+                self.count += 1
+
+            def __exit__(self, *args):
+                pass
+
+        lock = CountingLock()
+        self.assertIs(pool.acquire(lock), client)
+        self.assertEqual(lock.count, 1)
+        pool.release(client)
+        pool.close()
+        self.assertEqual(pool.idle, [])
+
+        # 没有服务器监听的端口: 重试用完后抛出 ConnectionError
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        with self.assertRaises(ConnectionError):
+            connect_with_backoff(RMDBClient(port=port), retries=2, base=0.001)
+
+    def test_statement_template(self):
+        client = RMDBClient(port=self.server.port)
+        self.assertEqual(client.connect(), ServerState.OK)
+        client.select(table=['customer', 'warehouse'], col=('c_last', 'w_tax'),
+                      where=[('w_id', '=', 1), ('c_w_id', '=', SqlExpr('w_id')), ('c_last', '=', "O'Brien")])
+        client.select(table=['customer', 'warehouse'], col=('c_last', 'w_tax'),
+                      where=[('w_id', '=', 2), ('c_w_id', '=', SqlExpr('w_id')), ('c_last', '=', 'BARBAR')])
+        client.insert(table='history', rows=(1, 2.5, '2024-01-01 00:00:00'))
+        client.update(table='warehouse', row=[('w_ytd', SqlExpr('w_ytd+{}', 10.5)), ('w_name', 'a')],
+                      where=[('w_id', '=', 3)])
+        client.delete(table='new_orders', where=[('no_o_id', '=', 4), ('no_w_id', '=', 5)])
+        self.assertEqual(client.insert_many(table='new_orders', rows=[(6, 1, 1), (7, 1, 1)]).state, ServerState.OK)
+        client.close()
+        self.assertEqual(self.server.requests[1:], [
+            "select c_last,w_tax from customer,warehouse where w_id=1 and c_w_id=w_id and c_last='O''Brien'  ;",
+            "select c_last,w_tax from customer,warehouse where w_id=2 and c_w_id=w_id and c_last='BARBAR'  ;",
+            "insert into history values(1,2.5,'2024-01-01 00:00:00') ;",
+            "update warehouse set w_ytd=w_ytd+10.5,w_name='a' where w_id=3 ;",
+            "delete from new_orders where no_o_id=4 and no_w_id=5 ;",
+            "insert into new_orders values(6,1,1) ;",
+            "insert into new_orders values(7,1,1) ;",
+        ])
+        # 同一形状的语句只编译一次
+        shape = (('w_id', '='), ('c_w_id', '='), ('c_last', '='))
+        key = ('select', ('customer', 'warehouse'), ('c_last', 'w_tax'), shape, None, False)
+        self.assertIs(StatementTemplate.get(key), StatementTemplate.get(key))
+        # 预处理语句: 常量和 SqlExpr 的参数都作为绑定参数
+        template = StatementTemplate.get(('update', 'warehouse', ('w_ytd', 'w_name'), (('w_id', '='),)))
+        self.assertEqual(template.bind([SqlExpr('w_ytd+{}', 10.5), "O'Brien", 3]),
+                         ("update warehouse set w_ytd=w_ytd+?,w_name=? where w_id=? ;", [10.5, "O'Brien", 3]))
+
+    def test_pipeline(self):
+        client = RMDBClient(port=self.server.port)
+        self.assertEqual(client.connect(), ServerState.OK)
+        results = client.send_pipeline(['select * from test;', 'bad;', 'insert into test values(3,\'x\') ;'])
+        self.assertEqual([result.state for result in results], [ServerState.OK, ServerState.ERROR, ServerState.OK])
+        self.assertEqual(results[0].data, [[1, 'test'], [2, 'more']])
+        self.assertEqual([result.sql for result in results][1], 'bad;')
+        results = client.select_many([dict(table=['test'], where=[('id', '=', i)]) for i in range(3)])
+        self.assertEqual([result.data for result in results], [[[1, 'test'], [2, 'more']]] * 3)
+        client.close()
+        self.assertEqual(self.server.requests[-3:], [f'select * from test where id={i}  ;' for i in range(3)])
+
+        async def run():
+            client = AsyncRMDBClient(port=self.server.port)
+            await client.connect()
+            results = await client.send_pipeline(['bad;', 'select * from test;'])
+            await client.close()
+            return results
+
+        results = asyncio.run(run())
+        self.assertEqual([result.state for result in results], [ServerState.ERROR, ServerState.OK])
+        self.assertEqual(results[1].data, [[1, 'test'], [2, 'more']])
+
+    def test_capture_replay(self):
+        with tempfile.TemporaryDirectory() as capture_dir:
+            start_capture(capture_dir)
+            try:
+                first, second = RMDBClient(port=self.server.port), RMDBClient(port=self.server.port)
+                first.connect(), second.connect()
+                first.begin()
+                first.select(table=['test'], where=[('id', '=', 1)])
+                second.send_cmd('bad;')
+                first.commit()
+                first.send_pipeline(['select * from test;'])
+                first.close(), second.close()
+            finally:
+                stop_capture()
+
+            capture = load_capture(capture_dir)
+            self.assertEqual(len(capture), 2)
+            first_stmts = capture[first.conn_id]
+            self.assertEqual([stmt.txn for stmt in first_stmts], [1, 1, 1, None])
+            self.assertEqual(statement_shape(first_stmts[1].sql), 'select * from test where id=?  ;')
+
+            self.server.requests.clear()
+            engine = ReplayEngine(capture_dir, lambda: RMDBClient(port=self.server.port), connections=1, speed=0)
+            df = engine.run()
+        self.assertEqual(len(df), 5)
+        self.assertEqual(list(df['captured_state']), list(df['replay_state']))
+        # 同一事务的语句在一个重放连接上连续发送
+        replayed = [sql for sql in self.server.requests if sql != 'show tables;']
+        txn = replayed.index('BEGIN;')
+        self.assertEqual(replayed[txn:txn + 3], ['BEGIN;', 'select * from test where id=1  ;', 'COMMIT;'])
+        summary = ReplayEngine.report(df)
+        self.assertEqual(summary.loc['select * from test where id=?  ;', 'count'], 1)
+
+    def test_typed_parser(self):
+        parser = TypedResultParser()
+        text = ("| d_tax | d_next_o_id | d_name | count(*) |\n"
+                "| 0.1234 | 3001 | abc.def | 7 |\n"
+                "|  |  |  |  |\n"
+                "| 0.0500 | 12 |  x y  | 8 |\n")
+        metadata, data = parser.parse(text)
+        self.assertEqual(metadata, ['d_tax', 'd_next_o_id', 'd_name', 'count(*)'])
+        self.assertEqual(data, [[0.1234, 3001, 'abc.def', 7], [0.05, 12, 'x y', 8]])
+        self.assertEqual(parser.parse('Error: xxx'), ([], []))
+
+
+if __name__ == "__main__":
+    unittest.main()
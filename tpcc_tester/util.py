@@ -1,59 +1,72 @@
 import datetime
 import random
 import string
+from typing import Tuple
+
+import numpy as np
 
 # _names = ['BAR', 'OUGHT', 'ABLE', 'PRI', 'PRES', 'ESE', 'ANTI', 'CALLY', 'ATION', 'EING']
 _names = ['BARR', 'OUGH', 'ABLE', 'PRII', 'PRES', 'ESEE', 'ANTI', 'CALL', 'ATIO', 'EING']
 # _C_LOAD = 42
 # _C_RUN = 42
 
-# TPC-C 2.1.6.1: C is a run-time constant randomly chosen within [0 .. A]
-# Replicating the logic from random.cpp where C is generated once per run
-# and is different for different A values.
-C_LAST_LOAD = random.randint(0, 255)
-C_ID_LOAD = random.randint(0, 1023)
-C_OL_I_ID_LOAD = random.randint(0, 8191)
 
-C_LAST_RUN = random.randint(0, 255)
-C_ID_RUN = random.randint(0, 1023)
-C_OL_I_ID_RUN = random.randint(0, 8191)
+def run_constants(seed: int) -> Tuple[int, int, int]:
+    """
+    TPC-C 2.1.6.1: C is a run-time constant randomly chosen within [0 .. A].
+    返回 (C_LAST, C_ID, C_OL_I_ID), 只取决于 seed, 所有进程和终端相同.
+    """
+    state = np.random.SeedSequence(seed).generate_state(3)
+    return int(state[0] % 256), int(state[1] % 1024), int(state[2] % 8192)
+
+
+class TerminalRandom(random.Random):
+    """
+    一个终端的随机流, 并带有本次运行的 NURand 常量.
+
+    流由 SeedSequence(seed, spawn_key) 派生(与 SeedSequence(seed).spawn 相同),
+    不同 spawn_key(如 (tid, terminal)) 的流互相独立, 且只取决于 seed 和 spawn_key.
+    """
+    def __init__(self, seed: int, *spawn_key: int):
+        self.C_LAST, self.C_ID, self.C_OL_I_ID = run_constants(seed)
+        state = np.random.SeedSequence(seed, spawn_key=spawn_key).generate_state(4)
+        super().__init__(int.from_bytes(state.tobytes(), 'little'))
 
 
-def rand_str(lower, upper=0):
+def rand_str(rng: random.Random, lower, upper=0):
     if upper == 0: upper = lower + 1
-    return ''.join([random.choice(string.ascii_letters) for i in range(random.randrange(lower, upper))])
+    return ''.join([rng.choice(string.ascii_letters) for i in range(rng.randrange(lower, upper))])
 
 
-def rand_dat(lower, upper):
-    if random.randrange(100) < 10:
-        s = rand_str(lower, upper - 8)
-        k = random.randrange(lower, upper - 8)
+def rand_dat(rng: random.Random, lower, upper):
+    if rng.randrange(100) < 10:
+        s = rand_str(rng, lower, upper - 8)
+        k = rng.randrange(lower, upper - 8)
         return s[lower:k] + 'ORIGINAL' + s[k:upper - 8]
     else:
-        return rand_str(lower, upper)
+        return rand_str(rng, lower, upper)
 
 
-def rand_digit(num):
-    return ''.join([random.choice(string.digits) for i in range(num)])
+def rand_digit(rng: random.Random, num):
+    return ''.join([rng.choice(string.digits) for i in range(num)])
 
 
-def zip_code():
-    return rand_digit(4) + '11111'
+def zip_code(rng: random.Random):
+    return rand_digit(rng, 4) + '11111'
 
 
-def rand_perm(max):
+def rand_perm(rng: random.Random, max):
     l = list(range(max))
-    random.shuffle(l)
+    rng.shuffle(l)
     return l
 
 
-def NURand(A, x, y, C):
-    return ((random.randint(0, A) | random.randint(x, y)) + C) % (y - x + 1) + x
+def NURand(rng: random.Random, A, x, y, C):
+    return ((rng.randint(0, A) | rng.randint(x, y)) + C) % (y - x + 1) + x
 
-def get_c_last(k=1000, run=False):
-    C = C_LAST_RUN if run else C_LAST_LOAD
+def get_c_last(rng: TerminalRandom, k=1000):
     if k >= 1000:
-        k = NURand(255, 0, 999, C)
+        k = NURand(rng, 255, 0, 999, rng.C_LAST)
     return ''.join([_names[k // 100], _names[(k // 10) % 10], _names[k % 10]])
 
 
@@ -71,14 +84,14 @@ def current_time():
 
 
 
-def get_c_id():
-    return NURand(1023, 1, 3000, C=C_ID_RUN)
+def get_c_id(rng: TerminalRandom):
+    return NURand(rng, 1023, 1, 3000, C=rng.C_ID)
 
 
-def get_ol_i_id():
-    ol_cnt = random.randrange(5, 16)
-    rbk = random.randrange(100)
-    ret = [NURand(8191, 1, 100000, C=C_OL_I_ID_RUN) for i in range(ol_cnt)]
+def get_ol_i_id(rng: TerminalRandom):
+    ol_cnt = rng.randrange(5, 16)
+    rbk = rng.randrange(100)
+    ret = [NURand(rng, 8191, 1, 100000, C=rng.C_OL_I_ID) for i in range(ol_cnt)]
     # if rbk == 0:
     #     ret[-1] = 100001  # unused item number
     return ret
@@ -88,15 +101,15 @@ def get_ol_i_id():
 # 在几乎所有情况下，每个供应仓库 ID 都是 home_w_id。
 # 在非常少见的情况下（订单行的仓库数量大于 1，且随机数恰好为 0），随机选择一个非 home_w_id 的仓库 ID。
 # 这个函数主要用于某种模拟或测试场景，确保大部分订单项目都来自一个主要仓库 home_w_id，但偶尔订单项目可能来自其他仓库，比如当前仓库缺货了
-def get_ol_supply_w_id(home_w_id, scale, ol_cnt):
+def get_ol_supply_w_id(rng: random.Random, home_w_id, scale, ol_cnt):
     def supply_id():
         # 50% 概率使用 home_w_id 或如果 scale 为 1，则一定使用 home_w_id
-        if random.randrange(100) > 0 or scale == 1:
+        if rng.randrange(100) > 0 or scale == 1:
             return home_w_id
         else:
             # 选择一个除 home_w_id 以外的仓库 ID
             other_ids = [i for i in range(1, scale + 1) if i != home_w_id]
-            return random.choice(other_ids)
+            return rng.choice(other_ids)
 
     return [supply_id() for _ in range(ol_cnt)]
 
@@ -107,33 +120,33 @@ def get_ol_supply_w_id(home_w_id, scale, ol_cnt):
 #     return [supply_id() for i in range(ol_cnt)]
 
 
-def get_ol_quantity(ol_cnt):
-    return [random.randrange(1, 11) for i in range(ol_cnt)]
+def get_ol_quantity(rng: random.Random, ol_cnt):
+    return [rng.randrange(1, 11) for i in range(ol_cnt)]
 
 
 # scale: warehouse数量
-def get_w_id(scale: int):
-    return random.randrange(1, scale + 1)
+def get_w_id(rng: random.Random, scale: int):
+    return rng.randrange(1, scale + 1)
 
 
-def get_d_id():
-    return random.randrange(1, 11)
+def get_d_id(rng: random.Random):
+    return rng.randrange(1, 11)
 
 
 # 这个函数的目的是在某种交易模拟场景中，决定客户所属的 warehouse 和 district：
 # 85% 的情况下，客户保持在原来的 warehouse 和 district。
 # 15% 的情况下，客户尝试从另一个 warehouse 随机选择一个 district。
 # 如果整个系统中只有一个 warehouse，客户始终集中在这个唯一的 warehouse
-def get_c_w_id_d_id(home_w_id, d_id, scale):
-    if random.randrange(100) < 85 or scale == 1:
+def get_c_w_id_d_id(rng: random.Random, home_w_id, d_id, scale):
+    if rng.randrange(100) < 85 or scale == 1:
         # 85% 概率返回 home_w_id 和给定的 d_id，或者 if scale == 1 就一定选择 home_w_id
         c_w_id = home_w_id
         c_d_id = d_id
     else:
         # 从除 home_w_id 外随机选择一个仓库 ID 和 1 到 10 之间随机选择一个区域 ID
         other_ids = [i for i in range(1, scale + 1) if i != home_w_id]
-        c_w_id = random.choice(other_ids)
-        c_d_id = random.randrange(1, 11)
+        c_w_id = rng.choice(other_ids)
+        c_d_id = rng.randrange(1, 11)
 
     return c_w_id, c_d_id
 
@@ -144,27 +157,28 @@ def get_c_w_id_d_id(home_w_id, d_id, scale):
 #         else (random.choice(list(range(1, scale + 1)).remove(home_w_id)), random.randrange(1, 11))
 #     return c_w_id, c_d_id
 
-def query_cus_by(fetch_id=False):
+def query_cus_by(rng: TerminalRandom, fetch_id=False):
     """
     根据 fetch_id 参数决定获取客户 ID 还是按随机概率获取客户 last name 或 ID。
 
     Args:
+        rng (TerminalRandom): 终端的随机流。
         fetch_id (bool): 决定是否直接获取客户 ID。
 
     Returns:
         str: 客户 last name 或客户 ID。
     """
     if fetch_id:
-        return get_c_id()
+        return get_c_id(rng)
 
-    y = random.randrange(100)
+    y = rng.randrange(100)
     if y < 60:
-        return get_c_last(1000, run=True)
+        return get_c_last(rng, 1000)
     else:
-        return get_c_id()
+        return get_c_id(rng)
 
-def get_level_threshold():
-    return random.randrange(10, 100)
+def get_level_threshold(rng: random.Random):
+    return rng.randrange(10, 100)
 
 # def query_cus_by():
 #     y = random.randrange(100)
@@ -174,16 +188,16 @@ def get_level_threshold():
 #         return get_c_id()
 
 
-def get_h_amount():
-    return round(random.random() * (5000 - 1) + 1, 2)
+def get_h_amount(rng: random.Random):
+    return round(rng.random() * (5000 - 1) + 1, 2)
 
 
-def get_o_carrier_id():
-    return random.randrange(1, 11)
+def get_o_carrier_id(rng: random.Random):
+    return rng.randrange(1, 11)
 
 # 输入一个列表，其中每项代表选择该项目的概率，返回选择的项目的下标
-def get_choice(choices):
-    r = random.random() * sum(choices)
+def get_choice(rng: random.Random, choices):
+    r = rng.random() * sum(choices)
     upto = 0
     for i in range(len(choices)):
         if upto + choices[i] >= r: